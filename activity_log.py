@@ -0,0 +1,105 @@
+"""Append-only activity log per farmer, read newest first one page at a time.
+
+Event ids start with the event time in milliseconds, so ordering by id is
+ordering by time and a page is an index range read below a cursor: a
+dashboard reads the same few rows whether the farmer has five events or
+five thousand.  Writes go through a WriteBehindQueue and the first page of
+each farmer is cached; a farmer's own new events are added to the cached
+page straight away.
+"""
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from cache import TTLCache
+from write_behind import WriteBehindQueue
+
+ACTIVITY_PAGE_SIZE = int(os.getenv("AGRISMART_ACTIVITY_PAGE_SIZE", "5"))
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("AGRISMART_ACTIVITY_FLUSH_INTERVAL", "2"))
+ACTIVITY_CACHE_SIZE = int(os.getenv("AGRISMART_ACTIVITY_CACHE_SIZE", "10000"))
+ACTIVITY_CACHE_TTL = int(os.getenv("AGRISMART_ACTIVITY_CACHE_TTL", "600"))
+
+SIGNUP = "signup"
+PROFILE_COMPLETED = "profile_completed"
+LOGIN = "login"
+RECOMMENDATIONS_VIEWED = "recommendations_viewed"
+
+def new_event_id(at):
+    """Time-ordered id: milliseconds since the epoch plus a random suffix"""
+    return f"{int(at.timestamp() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+
+class ActivityLog:
+    """Records and pages farmers' activity through a FarmerRepository"""
+
+    def __init__(self, repository, page_size=ACTIVITY_PAGE_SIZE, flush_interval=ACTIVITY_FLUSH_INTERVAL,
+                 cache_size=ACTIVITY_CACHE_SIZE, cache_ttl=ACTIVITY_CACHE_TTL):
+        self.repository = repository
+        self.page_size = page_size
+        # Keys are (mobile, first-page cursor); older pages never change, so they cache too
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl)
+        self.queue = WriteBehindQueue(repository.append_activities, flush_interval=flush_interval,
+                                      available=repository.is_available)
+        self._lock = threading.Lock()
+
+    def record(self, mobile, kind, **details):
+        """Queue an event; the farmer's cached first page shows it immediately"""
+        at = datetime.now()
+        event_id = new_event_id(at)
+        event = {"kind": kind, "at": at, **details}
+        self.queue.enqueue((mobile, event_id), event)
+
+        with self._lock:
+            cached = self.cache.get((mobile, None))
+            if cached is not None:
+                events, _ = cached
+                events = [dict(event, id=event_id)] + events
+                more = len(events) > self.page_size
+                events = events[:self.page_size]
+                self.cache.set((mobile, None), (events, events[-1]["id"] if more else None))
+        return event_id
+
+    def page(self, mobile, cursor=None):
+        """(events newest first, cursor for the next older page or None)"""
+        key = (mobile, cursor)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # One extra row tells whether an older page exists
+        rows = self.repository.list_activities(mobile, self.page_size + 1, before=cursor)
+        if cursor is None:
+            # Events still waiting in the queue are newer than anything stored
+            pending = [(event_id, event) for (owner, event_id), event in self.queue.pending_items().items()
+                       if owner == mobile]
+            if pending:
+                stored = {event_id for event_id, _ in rows}
+                rows = sorted(rows + [row for row in pending if row[0] not in stored], reverse=True,
+                              key=lambda row: row[0])[:self.page_size + 1]
+
+        events = [dict(event, id=event_id) for event_id, event in rows[:self.page_size]]
+        next_cursor = events[-1]["id"] if len(rows) > self.page_size else None
+        with self._lock:
+            self.cache.set(key, (events, next_cursor))
+        return events, next_cursor
+
+    def recent(self, mobile, pages=1):
+        """The newest pages of a farmer's log joined, plus the cursor after them"""
+        events, cursor = self.page(mobile)
+        for _ in range(pages - 1):
+            if cursor is None:
+                break
+            older, cursor = self.page(mobile, cursor)
+            events = events + older
+        return events, cursor
+
+    def stats(self):
+        cache_stats = self.cache.stats()
+        queue_stats = self.queue.stats()
+        return {
+            "cached_pages": cache_stats["size"],
+            "hit_rate": cache_stats["hit_rate"],
+            "pending": queue_stats["depth"],
+            "written": queue_stats["flushed"],
+            "dropped": queue_stats["dropped"],
+        }
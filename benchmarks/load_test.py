@@ -0,0 +1,179 @@
+"""Concurrent-session load test for the AgriSmart Streamlit app.
+
+Drives N headless sessions through splash -> auth -> signup -> registration
+-> dashboard with Streamlit's AppTest against the in-memory storage backend,
+then reports per-screen rerun latency percentiles, throughput and peak RSS.
+
+    python benchmarks/load_test.py --sessions 200 --concurrency 16 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Must be set before the app (and storage.py) is imported by AppTest
+os.environ.setdefault("AGRISMART_STORAGE", "memory")
+
+from streamlit.testing.v1 import AppTest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, "code1.py")
+sys.path.insert(0, REPO_DIR)
+
+from farm_data import KERALA_DISTRICTS
+
+DISTRICTS = list(KERALA_DISTRICTS)
+
+def button(at, label):
+    """Find a button (or form submit button) by its label"""
+    for widget in at.button:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No button labelled {label!r} on screen {at.session_state.current_screen!r}")
+
+class SessionDriver:
+    """One simulated farmer walking through the app"""
+
+    def __init__(self, index, timeout):
+        self.index = index
+        self.mobile = f"9{index:09d}"
+        self.password = "Harvest#2024"
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings = []
+
+    def rerun(self, screen, action=None):
+        """Apply an interaction and time the rerun it triggers"""
+        started = time.perf_counter()
+        if action is None:
+            self.at.run()
+        else:
+            action().run()
+        self.timings.append((screen, time.perf_counter() - started))
+        if self.at.exception:
+            raise RuntimeError(f"{screen}: {self.at.exception[0].message}")
+
+    def run(self):
+        at = self.at
+        self.rerun("splash")
+        self.rerun("splash", lambda: button(at, "Get Started").click())
+
+        # Auth screen: login form inputs come first, then the signup form
+        at.text_input[2].input(self.mobile)
+        at.text_input[3].input(self.password)
+        at.text_input[4].input(self.password)
+        self.rerun("auth_signup", lambda: button(at, "Create Account").click())
+        if at.session_state.current_screen != "registration":
+            raise RuntimeError(f"signup for {self.mobile} did not reach registration")
+
+        at.text_input[0].input(f"Farmer {self.index}")
+        at.number_input[0].set_value(2.5)
+        at.selectbox[0].set_value("Clay")
+        at.selectbox[1].set_value("Rubber")
+        at.selectbox[2].set_value(DISTRICTS[self.index % len(DISTRICTS)])
+        self.rerun("registration", lambda: button(at, "✅ Complete Profile").click())
+        if at.session_state.current_screen != "dashboard":
+            raise RuntimeError(f"registration for {self.mobile} did not reach dashboard")
+
+        self.rerun("dashboard")
+        for label in ("🌡️\nWeather", "💧\nIrrigation", "🌱\nCrop Guide", "📱\nSupport"):
+            self.rerun("dashboard_action", lambda: button(at, label).click())
+        return self.timings
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+def summarize(samples):
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p90_ms": percentile(values, 90) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000 if values else 0.0,
+    }
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_load_test(sessions, concurrency, timeout):
+    per_screen = {}
+    errors = []
+    lock = threading.Lock()
+
+    def worker(index):
+        try:
+            timings = SessionDriver(index, timeout).run()
+        except Exception as e:
+            with lock:
+                errors.append(f"session {index}: {e}")
+            return
+        with lock:
+            for screen, seconds in timings:
+                per_screen.setdefault(screen, []).append(seconds)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    reruns = sum(len(samples) for samples in per_screen.values())
+    completed = sessions - len(errors)
+    return {
+        "started_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "storage_backend": os.environ["AGRISMART_STORAGE"],
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "completed_sessions": completed,
+        "errors": errors,
+        "wall_seconds": elapsed,
+        "sessions_per_second": completed / elapsed if elapsed else 0.0,
+        "reruns_per_second": reruns / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "screens": {screen: summarize(samples) for screen, samples in sorted(per_screen.items())},
+    }
+
+def print_report(results):
+    print(f"{results['completed_sessions']}/{results['sessions']} sessions "
+          f"at concurrency {results['concurrency']} in {results['wall_seconds']:.1f}s "
+          f"({results['sessions_per_second']:.2f} sessions/s, "
+          f"{results['reruns_per_second']:.1f} reruns/s, peak RSS {results['peak_rss_mb']:.0f} MB)")
+    print(f"{'screen':<18}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for screen, stats in results["screens"].items():
+        print(f"{screen:<18}{stats['count']:>7}{stats['p50_ms']:>10.1f}"
+              f"{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    for error in results["errors"][:10]:
+        print(f"  ! {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="simulated farmers to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions running at once")
+    parser.add_argument("--timeout", type=float, default=30, help="per-rerun timeout in seconds")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    results = run_load_test(args.sessions, args.concurrency, args.timeout)
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if results["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
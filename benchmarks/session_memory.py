@@ -0,0 +1,110 @@
+"""Per-session memory of the logged-in farmer: raw document vs FarmerProfile.
+
+Stores N farmers in a throwaway SQLite repository (so every read decodes
+fresh strings and datetimes, as a Firestore read does), then keeps one
+login's worth of farmer state per simulated session and measures the
+retained heap with tracemalloc:
+
+    dict     the full farmer document, as user_data held it before
+    profile  FarmerProfile.from_document(), as the session holds it now
+
+    python benchmarks/session_memory.py --sessions 5000 --output memory.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from farm_data import (
+    SOIL_TYPES, KERALA_CROPS, KERALA_DISTRICTS, FarmerProfile,
+    detect_season, hash_password, build_profile
+)
+from storage import SQLiteFarmerRepository
+
+def farmer_documents(count, seed=1):
+    rng = random.Random(seed)
+    created = datetime(2026, 1, 1)
+    docs = {}
+    for i in range(count):
+        mobile = f"9{i:09d}"
+        doc = build_profile(
+            f"Farmer {i}", round(rng.uniform(0.5, 25), 1), rng.choice(SOIL_TYPES),
+            rng.choice(["None"] + KERALA_CROPS), detect_season(), rng.choice(list(KERALA_DISTRICTS))
+        )
+        doc.update({
+            "mobile": mobile,
+            "password": hash_password(f"secret{i}"),
+            "firebase_uid": f"{rng.getrandbits(128):032x}",
+            "profile_completed": True,
+            "created_at": created + timedelta(minutes=i),
+            "updated_at": created + timedelta(days=1, minutes=i),
+            "last_login": created + timedelta(days=2, minutes=i),
+        })
+        docs[mobile] = doc
+    return docs
+
+def retained_bytes(repository, mobiles, project):
+    """Heap still held after keeping one projected read per session"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    sessions = [project(mobile, repository.get_farmer(mobile)) for mobile in mobiles]
+    gc.collect()
+    retained = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+    tracemalloc.stop()
+    del sessions
+    return retained
+
+def run_benchmark(sessions):
+    with tempfile.TemporaryDirectory() as tmp:
+        repository = SQLiteFarmerRepository(os.path.join(tmp, "farmers.db"))
+        docs = farmer_documents(sessions)
+        repository.batch_upsert_farmers(docs)
+        mobiles = list(docs)
+
+        results = {}
+        for label, project in (("dict", lambda mobile, doc: doc),
+                               ("profile", FarmerProfile.from_document)):
+            retained = retained_bytes(repository, mobiles, project)
+            results[label] = {"total_bytes": retained, "bytes_per_session": retained / sessions}
+
+    saved = 1 - results["profile"]["total_bytes"] / results["dict"]["total_bytes"]
+    return {
+        "started_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "sessions": sessions,
+        "results": results,
+        "saving": saved,
+    }
+
+def print_report(report):
+    print(f"{report['sessions']} sessions")
+    print(f"{'user_data':<12}{'bytes/session':>16}{'total MB':>12}")
+    for label, stats in report["results"].items():
+        print(f"{label:<12}{stats['bytes_per_session']:>16.0f}{stats['total_bytes'] / 1e6:>12.2f}")
+    print(f"FarmerProfile saves {report['saving']:.0%} per session")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000, help="simulated logged-in sessions")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sessions)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Cold-start benchmark: how soon a fresh process shows its first screen.
+
+Each run starts a new interpreter that imports Streamlit and runs code1.py
+with AppTest (the splash screen of a first session), then reports:
+
+    streamlit      importing streamlit itself, which the app cannot avoid
+    harness        an AppTest run of a one-line script, AppTest's own overhead
+    first_run      the app's first run: its imports, backend set-up and render
+    second_run     an immediate rerun of the same screen
+    first_screen   launch + streamlit import + first_run (harness excluded)
+
+Without FIREBASE_CREDS the Firestore backend still imports the Google Cloud
+client stack before failing, which is the cost a new pod pays.  Pass --app
+to time another checkout of the app, e.g. a git worktree of an older commit.
+
+    python benchmarks/startup.py --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, "code1.py")
+
+def child(app_path, launched_at):
+    """Runs in the fresh interpreter; prints one JSON line of timings"""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    imported = time.perf_counter()
+    launch_to_import = time.time() - launched_at
+
+    # AppTest scans installed packages on its first run; time a later one
+    for _ in range(2):
+        harness_started = time.perf_counter()
+        AppTest.from_string("import streamlit as st\nst.write('ready')").run()
+    harness = time.perf_counter() - harness_started
+
+    at = AppTest.from_file(app_path, default_timeout=120)
+    timings = []
+    for _ in range(2):
+        run_started = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - run_started)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    print(json.dumps({
+        "streamlit": imported - started,
+        "harness": harness,
+        "first_run": timings[0],
+        "second_run": timings[1],
+        "first_screen": launch_to_import + timings[0],
+    }), flush=True)
+    # Skip interpreter teardown so background threads cannot delay the next run
+    os._exit(0)
+
+def run_once(app_path, storage):
+    env = dict(os.environ, AGRISMART_STORAGE=storage, AGRISMART_METRICS_PORT="0")
+    command = [sys.executable, os.path.abspath(__file__), "--child", app_path, str(time.time())]
+    output = subprocess.run(command, env=env, cwd=os.path.dirname(app_path),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run_benchmark(app_path, storage, runs):
+    # One untimed run fills the OS page cache and writes .pyc files
+    run_once(app_path, storage)
+    samples = [run_once(app_path, storage) for _ in range(runs)]
+
+    results = {
+        metric: {
+            "median_ms": statistics.median(sample[metric] for sample in samples) * 1000,
+            "min_ms": min(sample[metric] for sample in samples) * 1000,
+            "max_ms": max(sample[metric] for sample in samples) * 1000,
+        }
+        for metric in ("streamlit", "harness", "first_run", "second_run", "first_screen")
+    }
+    return {
+        "started_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "app": app_path,
+        "storage": storage,
+        "runs": runs,
+        "results": results,
+    }
+
+def print_report(report):
+    print(f"{report['app']} ({report['storage']} storage), {report['runs']} cold starts")
+    print(f"{'metric':<16}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for metric, stats in report["results"].items():
+        print(f"{metric:<16}{stats['median_ms']:>12.0f}{stats['min_ms']:>10.0f}{stats['max_ms']:>10.0f}")
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        child(sys.argv[2], float(sys.argv[3]))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="timed cold starts")
+    parser.add_argument("--storage", default="firestore", choices=["firestore", "sqlite", "memory"],
+                        help="AGRISMART_STORAGE for the app")
+    parser.add_argument("--app", default=APP_PATH, help="app script to start")
+    parser.add_argument("--output", help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    report = run_benchmark(os.path.abspath(args.app), args.storage, args.runs)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
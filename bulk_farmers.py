@@ -0,0 +1,372 @@
+"""Bulk import and export of farmers/{mobile} documents.
+
+    python bulk_farmers.py import farmers.csv --workers 8 --checkpoint farmers.ckpt
+    python bulk_farmers.py export farmers.parquet
+
+Imports stream CSV or JSONL rows with the registration profile columns and
+an initial password (mobile, name, land_size, soil_type, previous_crop,
+password, optional district and season), validate them like the app does,
+drop duplicate numbers and write 500-document batches from a worker pool.
+Each farmer gets a complete account (password hash, firebase_uid and Auth
+user) so they can log in straight away.  Numbers that already have a
+document are left alone; with --overwrite their profile fields are replaced
+from the file, but never their password or account fields.  The checkpoint
+records how many input rows are safely written so an interrupted import can
+be re-run.
+Exports page through the collection by document id and stream to JSONL or
+Parquet (requires pyarrow).  The storage backend follows AGRISMART_STORAGE.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from farm_data import (
+    SOIL_TYPES, KERALA_CROPS, KERALA_DISTRICTS, SEASONS, MIN_LAND_SIZE, MAX_LAND_SIZE,
+    detect_season, validate_mobile, hash_password, build_profile
+)
+from storage import create_repository
+from write_behind import MAX_BATCH_SIZE
+
+# Never written to export files
+EXPORT_EXCLUDED_FIELDS = {"password"}
+
+# Set only when an import creates the account, never merged into an existing one
+ACCOUNT_FIELDS = {"password", "firebase_uid", "created_at"}
+
+EXPORT_COLUMNS = [
+    ("mobile", "string"), ("name", "string"), ("district", "string"), ("land_size", "float"),
+    ("soil_type", "string"), ("previous_crop", "string"), ("season", "string"),
+    ("profile_completed", "bool"), ("firebase_uid", "string"),
+    ("created_at", "timestamp"), ("registration_completed_at", "timestamp"),
+    ("updated_at", "timestamp"), ("last_login", "timestamp"), ("imported_at", "timestamp"),
+]
+
+_SOIL_BY_NAME = {soil.lower(): soil for soil in SOIL_TYPES}
+_CROP_BY_NAME = {crop.lower(): crop for crop in KERALA_CROPS}
+_DISTRICT_BY_NAME = {district.lower(): district for district in KERALA_DISTRICTS}
+# "Winter (Rabi Season) ❄️" also matches "winter", "rabi" and "winter (rabi season)"
+_SEASON_BY_NAME = {}
+for _season in SEASONS:
+    _label = _season.rsplit(" ", 1)[0]
+    _SEASON_BY_NAME.update({
+        name.lower(): _season
+        for name in (_season, _label, _label.split(" (")[0], _label.split("(")[1].split(" ")[0])
+    })
+
+# 🔹 Import
+def read_rows(path, fmt):
+    """Stream input rows as dicts without loading the file"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+def parse_row(row, imported_at):
+    """Validate one row like the signup and registration screens; returns (mobile, fields)"""
+    mobile = str(row.get("mobile") or "").strip()
+    if not validate_mobile(mobile):
+        raise ValueError("invalid mobile number")
+
+    name = str(row.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+
+    try:
+        land_size = round(float(row.get("land_size")), 1)
+    except (TypeError, ValueError):
+        raise ValueError("invalid land_size")
+    if not MIN_LAND_SIZE <= land_size <= MAX_LAND_SIZE:
+        raise ValueError(f"land_size must be between {MIN_LAND_SIZE} and {MAX_LAND_SIZE}")
+
+    soil_type = _SOIL_BY_NAME.get(str(row.get("soil_type") or "").strip().lower())
+    if soil_type is None:
+        raise ValueError("unknown soil_type")
+
+    previous_crop = str(row.get("previous_crop") or "None").strip()
+    if previous_crop.lower() not in ("", "none"):
+        previous_crop = _CROP_BY_NAME.get(previous_crop.lower())
+        if previous_crop is None:
+            raise ValueError("unknown previous_crop")
+    else:
+        previous_crop = "None"
+
+    district = str(row.get("district") or "").strip()
+    if district:
+        district = _DISTRICT_BY_NAME.get(district.lower())
+        if district is None:
+            raise ValueError("unknown district")
+
+    season = str(row.get("season") or "").strip()
+    if season:
+        season = _SEASON_BY_NAME.get(season.lower())
+        if season is None:
+            raise ValueError("unknown season")
+    else:
+        season = detect_season(imported_at)
+    fields = build_profile(name, land_size, soil_type, previous_crop, season, district or None)
+    fields.update({"mobile": mobile, "profile_completed": True, "imported_at": imported_at})
+
+    # Without a password the farmer could neither log in nor sign up again
+    password = str(row.get("password") or "")
+    if len(password) < 6:
+        raise ValueError("missing password or shorter than 6 characters")
+    fields.update({
+        "password": hash_password(password),
+        "firebase_uid": uuid.uuid4().hex,
+        "created_at": imported_at
+    })
+    return mobile, fields
+
+class Checkpoint:
+    """Input rows known to be written, advanced only over contiguous finished batches"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.rows_done = 0
+        self._finished = {}
+        self._next_batch = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("source") == self.source:
+                self.rows_done = saved["rows_done"]
+
+    def batch_finished(self, seq, end_row):
+        with self._lock:
+            self._finished[seq] = end_row
+            advanced = False
+            while self._next_batch in self._finished:
+                self.rows_done = self._finished.pop(self._next_batch)
+                self._next_batch += 1
+                advanced = True
+            if advanced:
+                self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"source": self.source, "rows_done": self.rows_done,
+                       "saved_at": datetime.now().isoformat()}, f)
+        os.replace(tmp_path, self.path)
+
+def with_retry(fn, attempts=3):
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+def write_batch(repository, docs, overwrite=False):
+    """Create absent farmers with their Auth users; returns (created, existing).
+
+    Existing documents are skipped, or with overwrite get the profile fields
+    merged in without any account field.
+    """
+    created = with_retry(lambda: repository.batch_create_farmers(docs))
+    if created:
+        auth_users = {docs[mobile]["firebase_uid"]: (mobile, docs[mobile]["password"]) for mobile in created}
+        with_retry(lambda: repository.import_auth_users(auth_users))
+
+    created = set(created)
+    existing = {
+        mobile: {k: v for k, v in fields.items() if k not in ACCOUNT_FIELDS}
+        for mobile, fields in docs.items() if mobile not in created
+    }
+    if overwrite and existing:
+        with_retry(lambda: repository.batch_upsert_farmers(existing))
+    return len(created), len(existing)
+
+def import_farmers(repository, path, fmt, workers=8, checkpoint_path=None, rejects_path=None,
+                   overwrite=False):
+    checkpoint = Checkpoint(checkpoint_path, path)
+    skip = checkpoint.rows_done
+    seen = set()
+    counts = {"rows": 0, "created": 0, "existing": 0, "duplicates": 0, "rejected": 0, "skipped": skip}
+    imported_at = datetime.now()
+    # Bound queued batches so memory stays flat however large the input is
+    slots = threading.BoundedSemaphore(workers * 2)
+    counts_lock = threading.Lock()
+    errors = []
+    rejects = open(rejects_path, "a", encoding="utf-8") if rejects_path else None
+
+    def submit(pool, seq, docs, end_row):
+        slots.acquire()
+
+        def run():
+            try:
+                created, existing = write_batch(repository, docs, overwrite)
+                with counts_lock:
+                    counts["created"] += created
+                    counts["existing"] += existing
+                checkpoint.batch_finished(seq, end_row)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                slots.release()
+        pool.submit(run)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            batch, seq, row_number = {}, 0, 0
+            for row_number, row in enumerate(read_rows(path, fmt), start=1):
+                if row_number <= skip:
+                    continue
+                if errors:
+                    break
+                counts["rows"] += 1
+                try:
+                    mobile, fields = parse_row(row, imported_at)
+                except ValueError as e:
+                    counts["rejected"] += 1
+                    if rejects:
+                        rejects.write(json.dumps({"row": row_number, "error": str(e), "data": row}) + "\n")
+                    continue
+
+                key = int(mobile)
+                if key in seen:
+                    counts["duplicates"] += 1
+                    continue
+                seen.add(key)
+
+                batch[mobile] = fields
+                if len(batch) >= MAX_BATCH_SIZE:
+                    submit(pool, seq, batch, row_number)
+                    batch, seq = {}, seq + 1
+
+            if batch and not errors:
+                submit(pool, seq, batch, row_number)
+            elif not errors:
+                # Rows after the last batch were all rejected or duplicates
+                checkpoint.batch_finished(seq, row_number)
+    finally:
+        if rejects:
+            rejects.close()
+
+    if errors:
+        raise RuntimeError(
+            f"Import stopped after {checkpoint.rows_done} rows; re-run to resume: {errors[0]}"
+        )
+    return counts
+
+# 🔹 Export
+def export_value(value, kind):
+    if value is None:
+        return None
+    if kind == "timestamp":
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is None:
+            value = value.astimezone()
+        return value.astimezone(timezone.utc)
+    return value
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def export_farmers(repository, path, fmt, page_size=MAX_BATCH_SIZE, start_after=None):
+    """Stream every farmer document to JSONL or Parquet one page at a time"""
+    exported = 0
+    if fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for page in repository.iter_farmer_pages(page_size, start_after):
+                for mobile, data in page:
+                    record = {k: v for k, v in data.items() if k not in EXPORT_EXCLUDED_FIELDS}
+                    record["mobile"] = mobile
+                    f.write(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n")
+                exported += len(page)
+        return exported
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet export needs pyarrow: pip install pyarrow")
+
+    types = {"string": pa.string(), "float": pa.float64(), "bool": pa.bool_(),
+             "timestamp": pa.timestamp("us", tz="UTC")}
+    schema = pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+    with pq.ParquetWriter(path, schema) as writer:
+        for page in repository.iter_farmer_pages(page_size, start_after):
+            columns = {name: [] for name, _ in EXPORT_COLUMNS}
+            for mobile, data in page:
+                data = dict(data, mobile=mobile)
+                for name, kind in EXPORT_COLUMNS:
+                    columns[name].append(export_value(data.get(name), kind))
+            # One row group per page keeps memory bounded by the page size
+            writer.write_table(pa.table(columns, schema=schema))
+            exported += len(page)
+    return exported
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    return {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}.get(extension, "jsonl")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import farmers from CSV or JSONL")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.add_argument("--workers", type=int, default=8)
+    import_parser.add_argument("--checkpoint", help="file recording progress for resumable imports")
+    import_parser.add_argument("--rejects", help="append rejected rows with reasons to this JSONL file")
+    import_parser.add_argument("--overwrite", action="store_true",
+                               help="replace the profile fields of farmers who already have a document")
+
+    export_parser = commands.add_parser("export", help="export farmers to JSONL or Parquet")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=["jsonl", "parquet"])
+    export_parser.add_argument("--page-size", type=int, default=MAX_BATCH_SIZE)
+    export_parser.add_argument("--start-after", help="resume after this mobile number")
+
+    args = parser.parse_args(argv)
+    repository = create_repository()
+    started = time.perf_counter()
+
+    if args.command == "import":
+        counts = import_farmers(
+            repository, args.path, detect_format(args.path, args.format),
+            workers=args.workers, checkpoint_path=args.checkpoint, rejects_path=args.rejects,
+            overwrite=args.overwrite
+        )
+        existing = "overwritten" if args.overwrite else "left unchanged"
+        print(f"Created {counts['created']} farmers from {counts['rows']} rows "
+              f"({counts['existing']} already registered and {existing}, {counts['duplicates']} duplicates, "
+              f"{counts['rejected']} rejected, {counts['skipped']} skipped from checkpoint) "
+              f"in {time.perf_counter() - started:.1f}s")
+        print("Run `python farm_stats.py rebuild` to refresh the aggregate statistics")
+    else:
+        exported = export_farmers(
+            repository, args.path, detect_format(args.path, args.format),
+            page_size=args.page_size, start_after=args.start_after
+        )
+        print(f"Exported {exported} farmers to {args.path} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
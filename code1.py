@@ -1,42 +1,79 @@
 import streamlit as st
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
 import hashlib
 import re
 import time
 import os
+import uuid
+import html
+import math
+import threading
+from functools import lru_cache, partial
+from string import Template
 from dotenv import load_dotenv
 import json
+from cache import TTLCache, MISSING
+import activity_log
+from activity_log import ActivityLog
+from write_behind import WriteBehindQueue
+from rate_limit import LoginRateLimiter, create_limiter_store
+from farm_data import (
+    SOIL_TYPES, KERALA_CROPS, KERALA_DISTRICTS, MIN_LAND_SIZE, MAX_LAND_SIZE,
+    FarmerProfile, detect_season, validate_mobile, hash_password, build_profile
+)
+from farm_stats import FarmStats
+from i18n import LANGUAGE_NAMES, load_catalog, loaded_languages
 
 # Load .env
 load_dotenv()
 
-# Load Firebase creds from env
-firebase_creds = os.getenv("FIREBASE_CREDS")
+# storage, weather and metrics read their settings from the environment, so import them after .env
+from storage import (
+    STORAGE_BACKEND, FirebaseResource, FarmerExistsError, StorageUnavailableError, create_repository
+)
+from weather import WeatherService, WeatherUnavailableError, create_weather_provider
+import offline_queue
+from offline_queue import OfflineWriteQueue
+from metrics import STORAGE_CALLS, SCREEN_RENDERS, DASHBOARD_SOURCES, timed, start_metrics_server, METRICS_HOST
+from dashboard_data import DashboardLoader
+from session_tokens import SESSION_COOKIE, SESSION_TTL, SessionTokens, cookie_string
 
-try:
-    if not firebase_creds:
-        raise ValueError("❌ FIREBASE_CREDS not found in .env")
+# 🔹 Storage Backend (built once per server process, shared by all sessions)
+@st.cache_resource(show_spinner=False)
+def get_firebase_resource():
+    """Single FirebaseResource per server process; connects on first use or in the warm-up"""
+    return FirebaseResource()
 
-    # Parse the JSON string
-    cred_dict = json.loads(firebase_creds)
+@st.cache_resource(show_spinner=False)
+def get_repository():
+    """Farmer repository selected by AGRISMART_STORAGE"""
+    if STORAGE_BACKEND == "firestore":
+        return create_repository(STORAGE_BACKEND, firebase_resource=get_firebase_resource())
+    return create_repository(STORAGE_BACKEND)
 
-    # Fix private key newlines
-    cred_dict["private_key"] = cred_dict["private_key"].replace("\\n", "\n")
-
-    cred = credentials.Certificate(cred_dict)
-
-    if not firebase_admin._apps:
-        firebase_admin.initialize_app(cred)
-
-    db = firestore.client()
-    st.success("🔥 Firebase Connected Successfully!")
-    time.sleep(1)
+def show_connection_banner():
+    """Show the connection status; the success banner appears once per process"""
+    if STORAGE_BACKEND != "firestore":
+        return
+    resource = get_firebase_resource()
+    if resource.client is None and resource.error is None:
+        # Still connecting in the background; the banner shows on a later rerun
+        return
+    if resource.client is None:
+        st.error(f"Firebase initialization error: {resource.error}")
+    elif not resource.announced:
+        resource.announced = True
+        st.success("🔥 Firebase Connected Successfully!")
 
-except Exception as e:
-    st.error(f"Firebase initialization error: {e}")
-    db = None
+# 🔹 Metrics endpoint (one per server process)
+@st.cache_resource(show_spinner=False)
+def get_metrics_server():
+    """Prometheus /metrics for this process; None if disabled or the port is taken"""
+    try:
+        return start_metrics_server()
+    except OSError:
+        # Another process on this host already serves the port
+        return None
 
 # 🔹 Initialize session state
 def initialize_session_state():
@@ -45,344 +82,603 @@ def initialize_session_state():
         "language": "English",
         "mobile_number": "",
         "user_logged_in": False,
-        "user_data": {},
-        "login_attempts": 0,
+        "user_data": None,
         "registration_step": 1,
         "show_confetti": False,
         "firebase_uid": "",
         "verification_id": "",
         "otp_sent": False,
         "temp_mobile": "",
-        "temp_password": ""
+        "temp_password": "",
+        "flash_messages": [],
+        "activity_pages": 1,
+        "profiler": None,
+        "session_token": None,
+        "session_cookie": None,
+        "session_checked": False
     }
     
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
 
-# 🔹 Language translations
-translations = {
-    "English": {
-        "app_name": "AgriSmart",
-        "tagline": "Smart Agriculture Solutions for Modern Farmers",
-        "select_language": "Select Your Language",
-        "continue": "Continue",
-        "get_started": "Get Started",
-        "login": "Login",
-        "signup": "Sign Up",
-        "mobile_number": "Mobile Number",
-        "password": "Password",
-        "confirm_password": "Confirm Password",
-        "enter_mobile": "Enter your mobile number",
-        "enter_password": "Enter your password",
-        "create_password": "Create a secure password",
-        "confirm_password_text": "Confirm your password",
-        "login_button": "Login Now",
-        "signup_button": "Create Account",
-        "registration": "Complete Your Profile",
-        "farmer_name": "Farmer Name",
-        "land_size": "Land Size (acres)",
-        "soil_type": "Soil Type",
-        "previous_crop": "Previous Crop (Optional)",
-        "complete_profile": "Complete Profile",
-        "welcome": "🎉 Welcome to AgriSmart!",
-        "welcome_back": "Welcome back",
-        "season_detected": "Current Season",
-        "invalid_mobile": "Please enter a valid 10-digit mobile number",
-        "invalid_password": "Password must be at least 6 characters long",
-        "passwords_dont_match": "Passwords don't match",
-        "fill_required": "Please fill all required fields",
-        "login_failed": "Invalid mobile number or password",
-        "account_exists": "Account already exists. Please login instead.",
-        "account_created": "🎊 Account Created Successfully!",
-        "profile_updated": "✅ Profile Updated Successfully!",
-        "logout": "Logout",
-        "dashboard": "Dashboard",
-        "my_profile": "My Profile",
-        "max_attempts": "Too many failed attempts. Please try again later.",
-        "creating_account": "Creating your account...",
-        "logging_in": "Logging you in...",
-        "updating_profile": "Updating your profile...",
-        "success_message": "Congratulations! You're all set!",
-    },
-    "മലയാളം": {
-        "app_name": "അഗ്രിസ്മാർട്ട്",
-        "tagline": "ആധുനിക കർഷകർക്കുള്ള സ്മാർട്ട് കൃഷി പരിഹാരങ്ങൾ",
-        "select_language": "നിങ്ങളുടെ ഭാഷ തിരഞ്ഞെടുക്കുക",
-        "continue": "തുടരുക",
-        "get_started": "ആരംഭിക്കുക",
-        "login": "ലോഗിൻ",
-        "signup": "സൈൻ അപ്പ്",
-        "mobile_number": "മൊബൈൽ നമ്പർ",
-        "password": "പാസ്‌വേഡ്",
-        "confirm_password": "പാസ്‌വേഡ് സ്ഥിരീകരിക്കുക",
-        "enter_mobile": "മൊബൈൽ നമ്പർ നൽകുക",
-        "enter_password": "പാസ്‌വേഡ് നൽകുക",
-        "create_password": "സുരക്ഷിത പാസ്‌വേഡ് സൃഷ്ടിക്കുക",
-        "confirm_password_text": "പാസ്‌വേഡ് സ്ഥിരീകരിക്കുക",
-        "login_button": "ഇപ്പോൾ ലോഗിൻ ചെയ്യുക",
-        "signup_button": "അക്കൗണ്ട് സൃഷ്ടിക്കുക",
-        "registration": "നിങ്ങളുടെ പ്രൊഫൈൽ പൂർത്തിയാക്കുക",
-        "farmer_name": "കർഷകന്റെ പേര്",
-        "land_size": "ഭൂമിയുടെ വലിപ്പം (എക്കറുകൾ)",
-        "soil_type": "മണ്ണിന്റെ തരം",
-        "previous_crop": "മുൻപത്തെ വിള (ഐച്ഛികം)",
-        "complete_profile": "പ്രൊഫൈൽ പൂർത്തിയാക്കുക",
-        "welcome": "🎉 അഗ്രിസ്മാർട്ടിലേക്ക് സ്വാഗതം!",
-        "welcome_back": "തിരികെ സ്വാഗതം",
-        "season_detected": "നിലവിലെ കാലാവസ്ഥ",
-        "invalid_mobile": "സാധുവായ 10-അക്ക മൊബൈൽ നമ്പർ നൽകുക",
-        "invalid_password": "പാസ്‌വേഡിൽ കുറഞ്ഞത് 6 അക്ഷരങ്ങൾ ഉണ്ടായിരിക്കണം",
-        "passwords_dont_match": "പാസ്‌വേഡുകൾ പൊരുത്തപ്പെടുന്നില്ല",
-        "fill_required": "എല്ലാ ആവശ്യമായ ഫീൽഡുകളും പൂരിപ്പിക്കുക",
-        "login_failed": "തെറ്റായ മൊബൈൽ നമ്പർ അല്ലെങ്കിൽ പാസ്‌വേഡ്",
-        "account_exists": "അക്കൗണ്ട് നിലവിലുണ്ട്. ലോഗിൻ ചെയ്യുക.",
-        "account_created": "🎊 അക്കൗണ്ട് വിജയകരമായി സൃഷ്ടിച്ചു!",
-        "profile_updated": "✅ പ്രൊഫൈൽ വിജയകരമായി അപ്ഡേറ്റ് ചെയ്തു!",
-        "logout": "ലോഗൗട്ട്",
-        "dashboard": "ഡാഷ്ബോർഡ്",
-        "my_profile": "എന്റെ പ്രൊഫൈൽ",
-        "max_attempts": "വളരെയധികം തെറ്റായ ശ്രമങ്ങൾ. പിന്നീട് വീണ്ടും ശ്രമിക്കുക.",
-        "creating_account": "അക്കൗണ്ട് സൃഷ്ടിക്കുന്നു...",
-        "logging_in": "ലോഗിൻ ചെയ്യുന്നു...",
-        "updating_profile": "പ്രൊഫൈൽ അപ്ഡേറ്റ് ചെയ്യുന്നു...",
-        "success_message": "അഭിനന്ദനങ്ങൾ! എല്ലാം തയ്യാറാണ്!",
-    },
-}
-
+# 🔹 Language translations (compiled catalogs in locales/, see i18n.py)
 def get_text(key):
-    return translations[st.session_state.language].get(key, key)
-
-# 🔹 Utility Functions
-def detect_season():
-    current_month = datetime.now().month
-    if current_month in [12, 1, 2]:
-        return "Winter (Rabi Season) ❄️"
-    elif current_month in [6, 7, 8, 9]:
-        return "Monsoon (Kharif Season) 🌧️"
-    else:
-        return "Summer (Zaid Season) ☀️"
+    return load_catalog(st.session_state.language)[key]
 
-def validate_mobile(mobile):
-    return re.match(r'^[6-9]\d{9}$', mobile) is not None
+# 🔹 Static Assets and HTML Templates
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(APP_DIR, "static")
+TEMPLATE_DIR = os.path.join(APP_DIR, "templates")
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+@lru_cache(maxsize=None)
+def stylesheet_url():
+    """Versioned stylesheet URL; the version changes whenever the file does"""
+    with open(os.path.join(STATIC_DIR, "agrismart.css"), "rb") as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"app/static/agrismart.css?v={version}"
 
-def show_loading_animation(message):
-    """Display a loading animation with message"""
-    progress_bar = st.progress(0)
-    status_text = st.empty()
-    
-    for i in range(100):
-        progress_bar.progress(i + 1)
-        status_text.text(f"{message} {i + 1}%")
-        time.sleep(0.02)
-    
-    status_text.text("✅ Complete!")
-    time.sleep(0.5)
-    progress_bar.empty()
-    status_text.empty()
+def inject_stylesheet():
+    """Link the static stylesheet instead of inlining it on every rerun"""
+    st.markdown(f'<style>@import url("{stylesheet_url()}");</style>', unsafe_allow_html=True)
+
+@lru_cache(maxsize=None)
+def load_template(name):
+    with open(os.path.join(TEMPLATE_DIR, f"{name}.html"), encoding="utf-8") as f:
+        return Template(f.read())
+
+@lru_cache(maxsize=256)
+def localized_template(name, language):
+    """Template with the language's strings filled in, memoized per language"""
+    return Template(load_template(name).safe_substitute(load_catalog(language)))
+
+def render_fragment(name, **values):
+    """HTML fragment for the current language with per-render values escaped"""
+    template = localized_template(name, st.session_state.language)
+    if not values:
+        return template.template
+    return template.safe_substitute({key: html.escape(str(value)) for key, value in values.items()})
+
+# 🔹 Utility Functions (detect_season, validate_mobile, hash_password live in farm_data.py)
+
+# Optional on-screen time for flash messages, enforced by the browser (CSS)
+# rather than by sleeping on the server thread; 0 uses Streamlit's toasts
+FLASH_MIN_DISPLAY_MS = int(os.getenv("AGRISMART_FLASH_MIN_DISPLAY_MS", "0"))
+
+class StepProgress:
+    """Progress bar advanced by real backend steps instead of timers"""
+
+    def __init__(self, message, total_steps):
+        self.message = message
+        self.total_steps = total_steps
+        self.completed = 0
+        self._bar = None
+
+    def __enter__(self):
+        self._bar = st.progress(0, text=self.message)
+        return self
+
+    def step(self, label):
+        """Show that the next backend step has started"""
+        self._bar.progress(
+            min(self.completed / self.total_steps, 1.0),
+            text=f"{self.message} {label}"
+        )
+        self.completed += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._bar.empty()
+        return False
+
+def flash(message, celebrate=False):
+    """Queue a message to show after the next rerun without blocking this one"""
+    st.session_state.flash_messages = st.session_state.flash_messages + [
+        {"message": message, "celebrate": celebrate}
+    ]
+
+def render_flash_messages():
+    """Show and clear messages queued by flash()"""
+    messages = st.session_state.flash_messages
+    if not messages:
+        return
+    st.session_state.flash_messages = []
+
+    for item in messages:
+        if item["celebrate"]:
+            show_success_animation()
+        if FLASH_MIN_DISPLAY_MS > 0:
+            st.markdown(
+                render_fragment("flash_banner", message=item["message"], delay_ms=FLASH_MIN_DISPLAY_MS),
+                unsafe_allow_html=True
+            )
+        else:
+            st.toast(item["message"])
 
 def show_success_animation():
     """Show success animation with balloons and confetti"""
     st.balloons()
-    time.sleep(1)
-    
+
     # Custom confetti effect
-    st.markdown("""
-    <div style="text-align: center; padding: 2rem;">
-        <div style="font-size: 4rem; animation: bounce 2s infinite;">🎉</div>
-        <div style="font-size: 2rem; color: #28a745; margin: 1rem 0;">
-            Success!
-        </div>
-    </div>
-    <style>
-    @keyframes bounce {
-        0%, 20%, 50%, 80%, 100% {
-            transform: translateY(0);
-        }
-        40% {
-            transform: translateY(-30px);
-        }
-        60% {
-            transform: translateY(-15px);
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(render_fragment("success"), unsafe_allow_html=True)
 
 # 🔹 Firebase Authentication Functions
-def create_firebase_user(mobile, password):
+@timed(STORAGE_CALLS, "create_firebase_user", failure_result=None)
+def create_firebase_user(mobile, password, uid=None):
     """Create user in Firebase Authentication"""
     try:
-        # In a real app, you'd use phone authentication
-        # For demo purposes, we'll create with email format
-        email = f"{mobile}@agrismart.com"
-        
-        user_record = auth.create_user(
-            email=email,
-            password=password,
-            phone_number=f"+91{mobile}",
-            display_name=f"Farmer {mobile}"
-        )
-        
-        return user_record.uid
+        return get_repository().create_auth_user(uid or uuid.uuid4().hex, mobile, password)
     except Exception as e:
         st.error(f"Firebase Auth error: {e}")
         return None
 
+# Returned when the lookup itself failed, so it is not mistaken for a wrong password
+AUTH_ERROR = object()
+
+@timed(STORAGE_CALLS, "authenticate_firebase_user", failure_result=AUTH_ERROR)
 def authenticate_firebase_user(mobile, password):
-    """Authenticate user using Firebase (simplified for demo)"""
+    """Authenticate user using Firebase (simplified for demo); None for a wrong password, AUTH_ERROR on failure"""
     try:
         # In production, you'd verify the user properly
         # For demo, we'll check if user exists in Firestore
-        doc_ref = db.collection("farmers").document(mobile)
-        doc = doc_ref.get()
+        user_data = get_farmer_document(mobile)
         
-        if doc.exists:
-            user_data = doc.to_dict()
+        if user_data is not None:
             if user_data.get('password') == hash_password(password):
                 return user_data
         return None
+    except StorageUnavailableError:
+        st.warning("📴 Can't reach the server right now. Please try logging in again in a few minutes.")
+        return AUTH_ERROR
     except Exception as e:
         st.error(f"Authentication error: {e}")
+        return AUTH_ERROR
+
+# 🔹 Farmer Profile Cache (read-through, shared by all sessions)
+FARMER_CACHE_SIZE = int(os.getenv("AGRISMART_FARMER_CACHE_SIZE", "10000"))
+FARMER_CACHE_TTL = int(os.getenv("AGRISMART_FARMER_CACHE_TTL", "300"))
+FARMER_CACHE_NEGATIVE_TTL = int(os.getenv("AGRISMART_FARMER_CACHE_NEGATIVE_TTL", "30"))
+
+@st.cache_resource(show_spinner=False)
+def get_farmer_cache():
+    """LRU+TTL cache of farmers/{mobile} documents keyed by mobile number"""
+    return TTLCache(
+        max_size=FARMER_CACHE_SIZE,
+        ttl=FARMER_CACHE_TTL,
+        negative_ttl=FARMER_CACHE_NEGATIVE_TTL
+    )
+
+def queued_farmer_document(mobile, error):
+    """The farmer's queued offline writes while storage is down; raises if nothing is queued"""
+    queued = get_offline_queue().pending_document(mobile)
+    if queued is None:
+        # Not knowing the farmer is not the same as the farmer not existing
+        raise StorageUnavailableError(error)
+    return queued
+
+def get_farmer_document(mobile, fresh=False):
+    """Read farmers/{mobile} through the cache; None if it does not exist.
+
+    fresh=True skips the cached copy (and refreshes it) for checks that must
+    see other workers' recent writes, such as session revocations.  Raises
+    StorageUnavailableError when storage is down and nothing is queued for
+    the number on this host.
+    """
+    cache = get_farmer_cache()
+    cached = None if fresh else cache.get(mobile)
+    if cached is MISSING:
+        return None
+    if cached is not None:
+        return dict(cached)
+
+    repository = get_repository()
+    if not repository.is_available():
+        # Farmers who signed up while offline can still log in on this host
+        return queued_farmer_document(mobile, "Farmer storage is unreachable")
+
+    try:
+        user_data = repository.get_farmer(mobile)
+    except StorageUnavailableError as e:
+        return queued_farmer_document(mobile, str(e))
+    queued = get_offline_queue().pending_document(mobile)
+    if queued is not None:
+        # Not cached: the document changes again when the queue drains
+        return {**(user_data or {}), **queued}
+    if user_data is None:
+        cache.set(mobile, MISSING)
+        return None
+
+    cache.set(mobile, user_data)
+    return dict(user_data)
+
+# 🔹 Write-behind Queue for non-critical profile writes (e.g. last_login)
+PROFILE_FLUSH_INTERVAL = float(os.getenv("AGRISMART_PROFILE_FLUSH_INTERVAL", "5"))
+
+@st.cache_resource(show_spinner=False)
+def get_profile_write_queue():
+    """Background queue that merges farmer updates and writes them in batches"""
+    repository = get_repository()
+    return WriteBehindQueue(
+        repository.batch_update_farmers,
+        flush_interval=PROFILE_FLUSH_INTERVAL,
+        available=repository.is_available
+    )
+
+# 🔹 Persistent Login Sessions (signed cookie, see session_tokens.py)
+@st.cache_resource(show_spinner=False)
+def get_session_tokens():
+    """Token signer and verified-session cache shared by all sessions"""
+    return SessionTokens()
+
+def start_login_session(profile):
+    """Issue a session token and have the browser keep it as a cookie"""
+    token = get_session_tokens().issue(profile)
+    st.session_state.session_token = token
+    st.session_state.session_cookie = cookie_string(token, SESSION_TTL)
+
+def load_session_profile(claims):
+    """Cache-miss path of a returning session: one fresh read of the farmer document.
+
+    None only when the document was read and the farmer is gone or revoked the
+    token.  While storage is down this raises instead, so nothing is cached
+    and the cookie is kept.
+    """
+    # Not from the farmer cache, which could hide a logout on another worker for minutes
+    doc = get_farmer_document(claims.mobile, fresh=True)
+    if doc is None or claims.token_id in (doc.get("revoked_sessions") or {}):
+        return None
+    return FarmerProfile.from_document(claims.mobile, doc)
+
+def restore_login_session():
+    """Log a returning farmer in from their session cookie, once per browser session"""
+    if st.session_state.session_checked or st.session_state.user_logged_in:
+        return
+    st.session_state.session_checked = True
+    try:
+        token = st.context.cookies.get(SESSION_COOKIE)
+    except Exception:
+        return
+    if not token:
+        return
+
+    try:
+        restored = get_session_tokens().resolve(token, load_session_profile)
+    except Exception:
+        # Storage trouble: keep the cookie, show the login as usual and try again next rerun
+        st.session_state.session_checked = False
+        return
+    if restored is None:
+        # Expired, revoked or signed with another key: drop it and show the login as usual
+        st.session_state.session_cookie = cookie_string("", 0)
+        return
+
+    claims, profile = restored
+    st.session_state.user_logged_in = True
+    st.session_state.mobile_number = claims.mobile
+    st.session_state.user_data = profile
+    st.session_state.session_token = token
+    st.session_state.current_screen = "dashboard" if profile.profile_completed else "registration"
+
+def end_login_session():
+    """Revoke the session token and delete the cookie"""
+    st.session_state.session_cookie = cookie_string("", 0)
+    claims = get_session_tokens().revoke(st.session_state.session_token)
+    if claims is None:
+        return
+    try:
+        # Durable record for workers that have not cached this token yet
+        # Fresh, so revocations recorded by other workers are kept
+        doc = get_farmer_document(claims.mobile, fresh=True) or {}
+        now = time.time()
+        revoked = {
+            token_id: expires_at
+            for token_id, expires_at in (doc.get("revoked_sessions") or {}).items()
+            if expires_at > now
+        }
+        revoked[claims.token_id] = claims.expires_at
+        get_repository().update_farmer(claims.mobile, {"revoked_sessions": revoked})
+        get_farmer_cache().invalidate(claims.mobile)
+    except Exception as e:
+        # This worker rejects the token until it expires, but a worker that has
+        # not seen it yet would still accept a copy of it
+        get_session_tokens().revocation_unrecorded(e)
+        flash("⚠️ Logged out on this device, but the server could not record it. "
+              "A copy of this login may keep working on other servers until it expires.")
+
+def render_session_cookie():
+    """Apply the cookie change queued by login or logout in the browser"""
+    cookie = st.session_state.session_cookie
+    if cookie is None:
+        return
+    st.session_state.session_cookie = None
+    st.html(f"<script>document.cookie = {json.dumps(cookie)};</script>", unsafe_allow_javascript=True)
+
+# 🔹 Offline Queue for signups and profile updates while Firestore is unreachable
+@st.cache_resource(show_spinner=False)
+def get_offline_queue():
+    """Durable local queue, synced to the repository in batches when it is back"""
+    return OfflineWriteQueue(get_repository())
+
+def use_offline_queue(repository, mobile):
+    """Queue when the backend is down, or behind this farmer's writes still waiting"""
+    return not repository.is_available() or get_offline_queue().has_pending(mobile)
+
+# 🔹 Login Rate Limiting (shared by all sessions, enforced before any database call)
+LOGIN_MAX_ATTEMPTS = int(os.getenv("AGRISMART_LOGIN_MAX_ATTEMPTS", "5"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("AGRISMART_LOGIN_MAX_ATTEMPTS_PER_IP", "30"))
+LOGIN_LOCKOUT_SECONDS = int(os.getenv("AGRISMART_LOGIN_LOCKOUT_SECONDS", "300"))
+# Reverse proxies in front of the app; each appends one X-Forwarded-For hop
+TRUSTED_PROXIES = int(os.getenv("AGRISMART_TRUSTED_PROXIES", "0"))
+
+@st.cache_resource(show_spinner=False)
+def get_login_limiter():
+    """Token buckets keyed by mobile number and client IP"""
+    return LoginRateLimiter(
+        create_limiter_store(),
+        attempts=LOGIN_MAX_ATTEMPTS,
+        ip_attempts=LOGIN_MAX_ATTEMPTS_PER_IP,
+        lockout_seconds=LOGIN_LOCKOUT_SECONDS
+    )
+
+def get_client_ip():
+    """Client address: the hop added by the outermost trusted proxy, else the connection's.
+
+    Entries left of the trusted hops are written by the client, so they are
+    never used; rotating them must not give an attacker a fresh IP bucket.
+    """
+    try:
+        if TRUSTED_PROXIES:
+            forwarded = st.context.headers.get("X-Forwarded-For")
+            hops = [hop.strip() for hop in forwarded.split(",")] if forwarded else []
+            if hops:
+                return hops[-min(TRUSTED_PROXIES, len(hops))]
+        return st.context.ip_address
+    except Exception:
+        return None
+
+def show_lockout(retry_after):
+    st.error(get_text("max_attempts"))
+    st.info(f"🕐 Please wait {max(1, math.ceil(retry_after / 60))} minutes before trying again")
+
+# 🔹 Farm Statistics (sharded aggregate counters, see farm_stats.py)
+@st.cache_resource(show_spinner=False)
+def get_farm_stats():
+    return FarmStats(get_repository())
+
+@st.cache_resource(show_spinner=False)
+def get_weather_service():
+    """Forecast cache shared by every session, one upstream call per geohash cell"""
+    return WeatherService(create_weather_provider())
+
+@st.cache_resource(show_spinner=False)
+def get_irrigation_scheduler():
+    """Background planner that stores every farmer's irrigation schedule"""
+    from irrigation import IrrigationScheduler
+    return IrrigationScheduler(get_repository(), get_weather_service())
+
+@st.cache_resource(show_spinner=False)
+def get_schedule_cache():
+    """Stored schedules change only when the planner runs; a missing one is retried soon"""
+    return TTLCache(max_size=FARMER_CACHE_SIZE, ttl=600, negative_ttl=15)
+
+def get_irrigation_schedule(mobile):
+    cache = get_schedule_cache()
+    cached = cache.get(mobile)
+    if cached is MISSING:
         return None
+    if cached is not None:
+        return cached
+
+    schedule = get_repository().get_irrigation_schedule(mobile)
+    cache.set(mobile, MISSING if schedule is None else schedule)
+    return schedule
+
+@st.cache_resource(show_spinner=False)
+def get_ndvi_pipeline():
+    """Crop-health results cached per plot and acquisition date for all sessions"""
+    from ndvi import NDVIPipeline
+    return NDVIPipeline()
+
+@st.cache_resource(show_spinner=False)
+def get_activity_log():
+    """Per-farmer event log with batched appends and cached first pages"""
+    return ActivityLog(get_repository())
+
+# 🔹 Dashboard reads (issued together, each with its own deadline)
+@st.cache_resource(show_spinner=False)
+def get_dashboard_loader():
+    """Thread pool shared by every session's dashboard reads"""
+    return DashboardLoader(histogram=DASHBOARD_SOURCES)
+
+def load_dashboard_data(profile):
+    """Start every read the dashboard needs at once; a slow source times out alone"""
+    from ndvi import plot_for_farmer
+    sources = {
+        "activity": partial(get_activity_log().recent, profile.mobile, st.session_state.activity_pages),
+    }
+    plot = plot_for_farmer(profile.mobile, profile)
+    if plot is not None:
+        sources["crop_health"] = partial(get_ndvi_pipeline().health, plot)
+    loader = get_dashboard_loader()
+    if profile.district in KERALA_DISTRICTS:
+        # Shown only after a quick action click, so fill their caches without waiting
+        loader.warm({
+            "weather": partial(get_weather_service().forecast, *KERALA_DISTRICTS[profile.district]),
+            "irrigation": partial(get_irrigation_schedule, profile.mobile),
+        })
+    return loader.load(sources)
+
+# 🔹 Backend warm-up (the first screens render while this runs)
+def warm_backends():
+    """Connect to Firestore and load the NumPy-backed modules before the dashboard needs them"""
+    try:
+        if STORAGE_BACKEND == "firestore":
+            get_firebase_resource().get_client()
+        get_irrigation_scheduler()
+        get_ndvi_pipeline()
+        # Starts draining writes left queued by an earlier run
+        get_offline_queue()
+        # Scoring tables are built at import
+        import crop_recommender  # noqa: F401
+    except Exception:
+        # The first real use retries and reports the error on screen
+        pass
+
+@st.cache_resource(show_spinner=False)
+def start_backend_warmup():
+    """Warm the backends on a daemon thread, once per server process"""
+    thread = threading.Thread(target=warm_backends, name="backend-warmup", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_farm_summary():
+    """Aggregate counts for the admin view; reads one document per shard"""
+    return get_farm_stats().by_dimension()
 
 # 🔹 Database Functions
-def check_user_exists(mobile):
-    """Check if user exists in Firestore"""
-    if db is None:
-        return False
-    
+@timed(STORAGE_CALLS, "create_user_account", failure_result=False)
+def create_user_account(mobile, password, progress=None):
+    """Create user account in both Firebase Auth and Firestore"""
+    repository = get_repository()
+    firebase_uid = uuid.uuid4().hex
+    user_data = {
+        "mobile": mobile,
+        "password": hash_password(password),
+        "firebase_uid": firebase_uid,
+        "created_at": datetime.now(),
+        "profile_completed": False,
+        "last_login": datetime.now()
+    }
+
+    if use_offline_queue(repository, mobile):
+        return create_offline_account(mobile, user_data)
+
     try:
-        doc_ref = db.collection("farmers").document(mobile)
-        doc = doc_ref.get()
-        return doc.exists
+        # create() only succeeds if the document does not exist yet, so the
+        # write itself detects duplicates and a losing concurrent signup for
+        # the same number stops here without reaching Auth
+        if progress:
+            progress.step("💾")
+        try:
+            repository.create_farmer(mobile, user_data)
+        except FarmerExistsError:
+            get_farmer_cache().invalidate(mobile)
+            st.error("❌ " + get_text("account_exists"))
+            return False
+        except StorageUnavailableError:
+            # The connection dropped after the availability check.  Should the
+            # write have landed anyway, the queued signup's uid matches on sync.
+            return create_offline_account(mobile, user_data)
+
+        # Create Firebase Auth user with the uid already stored above
+        if progress:
+            progress.step("🔐")
+        if not create_firebase_user(mobile, password, uid=firebase_uid):
+            # Release the number so the farmer can retry
+            repository.delete_farmer(mobile)
+            get_farmer_cache().invalidate(mobile)
+            return False
+
+        get_farmer_cache().set(mobile, user_data)
+        get_farm_stats().record(None, user_data)
+        st.session_state.user_data = FarmerProfile.from_document(mobile, user_data)
+        st.session_state.firebase_uid = firebase_uid
+        start_login_session(st.session_state.user_data)
+        get_activity_log().record(mobile, activity_log.SIGNUP)
+        return True
     except Exception as e:
-        st.error(f"Database error: {e}")
+        st.error(f"Account creation error: {e}")
         return False
 
-def create_user_account(mobile, password):
-    """Create user account in both Firebase Auth and Firestore"""
-    if db is None:
-        st.error("Database not available")
+def create_offline_account(mobile, user_data):
+    """Accept a signup into the offline queue; Auth and Firestore get it when it syncs"""
+    queue = get_offline_queue()
+    if queue.pending_document(mobile) is not None:
+        st.error("❌ " + get_text("account_exists"))
         return False
-    
+
     try:
-        # Create Firebase Auth user
-        firebase_uid = create_firebase_user(mobile, password)
-        
-        if firebase_uid:
-            # Store user data in Firestore
-            user_data = {
-                "mobile": mobile,
-                "password": hash_password(password),
-                "firebase_uid": firebase_uid,
-                "created_at": datetime.now(),
-                "profile_completed": False,
-                "last_login": datetime.now()
-            }
-            
-            db.collection("farmers").document(mobile).set(user_data)
-            st.session_state.firebase_uid = firebase_uid
-            return True
-        return False
+        # The uid doubles as the idempotency key of the queued signup
+        queue.submit(offline_queue.SIGNUP, mobile, user_data, key=user_data["firebase_uid"])
     except Exception as e:
         st.error(f"Account creation error: {e}")
         return False
 
+    get_farmer_cache().invalidate(mobile)
+    get_farm_stats().record(None, user_data)
+    st.session_state.user_data = FarmerProfile.from_document(mobile, user_data)
+    st.session_state.firebase_uid = user_data["firebase_uid"]
+    start_login_session(st.session_state.user_data)
+    get_activity_log().record(mobile, activity_log.SIGNUP)
+    flash("📴 Saved on this device. Your account will sync when the connection returns.")
+    return True
+
+@timed(STORAGE_CALLS, "update_user_profile", failure_result=False)
 def update_user_profile(mobile, profile_data):
     """Update user profile in Firestore"""
-    if db is None:
-        return False
+    repository = get_repository()
     
     try:
-        doc_ref = db.collection("farmers").document(mobile)
+        # Previous values (usually cached) let the statistics move buckets
+        try:
+            old_doc = get_farmer_document(mobile)
+        except StorageUnavailableError:
+            # Offline: the session's profile stands in for the stored document
+            profile = st.session_state.get("user_data")
+            old_doc = profile.to_dict() if profile is not None else None
         profile_data.update({
             "profile_completed": True,
             "updated_at": datetime.now()
         })
-        doc_ref.update(profile_data)
+        queued = use_offline_queue(repository, mobile)
+        if not queued:
+            try:
+                repository.update_farmer(mobile, profile_data)
+            except StorageUnavailableError:
+                # The connection dropped after the availability check
+                queued = True
+        if queued:
+            get_offline_queue().submit(offline_queue.PROFILE_UPDATE, mobile, profile_data)
+            flash("📴 Profile saved on this device. It will sync when the connection returns.")
+        get_farmer_cache().invalidate(mobile)
+        merged = {**(old_doc or {}), **profile_data}
+        get_farm_stats().record(old_doc, merged)
+        # Replan off the Streamlit thread so the new profile gets a schedule soon
+        get_irrigation_scheduler().request(mobile, merged)
+        if not (old_doc or {}).get("profile_completed"):
+            get_activity_log().record(mobile, activity_log.PROFILE_COMPLETED)
         return True
     except Exception as e:
         st.error(f"Profile update error: {e}")
         return False
 
 # 🔹 Enhanced Splash Screen
+@timed(SCREEN_RENDERS, "splash")
 def splash_screen():
-    st.markdown("""
-    <div style="text-align: center; padding: 3rem; background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); border-radius: 15px; margin: 2rem 0;">
-        <div style="animation: fadeIn 2s;">
-            <h1 style="color: white; font-size: 4rem; margin-bottom: 1rem; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">
-                🌾 AgriSmart
-            </h1>
-            <p style="font-size: 1.5rem; color: #f8f9fa; margin-bottom: 2rem; text-shadow: 1px 1px 2px rgba(0,0,0,0.3);">
-                Smart Agriculture Solutions for Modern Farmers
-            </p>
-            <div style="font-size: 3rem; margin: 2rem 0; animation: bounce 2s infinite;">
-                🚜🌱🌾
-            </div>
-        </div>
-    </div>
-    
-    <style>
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(-20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    @keyframes bounce {
-        0%, 20%, 50%, 80%, 100% { transform: translateY(0); }
-        40% { transform: translateY(-30px); }
-        60% { transform: translateY(-15px); }
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(render_fragment("splash_hero"), unsafe_allow_html=True)
 
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         st.markdown("### 🌍 " + get_text("select_language"))
         language = st.selectbox(
             "", 
-            options=["English", "മലയാളം"], 
+            options=LANGUAGE_NAMES, 
             index=0, 
             key="language_selector"
         )
         
         if st.button(get_text("get_started"), use_container_width=True, type="primary"):
             st.session_state.language = language
-            with st.spinner("Loading AgriSmart..."):
-                time.sleep(1.5)
             st.session_state.current_screen = "auth"
             st.rerun()
 
 # 🔹 Enhanced Authentication Screen
+@timed(SCREEN_RENDERS, "auth")
 def auth_screen():
-    st.markdown(f"""
-    <div style="text-align: center; margin-bottom: 2rem;">
-        <h1 style="color: #2E7D32; text-shadow: 2px 2px 4px rgba(0,0,0,0.1);">
-            🌾 {get_text("app_name")}
-        </h1>
-        <p style="color: #666; font-size: 1.1rem;">{get_text("tagline")}</p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(render_fragment("auth_header"), unsafe_allow_html=True)
 
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        # Animated tabs
-        st.markdown("""
-        <style>
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 2px;
-        }
-        .stTabs [data-baseweb="tab"] {
-            border-radius: 10px 10px 0 0;
-            padding: 10px 20px;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-        
         login_tab, signup_tab = st.tabs([
             f"🔑 {get_text('login')}", 
             f"🆕 {get_text('signup')}"
@@ -397,9 +693,11 @@ def auth_screen():
 def enhanced_login_form():
     st.markdown("### 👋 " + get_text("welcome_back"))
     
-    if st.session_state.login_attempts >= 5:
-        st.error(get_text("max_attempts"))
-        st.info("🕐 Please wait 5 minutes before trying again")
+    limiter = get_login_limiter()
+    client_ip = get_client_ip()
+    retry_after = limiter.ip_retry_after(client_ip)
+    if retry_after > 0:
+        show_lockout(retry_after)
         return
     
     with st.form("login_form", clear_on_submit=True):
@@ -434,29 +732,46 @@ def enhanced_login_form():
                 st.error("❌ " + get_text("invalid_password"))
                 return
             
-            # Show loading animation
-            with st.spinner(get_text("logging_in")):
-                time.sleep(1.5)  # Simulate processing time
-                
+            # Rejected attempts never reach the database
+            allowed, retry_after = limiter.acquire(mobile, client_ip)
+            if not allowed:
+                show_lockout(retry_after)
+                return
+            
+            # Progress follows the real backend steps
+            with StepProgress(get_text("logging_in"), total_steps=1) as progress:
+                progress.step("🔍")
                 user_data = authenticate_firebase_user(mobile, password)
+                if user_data is AUTH_ERROR:
+                    # Already reported; the password was never checked, so the attempt is free
+                    limiter.refund(mobile, client_ip)
+                    return
                 
                 if user_data:
-                    st.success("✅ Login Successful!")
+                    limiter.succeeded(mobile, client_ip)
                     
                     # Update session state
                     st.session_state.user_logged_in = True
                     st.session_state.mobile_number = mobile
-                    st.session_state.user_data = user_data
-                    st.session_state.login_attempts = 0
+                    # Only the projected profile lives in the session, never the password hash
+                    st.session_state.user_data = FarmerProfile.from_document(mobile, user_data)
                     st.session_state.firebase_uid = user_data.get('firebase_uid', '')
+                    # Next visits from this browser skip the password check
+                    start_login_session(st.session_state.user_data)
                     
-                    # Update last login
-                    if db:
-                        db.collection("farmers").document(mobile).update({
-                            "last_login": datetime.now()
-                        })
+                    # Update last login in the background; the user never sees it
+                    last_login = datetime.now()
+                    if get_offline_queue().has_pending(mobile):
+                        # The document may not exist until the farmer's offline signup syncs
+                        get_offline_queue().submit(offline_queue.PROFILE_UPDATE, mobile, {"last_login": last_login})
+                    else:
+                        get_profile_write_queue().enqueue(mobile, {"last_login": last_login})
+                    # Keep the cached document current instead of re-reading it
+                    user_data["last_login"] = last_login
+                    get_farmer_cache().set(mobile, dict(user_data))
+                    get_activity_log().record(mobile, activity_log.LOGIN)
                     
-                    show_success_animation()
+                    flash("✅ Login Successful!", celebrate=True)
                     
                     # Navigate to appropriate screen
                     if user_data.get("profile_completed", False):
@@ -466,11 +781,10 @@ def enhanced_login_form():
                     
                     st.rerun()
                 else:
-                    st.session_state.login_attempts += 1
                     st.error("❌ " + get_text("login_failed"))
                     
                     # Show remaining attempts
-                    remaining = 5 - st.session_state.login_attempts
+                    remaining = limiter.remaining(mobile)
                     if remaining > 0:
                         st.warning(f"⚠️ {remaining} attempts remaining")
 
@@ -502,14 +816,10 @@ def enhanced_signup_form():
         if password:
             strength = calculate_password_strength(password)
             color = "#dc3545" if strength < 3 else "#ffc107" if strength < 5 else "#28a745"
-            st.markdown(f"""
-            <div style="margin: 10px 0;">
-                <small>Password Strength: </small>
-                <div style="background: #e9ecef; height: 8px; border-radius: 4px;">
-                    <div style="background: {color}; height: 8px; width: {strength * 20}%; border-radius: 4px; transition: width 0.3s;"></div>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(
+                render_fragment("password_strength", color=color, width=strength * 20),
+                unsafe_allow_html=True
+            )
         
         signup_button = st.form_submit_button(
             get_text("signup_button"), 
@@ -530,27 +840,17 @@ def enhanced_signup_form():
                 st.error("❌ " + get_text("passwords_dont_match"))
                 return
             
-            if check_user_exists(mobile):
-                st.error("❌ " + get_text("account_exists"))
-                return
-            
-            # Show loading animation
-            with st.spinner(get_text("creating_account")):
-                show_loading_animation("Creating your account")
-                
-                if create_user_account(mobile, password):
-                    st.success("🎉 " + get_text("account_created"))
-                    
+            # Progress follows the real backend steps; duplicates are
+            # detected by the account write itself, not by a pre-read
+            with StepProgress(get_text("creating_account"), total_steps=2) as progress:
+                if create_user_account(mobile, password, progress=progress):
                     # Update session state
                     st.session_state.user_logged_in = True
                     st.session_state.mobile_number = mobile
                     st.session_state.temp_mobile = mobile
-                    st.session_state.temp_password = password
-                    
-                    show_success_animation()
                     
-                    st.info("👨‍🌾 Let's complete your farmer profile!")
-                    time.sleep(2)
+                    flash("🎉 " + get_text("account_created"), celebrate=True)
+                    flash("👨‍🌾 Let's complete your farmer profile!")
                     
                     st.session_state.current_screen = "registration"
                     st.rerun()
@@ -566,13 +866,10 @@ def calculate_password_strength(password):
     return score
 
 # 🔹 Enhanced Registration Screen
+@timed(SCREEN_RENDERS, "registration")
 def registration_screen():
-    st.markdown(f"""
-    <div style="text-align: center; margin-bottom: 2rem;">
-        <h1 style="color: #2E7D32;">🌾 {get_text("app_name")}</h1>
-        <h3 style="color: #666;">👨‍🌾 {get_text("registration")}</h3>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(render_fragment("registration_header"), unsafe_allow_html=True)
+    profile = st.session_state.user_data
     
     current_season = detect_season()
     st.info(f"🌱 **{get_text('season_detected')}:** {current_season}")
@@ -586,42 +883,41 @@ def registration_screen():
         with col1:
             farmer_name = st.text_input(
                 "👤 " + get_text("farmer_name"), 
-                value=st.session_state.user_data.get("name", ""),
+                value=profile.name or "",
                 help="Enter your full name"
             )
             
             land_size = st.number_input(
                 "🚜 " + get_text("land_size"), 
-                min_value=0.1, 
-                max_value=1000.0, 
+                min_value=MIN_LAND_SIZE, 
+                max_value=MAX_LAND_SIZE, 
                 step=0.1, 
                 format="%.1f",
-                value=st.session_state.user_data.get("land_size", 1.0),
+                value=profile.land_size or 1.0,
                 help="Total land area you cultivate"
             )
         
         with col2:
-            soil_types = ["Clay", "Sandy", "Loamy", "Silt", "Peaty", "Chalky"]
             soil_type = st.selectbox(
                 "🏔️ " + get_text("soil_type"), 
-                soil_types,
-                index=soil_types.index(st.session_state.user_data.get("soil_type", "Loamy")),
+                SOIL_TYPES,
+                index=SOIL_TYPES.index(profile.soil_type or "Loamy"),
                 help="Select your predominant soil type"
             )
             
-            kerala_crops = [
-                "Coconut", "Rubber", "Tea", "Coffee", "Arecanut",
-                "Rice (Paddy)", "Banana", "Plantain", "Cassava (Tapioca)", 
-                "Black Pepper", "Cardamom", "Clove", "Nutmeg",
-                "Jackfruit", "Mango", "Pineapple", "Papaya",
-                "Sugarcane", "Cocoa", "Cashew"
-            ]
-            
             previous_crop = st.selectbox(
                 "🌾 " + get_text("previous_crop"), 
-                ["None"] + sorted(kerala_crops),
+                ["None"] + sorted(KERALA_CROPS),
                 help="What did you grow last season?"
             )
+            
+            districts = list(KERALA_DISTRICTS)
+            district = st.selectbox(
+                "📍 " + get_text("district"),
+                districts,
+                index=districts.index(profile.district) if profile.district in KERALA_DISTRICTS else None,
+                help="Used for your local weather forecast"
+            )
         
         st.markdown("---")
         
@@ -635,68 +931,44 @@ def registration_screen():
             if farmer_name and land_size > 0:
                 progress.progress(1.0, text="Profile completion: 100%")
                 
-                with st.spinner(get_text("updating_profile")):
-                    show_loading_animation("Setting up your profile")
-                    
-                    profile_data = {
-                        "name": farmer_name,
-                        "land_size": land_size,
-                        "soil_type": soil_type,
-                        "previous_crop": previous_crop if previous_crop != "None" else None,
-                        "season": current_season,
-                        "registration_completed_at": datetime.now()
-                    }
+                with StepProgress(get_text("updating_profile"), total_steps=1) as step_progress:
+                    step_progress.step("💾")
+                    profile_data = build_profile(
+                        farmer_name, land_size, soil_type, previous_crop, current_season, district
+                    )
                     
                     if update_user_profile(st.session_state.mobile_number, profile_data):
-                        st.success("🎊 " + get_text("profile_updated"))
-                        st.session_state.user_data.update(profile_data)
-                        
-                        # Show celebration
-                        show_success_animation()
+                        st.session_state.user_data = profile.merged(profile_data)
+                        get_session_tokens().refresh(st.session_state.session_token, st.session_state.user_data)
                         
-                        st.markdown(f"""
-                        <div style="text-align: center; padding: 2rem; background: linear-gradient(135deg, #28a745, #20c997); border-radius: 15px; color: white; margin: 2rem 0;">
-                            <h2>🎉 {get_text("success_message")}</h2>
-                            <p>Welcome to the AgriSmart community, {farmer_name}!</p>
-                        </div>
-                        """, unsafe_allow_html=True)
+                        # Celebrate on the dashboard instead of holding this rerun
+                        flash("🎊 " + get_text("profile_updated"), celebrate=True)
+                        flash(f"🎉 {get_text('success_message')} Welcome to the AgriSmart community, {farmer_name}!")
                         
-                        time.sleep(3)
                         st.session_state.current_screen = "dashboard"
                         st.rerun()
             else:
                 st.error("❌ " + get_text("fill_required"))
 
 # 🔹 Enhanced Dashboard Screen
+@timed(SCREEN_RENDERS, "dashboard")
 def dashboard_screen():
     # Header with logout
     col1, col2 = st.columns([4, 1])
     with col1:
-        st.markdown(f"""
-        <h1 style="color: #2E7D32; margin-bottom: 0;">
-            🌾 {get_text('app_name')} - {get_text('dashboard')}
-        </h1>
-        """, unsafe_allow_html=True)
+        st.markdown(render_fragment("dashboard_header"), unsafe_allow_html=True)
     with col2:
         if st.button("🚪 " + get_text("logout"), type="secondary", use_container_width=True):
             logout()
 
-    user_name = st.session_state.user_data.get("name", "Farmer")
+    profile = st.session_state.user_data
+    user_name = profile.name or "Farmer"
     
     # Welcome message with animation
-    st.markdown(f"""
-    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                padding: 2rem; border-radius: 15px; margin: 1rem 0; text-align: center;">
-        <h2 style="color: white; margin-bottom: 1rem;">
-            🌟 {get_text('welcome_back')}, {user_name}! 👋
-        </h2>
-        <p style="color: #f8f9fa; font-size: 1.1rem;">
-            Ready to make your farming smarter today?
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(render_fragment("welcome_banner", user_name=user_name), unsafe_allow_html=True)
 
     current_season = detect_season()
+    dashboard_data = load_dashboard_data(profile)
     
     # Enhanced Dashboard cards with animations
     st.markdown("### 📊 Your Farm Overview")
@@ -704,87 +976,110 @@ def dashboard_screen():
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown("""
-        <div style="background: linear-gradient(135deg, #28a745, #20c997); 
-                    padding: 1.5rem; border-radius: 10px; text-align: center; color: white;">
-            <div style="font-size: 2rem; margin-bottom: 0.5rem;">🌱</div>
-            <h4 style="margin: 0; color: white;">Current Season</h4>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem;">{}</p>
-            <small style="opacity: 0.8;">Active Now</small>
-        </div>
-        """.format(current_season), unsafe_allow_html=True)
+        st.markdown(render_fragment(
+            "overview_card", gradient="#28a745, #20c997", icon="🌱",
+            title="Current Season", value=current_season, caption="Active Now"
+        ), unsafe_allow_html=True)
     
     with col2:
-        land_size = st.session_state.user_data.get('land_size', 0)
-        st.markdown(f"""
-        <div style="background: linear-gradient(135deg, #fd7e14, #ffc107); 
-                    padding: 1.5rem; border-radius: 10px; text-align: center; color: white;">
-            <div style="font-size: 2rem; margin-bottom: 0.5rem;">🚜</div>
-            <h4 style="margin: 0; color: white;">Land Size</h4>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem;">{land_size} acres</p>
-            <small style="opacity: 0.8;">Registered</small>
-        </div>
-        """, unsafe_allow_html=True)
+        land_size = profile.land_size or 0
+        st.markdown(render_fragment(
+            "overview_card", gradient="#fd7e14, #ffc107", icon="🚜",
+            title="Land Size", value=f"{land_size} acres", caption="Registered"
+        ), unsafe_allow_html=True)
     
     with col3:
-        soil_type = st.session_state.user_data.get('soil_type', 'Unknown')
-        st.markdown(f"""
-        <div style="background: linear-gradient(135deg, #6f42c1, #e83e8c); 
-                    padding: 1.5rem; border-radius: 10px; text-align: center; color: white;">
-            <div style="font-size: 2rem; margin-bottom: 0.5rem;">🌾</div>
-            <h4 style="margin: 0; color: white;">Soil Type</h4>
-            <p style="margin: 0.5rem 0 0 0; font-size: 1.1rem;">{soil_type}</p>
-            <small style="opacity: 0.8;">Identified</small>
-        </div>
-        """, unsafe_allow_html=True)
-
-    # Quick Actions Section
+        soil_type = profile.soil_type or "Unknown"
+        st.markdown(render_fragment(
+            "overview_card", gradient="#6f42c1, #e83e8c", icon="🌾",
+            title="Soil Type", value=soil_type, caption="Identified"
+        ), unsafe_allow_html=True)
+
+    # Panels with their own widgets are fragments: clicking in one reruns
+    # only that panel, not the cards above or main()
+    quick_actions_panel(profile, current_season)
+
+    # Profile section with enhanced styling
+    st.markdown("### 👤 " + get_text("my_profile"))
+    
+    with st.expander("📋 View Profile Details", expanded=False):
+        profile_data = {
+            "👤 Name": profile.name,
+            "📱 Mobile": profile.mobile,
+            "📍 District": profile.district or 'Not set',
+            "🚜 Land Size": f"{profile.land_size} acres",
+            "🌾 Soil Type": profile.soil_type,
+            "🌱 Previous Crop": profile.previous_crop or 'None',
+            "🗓️ Current Season": current_season,
+            "📅 Member Since": profile.created_at or 'N/A'
+        }
+        
+        for key, value in profile_data.items():
+            st.markdown(f"**{key}:** {value}")
+    
+    show_crop_health(profile, dashboard_data)
+    
+    activity_panel(profile.mobile, dashboard_data)
+
+    # Footer
+    st.markdown("---")
+    st.markdown(render_fragment("footer"), unsafe_allow_html=True)
+
+@st.fragment
+def quick_actions_panel(profile, current_season):
+    """Quick action buttons and the panel they open"""
     st.markdown("### 🚀 Quick Actions")
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        if st.button("🌡️\nWeather", use_container_width=True):
-            st.info("🌤️ Weather feature coming soon!")
+        show_weather = st.button("🌡️\nWeather", use_container_width=True)
     
     with col2:
-        if st.button("💧\nIrrigation", use_container_width=True):
-            st.info("💦 Irrigation management coming soon!")
+        show_irrigation = st.button("💧\nIrrigation", use_container_width=True)
     
     with col3:
-        if st.button("🌱\nCrop Guide", use_container_width=True):
-            st.info("📚 Crop recommendations coming soon!")
+        show_crop_guide = st.button("🌱\nCrop Guide", use_container_width=True)
     
     with col4:
         if st.button("📱\nSupport", use_container_width=True):
             st.info("🎧 24/7 Support: +91-1800-AGRI-HELP")
 
-    # Profile section with enhanced styling
-    st.markdown("### 👤 " + get_text("my_profile"))
-    
-    with st.expander("📋 View Profile Details", expanded=False):
-        profile_data = {
-            "👤 Name": st.session_state.user_data.get("name"),
-            "📱 Mobile": st.session_state.mobile_number,
-            "🚜 Land Size": f"{st.session_state.user_data.get('land_size')} acres",
-            "🌾 Soil Type": st.session_state.user_data.get('soil_type'),
-            "🌱 Previous Crop": st.session_state.user_data.get('previous_crop', 'None'),
-            "🗓️ Current Season": current_season,
-            "📅 Member Since": st.session_state.user_data.get('created_at', 'N/A')
-        }
-        
-        for key, value in profile_data.items():
-            st.markdown(f"**{key}:** {value}")
-    
-    # Recent Activity Section
+    if show_weather:
+        show_weather_forecast(profile.district)
+
+    if show_irrigation:
+        show_irrigation_schedule(profile)
+
+    if show_crop_guide:
+        st.markdown("#### 🌱 Recommended Crops")
+        from crop_recommender import recommend as recommend_crops
+        recommendations = recommend_crops(profile, current_season)
+        for crop, score in recommendations:
+            st.progress(score / 100, text=f"{crop} — {score:.0f}/100")
+        get_activity_log().record(
+            profile.mobile, activity_log.RECOMMENDATIONS_VIEWED, top_crop=recommendations[0][0]
+        )
+
+@st.fragment
+def activity_panel(mobile, dashboard_data):
+    """Recent Activity feed; paging reruns only this panel"""
     st.markdown("### 📈 Recent Activity")
     
-    # Sample activity data
-    activities = [
-        {"icon": "🌱", "action": "Profile completed", "time": "Today", "status": "success"},
-        {"icon": "🔐", "action": "Account created", "time": "Today", "status": "success"},
-        {"icon": "👋", "action": "Welcome to AgriSmart!", "time": "Today", "status": "info"}
-    ]
+    # Newest pages of the farmer's log; each page is a bounded read
+    try:
+        events, older_cursor = dashboard_data.value(
+            "activity", lambda: get_activity_log().recent(mobile, st.session_state.activity_pages)
+        )
+    except StorageUnavailableError:
+        st.info("📴 Your activity will appear here when the connection returns.")
+        return
+    except TimeoutError:
+        st.info("⏳ Your activity is taking longer than usual to load. It will show on your next visit.")
+        return
+    activities = [describe_activity(event) for event in events]
+    if older_cursor is None:
+        activities.append({"icon": "👋", "action": "Welcome to AgriSmart!", "time": "", "status": "info"})
     
     for activity in activities:
         status_color = {
@@ -793,40 +1088,139 @@ def dashboard_screen():
             "warning": "#ffc107"
         }.get(activity["status"], "#6c757d")
         
-        st.markdown(f"""
-        <div style="background: #f8f9fa; padding: 1rem; border-radius: 8px; 
-                    margin: 0.5rem 0; border-left: 4px solid {status_color};">
-            <div style="display: flex; align-items: center;">
-                <span style="font-size: 1.5rem; margin-right: 1rem;">{activity["icon"]}</span>
-                <div>
-                    <strong>{activity["action"]}</strong>
-                    <br><small style="color: #6c757d;">{activity["time"]}</small>
-                </div>
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(render_fragment(
+            "activity_item", status_color=status_color, icon=activity["icon"],
+            action=activity["action"], time=activity["time"]
+        ), unsafe_allow_html=True)
+    
+    if older_cursor is not None and st.button("⬇️ Show older activity", use_container_width=True):
+        st.session_state.activity_pages += 1
+        st.rerun(scope="fragment")
 
-    # Footer
-    st.markdown("---")
-    st.markdown("""
-    <div style="text-align: center; color: #6c757d; padding: 2rem 0;">
-        <p>🌾 <strong>AgriSmart</strong> - Empowering Farmers with Technology</p>
-        <p><small>Made with ❤️ for Indian Farmers | Version 2.0</small></p>
-    </div>
-    """, unsafe_allow_html=True)
+ACTIVITY_DISPLAY = {
+    activity_log.SIGNUP: ("🔐", "Account created", "success"),
+    activity_log.PROFILE_COMPLETED: ("🌱", "Profile completed", "success"),
+    activity_log.LOGIN: ("🔑", "Logged in", "info"),
+    activity_log.RECOMMENDATIONS_VIEWED: ("📚", "Viewed crop recommendations", "info"),
+}
+
+def describe_activity(event):
+    """activity_item values for one logged event"""
+    icon, action, status = ACTIVITY_DISPLAY.get(event["kind"], ("📌", event["kind"], "info"))
+    if event.get("top_crop"):
+        action = f"{action} (top: {event['top_crop']})"
+    at = event["at"]
+    days_ago = (datetime.now().date() - at.date()).days
+    when = "Today" if days_ago == 0 else "Yesterday" if days_ago == 1 else at.strftime("%d %b %Y")
+    return {"icon": icon, "action": action, "time": f"{when}, {at:%H:%M}", "status": status}
+
+def show_weather_forecast(district):
+    """Current conditions and the daily forecast for the farmer's district"""
+    if district not in KERALA_DISTRICTS:
+        st.info("📍 Add your district to your profile to see your local weather forecast.")
+        return
+    try:
+        forecast = get_weather_service().forecast(*KERALA_DISTRICTS[district])
+    except WeatherUnavailableError:
+        st.warning("🌤️ The weather forecast is unavailable right now. Please try again shortly.")
+        return
+
+    st.markdown(f"#### 🌤️ Weather in {district}")
+    current = forecast["current"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("🌡️ Temperature", f"{current['temperature_c']:.1f} °C")
+    col2.metric("💧 Humidity", f"{current['humidity']}%")
+    col3.metric("🌧️ Rain", f"{current['rain_mm']} mm")
+    col4.metric("💨 Wind", f"{current['wind_kmh']} km/h")
+    st.dataframe(
+        [
+            {"Date": day["date"], "Min °C": day["min_c"], "Max °C": day["max_c"],
+             "Rain mm": day["rain_mm"], "Rain chance %": day["rain_probability"]}
+            for day in forecast["daily"]
+        ],
+        hide_index=True, use_container_width=True
+    )
+    updated = forecast["fetched_at"].strftime("%H:%M")
+    st.caption(f"Updated {updated}" + (" · refreshing…" if forecast["stale"] else ""))
+
+def show_irrigation_schedule(profile):
+    """Precomputed schedule from the irrigation planner; nothing is computed here"""
+    from irrigation import current_schedule
+    try:
+        schedule = get_irrigation_schedule(profile.mobile)
+    except Exception:
+        schedule = None
+    if schedule is not None:
+        schedule = current_schedule(schedule)
+        if schedule["stale"]:
+            # Made from an older forecast: replan now and read the new one next time
+            get_schedule_cache().invalidate(profile.mobile)
+            try:
+                get_irrigation_scheduler().request(profile.mobile, get_farmer_document(profile.mobile))
+            except Exception:
+                pass
+    if schedule is None or not schedule["days"]:
+        if profile.district in KERALA_DISTRICTS:
+            st.info("💦 Your irrigation schedule is being prepared. Please check back shortly.")
+        else:
+            st.info("📍 Add your district to your profile to get an irrigation schedule.")
+        return
+
+    if schedule["stale"]:
+        st.caption("⏳ This plan is from an older forecast; an updated one is being prepared.")
+    st.markdown(f"#### 💧 Irrigation Plan ({schedule['crop'] or 'General crop'})")
+    st.dataframe(
+        [
+            {"Date": day["date"], "Crop water use mm": day["et_mm"], "Rain mm": day["rain_mm"],
+             "Irrigate mm": day["irrigation_mm"], "Litres": day["litres"]}
+            for day in schedule["days"]
+        ],
+        hide_index=True, use_container_width=True
+    )
+    if schedule["total_litres"]:
+        st.caption(f"Total water to apply: {schedule['total_litres']:,} litres")
+    else:
+        st.caption("No irrigation needed: forecast rain covers your crop's water use")
+
+def show_crop_health(profile, dashboard_data):
+    """NDVI summary of the farmer's plot (or, without its location, the district) from the latest pass"""
+    st.markdown("### 🛰️ Crop Health")
+    from ndvi import plot_for_farmer
+    plot = plot_for_farmer(profile.mobile, profile)
+    if plot is None:
+        st.info("📍 Add your district to your profile to see satellite crop health.")
+        return
+    try:
+        health = dashboard_data.value("crop_health", lambda: get_ndvi_pipeline().health(plot))
+    except TimeoutError:
+        st.caption("⏳ Satellite analysis for your plot is still running. Check back in a moment.")
+        return
+    if health is None:
+        st.caption("Satellite imagery is not available for your area yet.")
+        return
+
+    if plot.district:
+        st.warning(
+            f"📍 District-level view around the {plot.district} district centre, not your own plot. "
+            "Plot-level crop health needs your plot's location, which is not on your profile yet."
+        )
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🌿 District Vegetation" if plot.district else "🌿 Crop Health", health["health"])
+    col2.metric("📈 Average NDVI", f"{health['mean']:.2f}")
+    col3.metric("✅ Healthy Area", f"{health['healthy_share']:.0%}")
+    area = f"around the {plot.district} district centre" if plot.district else "over your plot"
+    st.caption(f"Satellite pass of {health['date']} · {health['pixels']} pixels {area}")
 
 def logout():
     """Enhanced logout with confirmation"""
     if st.session_state.get('user_logged_in', False):
-        # Show logout animation
-        st.info("👋 Logging out...")
-        with st.spinner("Saving your session..."):
-            time.sleep(1)
+        end_login_session()
         
         # Clear user session
         keys_to_clear = [
             "user_logged_in", "mobile_number", "user_data", 
-            "firebase_uid", "registration_step", "temp_mobile", "temp_password"
+            "firebase_uid", "registration_step", "temp_mobile", "temp_password", "activity_pages",
+            "session_token"
         ]
         
         for key in keys_to_clear:
@@ -834,176 +1228,12 @@ def logout():
                 del st.session_state[key]
         
         st.session_state.current_screen = "splash"
-        st.success("✅ Logged out successfully!")
-        time.sleep(1)
+        flash("✅ Logged out successfully!")
         st.rerun()
 
 # 🔹 Main App with Enhanced Styling
-def main():
-    st.set_page_config(
-        page_title="AgriSmart - Smart Agriculture App", 
-        page_icon="🌾", 
-        layout="centered", 
-        initial_sidebar_state="collapsed"
-    )
-
-    # Enhanced CSS styling
-    st.markdown("""
-    <style>
-    /* Import Google Fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-    
-    /* Global Styles */
-    .stApp {
-        font-family: 'Inter', sans-serif;
-        background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-        min-height: 100vh;
-    }
-    
-    /* Button Enhancements */
-    .stButton > button {
-        border-radius: 25px;
-        border: none;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 12px rgba(0,0,0,0.2);
-    }
-    
-    .stButton > button[kind="primary"] {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    }
-    
-    .stButton > button[kind="primary"]:hover {
-        background: linear-gradient(135deg, #5a6fd8 0%, #6a4190 100%);
-    }
-    
-    /* Form Enhancements */
-    .stTextInput > div > div > input {
-        border-radius: 10px;
-        border: 2px solid #e9ecef;
-        padding: 0.75rem;
-        transition: border-color 0.3s ease;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 0.2rem rgba(102, 126, 234, 0.25);
-    }
-    
-    .stSelectbox > div > div > select {
-        border-radius: 10px;
-        border: 2px solid #e9ecef;
-    }
-    
-    .stNumberInput > div > div > input {
-        border-radius: 10px;
-        border: 2px solid #e9ecef;
-    }
-    
-    /* Tab Enhancements */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-        background: rgba(255,255,255,0.1);
-        padding: 4px;
-        border-radius: 12px;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        border-radius: 8px;
-        padding: 12px 24px;
-        font-weight: 600;
-        transition: all 0.3s ease;
-    }
-    
-    .stTabs [data-baseweb="tab"][aria-selected="true"] {
-        background: white;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-    }
-    
-    /* Success/Error Message Enhancements */
-    .stSuccess {
-        border-radius: 10px;
-        border: none;
-        box-shadow: 0 2px 8px rgba(40, 167, 69, 0.2);
-    }
-    
-    .stError {
-        border-radius: 10px;
-        border: none;
-        box-shadow: 0 2px 8px rgba(220, 53, 69, 0.2);
-    }
-    
-    .stInfo {
-        border-radius: 10px;
-        border: none;
-        box-shadow: 0 2px 8px rgba(23, 162, 184, 0.2);
-    }
-    
-    /* Progress Bar Enhancement */
-    .stProgress > div > div > div > div {
-        background: linear-gradient(90deg, #28a745, #20c997);
-        border-radius: 10px;
-    }
-    
-    /* Metric Cards */
-    [data-testid="metric-container"] {
-        border-radius: 15px;
-        padding: 1rem;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        border: 1px solid rgba(255,255,255,0.2);
-    }
-    
-    /* Hide Streamlit Branding */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-    
-    /* Animation Classes */
-    .fade-in {
-        animation: fadeIn 1s ease-in;
-    }
-    
-    @keyframes fadeIn {
-        from { opacity: 0; transform: translateY(20px); }
-        to { opacity: 1; transform: translateY(0); }
-    }
-    
-    .bounce {
-        animation: bounce 2s infinite;
-    }
-    
-    @keyframes bounce {
-        0%, 20%, 50%, 80%, 100% { transform: translateY(0); }
-        40% { transform: translateY(-30px); }
-        60% { transform: translateY(-15px); }
-    }
-    
-    /* Mobile Responsiveness */
-    @media (max-width: 768px) {
-        .stApp {
-            padding: 1rem;
-        }
-        
-        h1 {
-            font-size: 2rem !important;
-        }
-        
-        .stButton > button {
-            padding: 0.5rem 1rem;
-        }
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-    initialize_session_state()
-
-    # Route to appropriate screen with transition effects
+def route_screen():
+    """Route to appropriate screen with transition effects"""
     if st.session_state.current_screen == "splash":
         splash_screen()
     elif st.session_state.current_screen == "auth":
@@ -1021,6 +1251,36 @@ def main():
             st.session_state.current_screen = "auth"
             st.rerun()
 
+def main():
+    st.set_page_config(
+        page_title="AgriSmart - Smart Agriculture App", 
+        page_icon="🌾", 
+        layout="centered", 
+        initial_sidebar_state="collapsed"
+    )
+
+    show_connection_banner()
+
+    # Enhanced CSS styling, served once from static/ and cached by the browser
+    inject_stylesheet()
+
+    initialize_session_state()
+    # A returning farmer with a valid session cookie goes straight to their screen
+    restore_login_session()
+    render_flash_messages()
+    render_session_cookie()
+    # The first session starts the metrics endpoint and warms the backends (irrigation
+    # planner included) without holding up the splash and login screens
+    get_metrics_server()
+    start_backend_warmup()
+
+    # Developer Mode can profile this session's next reruns
+    profiler = st.session_state.profiler
+    if profiler is not None and profiler.remaining:
+        profiler.run(st.session_state.current_screen, route_screen)
+    else:
+        route_screen()
+
     # Enhanced Debug Panel
     if st.checkbox("🐛 Developer Mode", help="Show debug information"):
         with st.sidebar:
@@ -1032,33 +1292,147 @@ def main():
                 "User Logged In": st.session_state.user_logged_in,
                 "Mobile Number": st.session_state.mobile_number,
                 "Firebase UID": st.session_state.get('firebase_uid', 'None'),
-                "Database Status": "✅ Connected" if db else "❌ Disconnected",
+                "Database Status": "✅ Connected" if get_repository().is_available() else "❌ Disconnected",
+                "Storage Backend": get_repository().name,
+                "Loaded Languages": ", ".join(loaded_languages()),
                 "Session Keys": len(st.session_state.keys())
             }
             
+            cache_stats = get_farmer_cache().stats()
+            debug_info["Farmer Cache"] = (
+                f"{cache_stats['size']}/{cache_stats['max_size']} entries, "
+                f"{cache_stats['hits']} hits, {cache_stats['negative_hits']} negative hits, "
+                f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})"
+            )
+            
+            queue_stats = get_profile_write_queue().stats()
+            debug_info["Write-behind Queue"] = (
+                f"{queue_stats['depth']} pending, {queue_stats['flushed']} flushed, "
+                f"{queue_stats['merged']} merged, {queue_stats['dropped']} dropped"
+            )
+            
+            weather_stats = get_weather_service().stats()
+            debug_info["Weather Cache"] = (
+                f"{weather_stats['provider']}: {weather_stats['cells']} cells, "
+                f"{weather_stats['upstream_calls']} upstream calls ({weather_stats['upstream_errors']} failed), "
+                f"{weather_stats['coalesced']} coalesced, {weather_stats['stale_served']} stale served"
+            )
+            
+            activity_stats = get_activity_log().stats()
+            debug_info["Activity Log"] = (
+                f"{activity_stats['cached_pages']} cached pages ({activity_stats['hit_rate']:.0%} hits), "
+                f"{activity_stats['pending']} pending, {activity_stats['written']} written"
+            )
+            
+            irrigation_stats = get_irrigation_scheduler().stats()
+            debug_info["Irrigation Planner"] = (
+                f"{irrigation_stats['runs']} runs, {irrigation_stats['planned']} schedules, "
+                f"{irrigation_stats['pending']} pending, last run {irrigation_stats['last_run_seconds']:.1f}s"
+            )
+            
+            dashboard_stats = get_dashboard_loader().stats()
+            debug_info["Dashboard Reads"] = (
+                f"{dashboard_stats['loads']} loads, timeouts {dashboard_stats['timeouts'] or 'none'}, "
+                f"errors {dashboard_stats['errors'] or 'none'}"
+            )
+            
+            session_stats = get_session_tokens().stats()
+            debug_info["Login Sessions"] = (
+                f"{session_stats['issued']} issued, {session_stats['restored']} restored, "
+                f"{session_stats['rejected']} rejected, {session_stats['revoked']} revoked "
+                f"({session_stats['unrecorded_revocations']} unrecorded), "
+                f"{session_stats['cached']} cached ({session_stats['hit_rate']:.0%} hits)"
+            )
+            
+            offline_stats = get_offline_queue().stats()
+            debug_info["Offline Queue"] = (
+                f"{offline_stats['depth']} pending, sync lag {offline_stats['lag_seconds']:.0f}s, "
+                f"{offline_stats['synced']} synced, {offline_stats['conflicts']} conflicts"
+            )
+            
             for key, value in debug_info.items():
                 st.text(f"{key}: {value}")
             
+            with st.expander("⏱️ Latency"):
+                metrics_server = get_metrics_server()
+                st.text(
+                    f"Prometheus: http://{METRICS_HOST}:{metrics_server.server_port}/metrics"
+                    if metrics_server else "Prometheus endpoint: off"
+                )
+                for histogram in (STORAGE_CALLS, SCREEN_RENDERS, DASHBOARD_SOURCES):
+                    st.dataframe(
+                        [
+                            {histogram.label: value, "calls": stats["count"], "failed": stats["failures"],
+                             "mean ms": round(stats["mean"] * 1000, 1),
+                             "p50 ≤ ms": stats["p50"] * 1000, "p95 ≤ ms": stats["p95"] * 1000}
+                            for value, stats in histogram.summary().items()
+                        ],
+                        hide_index=True, use_container_width=True
+                    )
+            
+            with st.expander("🔬 Profiler"):
+                from profiling import PROFILE_MODES, DETERMINISTIC, SessionProfiler
+                profiler = st.session_state.profiler
+                if profiler is not None and profiler.remaining:
+                    st.text(f"Profiling ({profiler.mode}): {profiler.remaining} reruns left")
+                    if profiler.busy:
+                        st.caption(f"{profiler.busy} reruns ran unprofiled while another session held the profiler")
+                else:
+                    mode = st.radio("Mode", PROFILE_MODES, horizontal=True, key="profiler_mode")
+                    reruns = st.number_input("Reruns to profile", min_value=1, max_value=50, value=5,
+                                             key="profiler_reruns")
+                    if st.button("▶️ Profile next reruns", use_container_width=True):
+                        st.session_state.profiler = SessionProfiler(mode, int(reruns))
+                        st.rerun()
+                
+                if profiler is not None and profiler.screens:
+                    st.dataframe(profiler.summary(), hide_index=True, use_container_width=True)
+                    for screen in profiler.screens:
+                        data, file_name, mime = profiler.export(screen)
+                        st.download_button(
+                            f"⬇️ {file_name}", data=data, file_name=file_name, mime=mime,
+                            key=f"profile_{screen}", use_container_width=True
+                        )
+                        if profiler.mode == DETERMINISTIC:
+                            st.code(profiler.top_functions(screen), language=None)
+            
+            with st.expander("📊 Farm Statistics"):
+                summary = load_farm_summary()
+                st.text(f"Farmers: {summary['farmers']} ({summary['profiles_completed']} profiles)")
+                for dimension in ("soil_type", "previous_crop", "season", "land_band"):
+                    st.markdown(f"**{dimension.replace('_', ' ').title()}**")
+                    for label, count in sorted(summary[dimension].items(), key=lambda item: -item[1]):
+                        st.text(f"{label}: {count}")
+                stats = get_farm_stats()
+                if stats.failed_updates:
+                    st.text(f"Failed counter updates: {stats.failed_updates} (run farm_stats.py rebuild)")
+            
             st.markdown("---")
             
             if st.button("🔄 Reset Application", type="secondary", use_container_width=True):
                 # Clear all session state
                 for key in list(st.session_state.keys()):
                     del st.session_state[key]
-                st.success("✅ Application reset!")
-                time.sleep(1)
+                initialize_session_state()
+                flash("✅ Application reset!")
                 st.rerun()
             
             if st.button("💾 Download Session Data", use_container_width=True):
-                session_data = dict(st.session_state)
+                # The session token is a bearer credential and never leaves the server this way
+                session_data = {
+                    key: value for key, value in st.session_state.items()
+                    if key not in ("session_token", "session_cookie")
+                }
                 # Convert datetime objects to strings for JSON serialization
                 for key, value in session_data.items():
                     if isinstance(value, datetime):
                         session_data[key] = str(value)
+                    elif isinstance(value, FarmerProfile):
+                        session_data[key] = value.to_dict()
                 
                 st.download_button(
                     "📄 Download JSON",
-                    data=json.dumps(session_data, indent=2),
+                    data=json.dumps(session_data, indent=2, default=str),
                     file_name="agrismart_session.json",
                     mime="application/json"
                 )
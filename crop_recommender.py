@@ -0,0 +1,163 @@
+"""Crop recommendations from soil x season x rotation x land-size lookup tables.
+
+Every combination of profile signature and crop is scored once at import
+into a small NumPy tensor, so one farmer is a single row lookup and a whole
+population is one fancy-indexing operation.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from farm_data import SOIL_TYPES, KERALA_CROPS, SEASONS, LAND_BANDS, WINTER, MONSOON, SUMMER
+
+CROPS = list(KERALA_CROPS)
+# Index 0 of the rotation axis is "no previous crop"
+PREVIOUS_CROPS = ["None"] + CROPS
+BAND_EDGES = np.array([upper for upper, _ in LAND_BANDS[:-1]])
+
+CROP_INDEX = {crop: i for i, crop in enumerate(CROPS)}
+SOIL_INDEX = {soil: i for i, soil in enumerate(SOIL_TYPES)}
+SEASON_INDEX = {season: i for i, season in enumerate(SEASONS)}
+PREVIOUS_INDEX = {crop: i for i, crop in enumerate(PREVIOUS_CROPS)}
+
+# 🔹 Agronomic rules (0-1 suitability)
+# Soil columns follow SOIL_TYPES: Clay, Sandy, Loamy, Silt, Peaty, Chalky
+SOIL_RULES = {
+    "Coconut":           (0.5, 0.9, 0.9, 0.6, 0.4, 0.4),
+    "Rubber":            (0.6, 0.4, 0.9, 0.7, 0.3, 0.3),
+    "Tea":               (0.4, 0.4, 0.9, 0.6, 0.7, 0.1),
+    "Coffee":            (0.5, 0.3, 0.9, 0.6, 0.5, 0.2),
+    "Arecanut":          (0.7, 0.4, 0.9, 0.7, 0.4, 0.3),
+    "Rice (Paddy)":      (1.0, 0.2, 0.7, 0.9, 0.6, 0.2),
+    "Banana":            (0.6, 0.5, 1.0, 0.8, 0.5, 0.4),
+    "Plantain":          (0.6, 0.5, 0.95, 0.8, 0.5, 0.4),
+    "Cassava (Tapioca)": (0.4, 0.9, 0.9, 0.6, 0.3, 0.6),
+    "Black Pepper":      (0.5, 0.4, 0.9, 0.7, 0.5, 0.3),
+    "Cardamom":          (0.4, 0.3, 0.9, 0.6, 0.8, 0.1),
+    "Clove":             (0.5, 0.4, 0.9, 0.6, 0.5, 0.3),
+    "Nutmeg":            (0.6, 0.3, 0.9, 0.7, 0.5, 0.2),
+    "Jackfruit":         (0.5, 0.6, 0.9, 0.7, 0.3, 0.5),
+    "Mango":             (0.5, 0.6, 0.9, 0.7, 0.3, 0.6),
+    "Pineapple":         (0.3, 0.8, 0.8, 0.5, 0.7, 0.2),
+    "Papaya":            (0.3, 0.7, 0.9, 0.7, 0.3, 0.5),
+    "Sugarcane":         (0.8, 0.4, 0.9, 0.9, 0.5, 0.4),
+    "Cocoa":             (0.6, 0.3, 0.9, 0.7, 0.5, 0.2),
+    "Cashew":            (0.2, 1.0, 0.6, 0.4, 0.2, 0.6),
+}
+
+# Planting suitability per season (Kerala grows paddy in all three)
+SEASON_RULES = {
+    "Coconut":           {WINTER: 0.6, MONSOON: 0.9, SUMMER: 0.5},
+    "Rubber":            {WINTER: 0.4, MONSOON: 0.9, SUMMER: 0.3},
+    "Tea":               {WINTER: 0.5, MONSOON: 0.8, SUMMER: 0.4},
+    "Coffee":            {WINTER: 0.5, MONSOON: 0.9, SUMMER: 0.3},
+    "Arecanut":          {WINTER: 0.5, MONSOON: 0.9, SUMMER: 0.4},
+    "Rice (Paddy)":      {WINTER: 0.7, MONSOON: 1.0, SUMMER: 0.6},
+    "Banana":            {WINTER: 0.7, MONSOON: 0.8, SUMMER: 0.7},
+    "Plantain":          {WINTER: 0.7, MONSOON: 0.8, SUMMER: 0.7},
+    "Cassava (Tapioca)": {WINTER: 0.5, MONSOON: 0.9, SUMMER: 0.6},
+    "Black Pepper":      {WINTER: 0.4, MONSOON: 1.0, SUMMER: 0.3},
+    "Cardamom":          {WINTER: 0.4, MONSOON: 0.9, SUMMER: 0.3},
+    "Clove":             {WINTER: 0.4, MONSOON: 0.9, SUMMER: 0.3},
+    "Nutmeg":            {WINTER: 0.4, MONSOON: 0.9, SUMMER: 0.3},
+    "Jackfruit":         {WINTER: 0.5, MONSOON: 0.9, SUMMER: 0.4},
+    "Mango":             {WINTER: 0.5, MONSOON: 0.9, SUMMER: 0.4},
+    "Pineapple":         {WINTER: 0.6, MONSOON: 0.8, SUMMER: 0.7},
+    "Papaya":            {WINTER: 0.8, MONSOON: 0.6, SUMMER: 0.8},
+    "Sugarcane":         {WINTER: 0.8, MONSOON: 0.5, SUMMER: 0.7},
+    "Cocoa":             {WINTER: 0.5, MONSOON: 0.9, SUMMER: 0.4},
+    "Cashew":            {WINTER: 0.5, MONSOON: 0.9, SUMMER: 0.4},
+}
+
+# Land-size fit per LAND_BANDS (under 1, 1-2½, 2½-5, 5-10, 10+ acres)
+PLANTATION_FIT = (0.4, 0.7, 0.9, 1.0, 1.0)
+TREE_FIT = (0.8, 0.9, 1.0, 1.0, 1.0)
+SHORT_CYCLE_FIT = (1.0, 1.0, 0.9, 0.8, 0.7)
+LAND_RULES = {
+    "Rubber": PLANTATION_FIT, "Tea": PLANTATION_FIT, "Coffee": PLANTATION_FIT,
+    "Cardamom": PLANTATION_FIT, "Sugarcane": (0.5, 0.7, 0.9, 1.0, 1.0),
+    "Rice (Paddy)": (0.7, 0.9, 1.0, 1.0, 1.0),
+    "Banana": SHORT_CYCLE_FIT, "Plantain": SHORT_CYCLE_FIT, "Cassava (Tapioca)": SHORT_CYCLE_FIT,
+    "Pineapple": SHORT_CYCLE_FIT, "Papaya": SHORT_CYCLE_FIT,
+}
+
+# Crops sharing pests and nutrient demands rotate poorly after each other
+FAMILIES = [
+    {"Banana", "Plantain"},
+    {"Black Pepper", "Cardamom", "Clove", "Nutmeg"},
+    {"Rubber", "Tea", "Coffee", "Cocoa"},
+    {"Coconut", "Arecanut"},
+    {"Jackfruit", "Mango", "Cashew"},
+]
+ANNUALS = {"Rice (Paddy)", "Banana", "Plantain", "Cassava (Tapioca)", "Pineapple", "Papaya", "Sugarcane"}
+SAME_CROP_FACTOR = 0.5
+SAME_FAMILY_FACTOR = 0.75
+# Traditional Kerala wetland sequences: paddy followed by banana or tapioca
+ROTATION_BONUS = {
+    ("Rice (Paddy)", "Banana"): 1.1,
+    ("Rice (Paddy)", "Cassava (Tapioca)"): 1.1,
+    ("Cassava (Tapioca)", "Rice (Paddy)"): 1.1,
+}
+
+# 🔹 Lookup tables
+def _build_tables():
+    soil = np.array([SOIL_RULES[crop] for crop in CROPS]).T                             # (soil, crop)
+    season = np.array([[SEASON_RULES[crop][s] for crop in CROPS] for s in SEASONS])    # (season, crop)
+    land = np.array([LAND_RULES.get(crop, TREE_FIT) for crop in CROPS]).T              # (band, crop)
+
+    rotation = np.ones((len(PREVIOUS_CROPS), len(CROPS)))                               # (previous, crop)
+    for p, previous in enumerate(PREVIOUS_CROPS[1:], start=1):
+        for c, crop in enumerate(CROPS):
+            if previous == crop:
+                rotation[p, c] = SAME_CROP_FACTOR if crop in ANNUALS else 1.0
+            elif crop in ANNUALS and any(previous in f and crop in f for f in FAMILIES):
+                rotation[p, c] = SAME_FAMILY_FACTOR
+            rotation[p, c] *= ROTATION_BONUS.get((previous, crop), 1.0)
+
+    scores = (soil[:, None, None, None, :] * season[None, :, None, None, :]
+              * rotation[None, None, :, None, :] * land[None, None, None, :, :])
+    return (scores / scores.max() * 100).astype(np.float32)
+
+# SCORES[soil, season, previous, band, crop] on a 0-100 scale
+SCORES = _build_tables()
+# Crops ordered best-first for every signature
+RANKINGS = np.argsort(-SCORES, axis=-1, kind="stable")
+
+# 🔹 Lookups
+def profile_signature(profile, season):
+    """(soil, season, previous crop, land band) indices shared by similar farmers"""
+    land_size = float(profile.get("land_size") or 0)
+    return (
+        SOIL_INDEX[profile.get("soil_type") or "Loamy"],
+        SEASON_INDEX[season],
+        PREVIOUS_INDEX.get(profile.get("previous_crop") or "None", 0),
+        int(np.searchsorted(BAND_EDGES, land_size, side="right")),
+    )
+
+@lru_cache(maxsize=4096)
+def recommend_signature(signature, top_k=5):
+    """Top crops for one signature as ((crop, score), ...); cached per signature"""
+    order = RANKINGS[signature][:top_k]
+    scores = SCORES[signature]
+    return tuple((CROPS[i], round(float(scores[i]), 1)) for i in order)
+
+def recommend(profile, season, top_k=5):
+    return recommend_signature(profile_signature(profile, season), top_k)
+
+def recommend_batch(profiles, season, top_k=5):
+    """Score every profile in one vectorized pass.
+
+    Returns (crop_indices, scores), each shaped (len(profiles), top_k) and
+    ordered best-first; map indices to names with CROPS.
+    """
+    soil = np.fromiter((SOIL_INDEX[p.get("soil_type") or "Loamy"] for p in profiles), np.intp, len(profiles))
+    previous = np.fromiter(
+        (PREVIOUS_INDEX.get(p.get("previous_crop") or "None", 0) for p in profiles), np.intp, len(profiles)
+    )
+    land = np.fromiter((float(p.get("land_size") or 0) for p in profiles), np.float64, len(profiles))
+    band = np.searchsorted(BAND_EDGES, land, side="right")
+    season_index = np.full(len(profiles), SEASON_INDEX[season], dtype=np.intp)
+
+    top = RANKINGS[soil, season_index, previous, band, :top_k]                          # (n, top_k)
+    scores = SCORES[soil, season_index, previous, band]                                  # (n, crop)
+    return top, np.take_along_axis(scores, top, axis=1)
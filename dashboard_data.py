@@ -0,0 +1,118 @@
+"""Concurrent dashboard reads with a deadline per source.
+
+The dashboard needs several independent reads (activity log, crop health,
+weather, irrigation schedule).  DashboardLoader starts them all at once with
+asyncio.gather and waits at most each source's deadline, so a render costs
+the slowest source rather than the sum, and a source that misses its
+deadline is reported as timed out while the rest still render.
+
+Reads whose results are only shown later (behind a button) can be started
+with warm() instead: nothing waits for them, they just fill their caches.
+
+Sources are plain callables or coroutine functions.  The repositories and
+weather providers are blocking, so plain callables run on a shared thread
+pool; a timed-out call keeps running there and usually leaves its result in
+that source's cache for the next render.
+"""
+import asyncio
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+DASHBOARD_DEADLINE = float(os.getenv("AGRISMART_DASHBOARD_DEADLINE", "1.5"))
+DASHBOARD_WORKERS = int(os.getenv("AGRISMART_DASHBOARD_WORKERS", "16"))
+
+class SourceResult(namedtuple("SourceResult", "value error timed_out seconds")):
+    """Outcome of one source: its value, or the exception it raised, or a timeout"""
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out
+
+class DashboardData:
+    """Results of one load, each handed out once.
+
+    Fragments rerun with the arguments of the last full run, so a panel
+    takes its prefetched result on the full run and reads the source itself
+    on its own reruns.
+    """
+
+    def __init__(self, results, seconds):
+        self._results = results
+        self.seconds = seconds
+
+    def take(self, name):
+        """The source's SourceResult, or None if it was not loaded or already taken"""
+        return self._results.pop(name, None)
+
+    def value(self, name, read):
+        """Take the source's value, or call read() if there is none.
+
+        Re-raises the source's error, and raises TimeoutError if it missed
+        its deadline.
+        """
+        result = self.take(name)
+        if result is None:
+            return read()
+        if result.timed_out:
+            raise TimeoutError(f"{name} missed its deadline")
+        if result.error is not None:
+            raise result.error
+        return result.value
+
+class DashboardLoader:
+    """Runs dashboard sources concurrently on a shared pool"""
+
+    def __init__(self, workers=DASHBOARD_WORKERS, deadline=DASHBOARD_DEADLINE, histogram=None):
+        self.deadline = deadline
+        # Optional metrics.LatencyHistogram labelled by source name
+        self.histogram = histogram
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard-read")
+        self.loads = 0
+        self.timeouts = {}
+        self.errors = {}
+
+    async def _fetch(self, name, source, deadline):
+        started = time.perf_counter()
+        if asyncio.iscoroutinefunction(source):
+            call = source()
+        else:
+            call = asyncio.get_running_loop().run_in_executor(self._executor, source)
+        try:
+            value = await asyncio.wait_for(call, deadline)
+            result = SourceResult(value, None, False, time.perf_counter() - started)
+        except asyncio.TimeoutError:
+            self.timeouts[name] = self.timeouts.get(name, 0) + 1
+            result = SourceResult(None, None, True, time.perf_counter() - started)
+        except Exception as e:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            result = SourceResult(None, e, False, time.perf_counter() - started)
+        if self.histogram is not None:
+            self.histogram.observe(name, result.seconds, not result.ok)
+        return name, result
+
+    async def gather(self, sources, deadlines=None):
+        deadlines = deadlines or {}
+        pairs = await asyncio.gather(*(
+            self._fetch(name, source, deadlines.get(name, self.deadline))
+            for name, source in sources.items()
+        ))
+        return dict(pairs)
+
+    def load(self, sources, deadlines=None):
+        """Run {name: callable} concurrently from synchronous code; returns DashboardData"""
+        started = time.perf_counter()
+        results = asyncio.run(self.gather(sources, deadlines))
+        self.loads += 1
+        return DashboardData(results, time.perf_counter() - started)
+
+    def warm(self, sources):
+        """Start {name: callable} reads that only fill caches; nothing waits for them"""
+        for source in sources.values():
+            self._executor.submit(source)
+
+    def stats(self):
+        return {"loads": self.loads, "timeouts": dict(self.timeouts), "errors": dict(self.errors)}
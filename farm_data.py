@@ -0,0 +1,139 @@
+import hashlib
+import re
+from datetime import datetime
+
+# Profile choices offered by the registration screen
+SOIL_TYPES = ["Clay", "Sandy", "Loamy", "Silt", "Peaty", "Chalky"]
+
+KERALA_CROPS = [
+    "Coconut", "Rubber", "Tea", "Coffee", "Arecanut",
+    "Rice (Paddy)", "Banana", "Plantain", "Cassava (Tapioca)",
+    "Black Pepper", "Cardamom", "Clove", "Nutmeg",
+    "Jackfruit", "Mango", "Pineapple", "Papaya",
+    "Sugarcane", "Cocoa", "Cashew"
+]
+
+# District headquarters (latitude, longitude), used to locate weather forecasts
+KERALA_DISTRICTS = {
+    "Thiruvananthapuram": (8.5241, 76.9366),
+    "Kollam": (8.8932, 76.6141),
+    "Pathanamthitta": (9.2648, 76.7870),
+    "Alappuzha": (9.4981, 76.3388),
+    "Kottayam": (9.5916, 76.5222),
+    "Idukki": (9.8497, 76.9718),
+    "Ernakulam": (9.9816, 76.2999),
+    "Thrissur": (10.5276, 76.2144),
+    "Palakkad": (10.7867, 76.6548),
+    "Malappuram": (11.0510, 76.0711),
+    "Kozhikode": (11.2588, 75.7804),
+    "Wayanad": (11.6854, 76.1320),
+    "Kannur": (11.8745, 75.3704),
+    "Kasaragod": (12.4996, 74.9869),
+}
+
+MIN_LAND_SIZE = 0.1
+MAX_LAND_SIZE = 1000.0
+
+# (upper bound in acres, label); labels avoid "." so they are safe map keys
+LAND_BANDS = [
+    (1.0, "Under 1 acre"),
+    (2.5, "1 to 2½ acres"),
+    (5.0, "2½ to 5 acres"),
+    (10.0, "5 to 10 acres"),
+    (float("inf"), "10+ acres"),
+]
+
+WINTER, MONSOON, SUMMER = SEASONS = [
+    "Winter (Rabi Season) ❄️",
+    "Monsoon (Kharif Season) 🌧️",
+    "Summer (Zaid Season) ☀️",
+]
+
+def detect_season(when=None):
+    current_month = (when or datetime.now()).month
+    if current_month in [12, 1, 2]:
+        return WINTER
+    elif current_month in [6, 7, 8, 9]:
+        return MONSOON
+    else:
+        return SUMMER
+
+def land_band(land_size):
+    for upper, label in LAND_BANDS:
+        if land_size < upper:
+            return label
+    return LAND_BANDS[-1][1]
+
+def validate_mobile(mobile):
+    return re.match(r'^[6-9]\d{9}$', mobile) is not None
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# Profile strings come from these small sets; sharing one copy of each keeps
+# every session's profile from holding its own
+_CANONICAL_STRINGS = {value: value for value in SOIL_TYPES + KERALA_CROPS + SEASONS + list(KERALA_DISTRICTS)}
+
+class FarmerProfile:
+    """Immutable projection of farmers/{mobile} holding only the fields the UI shows"""
+
+    __slots__ = ("mobile", "name", "district", "land_size", "soil_type", "previous_crop",
+                 "season", "profile_completed", "created_at")
+
+    def __init__(self, mobile, name=None, district=None, land_size=None, soil_type=None,
+                 previous_crop=None, season=None, profile_completed=False, created_at=None):
+        canonical = _CANONICAL_STRINGS.get
+        values = (
+            mobile, name, canonical(district, district),
+            float(land_size) if land_size is not None else None,
+            canonical(soil_type, soil_type), canonical(previous_crop, previous_crop),
+            canonical(season, season), bool(profile_completed), created_at,
+        )
+        for field, value in zip(self.__slots__, values):
+            object.__setattr__(self, field, value)
+
+    @classmethod
+    def from_document(cls, mobile, doc):
+        """Project a farmer document; the password hash and other fields are dropped"""
+        doc = doc or {}
+        return cls(mobile, **{field: doc.get(field) for field in cls.__slots__[1:]})
+
+    def merged(self, fields):
+        """A new profile with fields (e.g. a saved registration form) applied"""
+        return FarmerProfile.from_document(self.mobile, {**self.to_dict(), **fields})
+
+    def get(self, field, default=None):
+        """Dict-style lookup so helpers written for farmer documents accept a profile"""
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FarmerProfile is immutable; use merged()")
+
+    def __delattr__(self, name):
+        raise AttributeError("FarmerProfile is immutable")
+
+    def __reduce__(self):
+        # Slots without __setattr__ need explicit support for copy and pickle
+        return (FarmerProfile, tuple(getattr(self, field) for field in self.__slots__))
+
+    def __eq__(self, other):
+        return isinstance(other, FarmerProfile) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"FarmerProfile(mobile={self.mobile!r}, name={self.name!r})"
+
+def build_profile(name, land_size, soil_type, previous_crop, season, district=None):
+    """Profile fields as written to farmers/{mobile} by registration"""
+    return {
+        "name": name,
+        "district": district,
+        "land_size": land_size,
+        "soil_type": soil_type,
+        "previous_crop": previous_crop if previous_crop != "None" else None,
+        "season": season,
+        "registration_completed_at": datetime.now()
+    }
@@ -0,0 +1,129 @@
+"""Aggregate farmer counts kept in sharded counter documents.
+
+Counts per soil type, previous crop, season and land-size band are updated
+incrementally whenever an account is created or a profile is saved, so the
+admin view reads a fixed number of shard documents however many farmers
+there are.  A rebuild recomputes every counter from a full paged scan:
+
+    python farm_stats.py rebuild
+    python farm_stats.py show
+"""
+import os
+import random
+import sys
+
+from farm_data import land_band
+
+# More shards spread concurrent increments over more documents
+NUM_SHARDS = int(os.getenv("AGRISMART_STATS_SHARDS", "10"))
+
+DIMENSIONS = ["soil_type", "previous_crop", "season", "land_band"]
+
+def counter_keys(doc):
+    """Counters a farmer document contributes 1 to"""
+    if not doc:
+        return set()
+    keys = {"farmers"}
+    if not doc.get("profile_completed"):
+        return keys
+    keys.add("profiles_completed")
+    for dimension in ("soil_type", "previous_crop", "season"):
+        keys.add(f"{dimension}:{doc.get(dimension) or 'None'}")
+    if doc.get("land_size") is not None:
+        keys.add(f"land_band:{land_band(float(doc['land_size']))}")
+    return keys
+
+def profile_delta(old_doc, new_doc):
+    """Counter increments that turn old_doc's contribution into new_doc's"""
+    old_keys, new_keys = counter_keys(old_doc), counter_keys(new_doc)
+    delta = {key: 1 for key in new_keys - old_keys}
+    delta.update({key: -1 for key in old_keys - new_keys})
+    return delta
+
+class FarmStats:
+    """Reads and updates the sharded counters through a FarmerRepository"""
+
+    def __init__(self, repository, num_shards=NUM_SHARDS):
+        self.repository = repository
+        self.num_shards = num_shards
+        self.failed_updates = 0
+        self.last_error = None
+
+    def record(self, old_doc, new_doc):
+        """Apply the change from old_doc to new_doc to one random shard.
+
+        Best effort: the farmer's own write has already committed, so a failure
+        is counted rather than raised and the next rebuild repairs the drift.
+        """
+        delta = profile_delta(old_doc, new_doc)
+        if not delta:
+            return delta
+        try:
+            self.repository.increment_counters(random.randrange(self.num_shards), delta)
+        except Exception as e:
+            self.failed_updates += 1
+            self.last_error = e
+            return None
+        return delta
+
+    def totals(self):
+        """Sum of every shard: {counter key: count}"""
+        totals = {}
+        for counts in self.repository.read_counter_shards():
+            for key, value in counts.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def by_dimension(self):
+        """{"farmers": n, "profiles_completed": n, "soil_type": {...}, ...}"""
+        totals = self.totals()
+        summary = {
+            "farmers": totals.get("farmers", 0),
+            "profiles_completed": totals.get("profiles_completed", 0),
+        }
+        for dimension in DIMENSIONS:
+            summary[dimension] = {}
+        for key, value in totals.items():
+            dimension, _, label = key.partition(":")
+            if label and dimension in summary and value:
+                summary[dimension][label] = value
+        return summary
+
+def rebuild(repository, num_shards=NUM_SHARDS, page_size=500):
+    """Recompute every counter from a full paged scan of the farmers collection.
+
+    Increments that land while the scan runs are overwritten, so run it at a
+    quiet time (or after a bulk import).
+    """
+    totals = {}
+    for page in repository.iter_farmer_pages(page_size):
+        for _, doc in page:
+            for key in counter_keys(doc):
+                totals[key] = totals.get(key, 0) + 1
+    repository.replace_counters(num_shards, totals)
+    return totals
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+    from storage import create_repository
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv not in (["rebuild"], ["show"]):
+        print(__doc__)
+        return 2
+
+    repository = create_repository()
+    if argv == ["rebuild"]:
+        totals = rebuild(repository)
+        print(f"Rebuilt {len(totals)} counters for {totals.get('farmers', 0)} farmers")
+    summary = FarmStats(repository).by_dimension()
+    print(f"Farmers: {summary['farmers']} ({summary['profiles_completed']} with profiles)")
+    for dimension in DIMENSIONS:
+        print(f"\n{dimension}:")
+        for label, count in sorted(summary[dimension].items(), key=lambda item: -item[1]):
+            print(f"  {label:<32}{count:>8}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
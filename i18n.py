@@ -0,0 +1,145 @@
+"""Translation catalogs: JSON sources in locales/, compiled and validated at build time.
+
+    python i18n.py build      # validate every catalog and write locales/compiled/
+
+Compiled catalogs are loaded on first use per language and shared by every
+session in the process, so adding languages does not grow startup memory.
+"""
+import ast
+import json
+import os
+import pickle
+import re
+import sys
+import threading
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCALES_DIR = os.path.join(APP_DIR, "locales")
+COMPILED_DIR = os.path.join(LOCALES_DIR, "compiled")
+# App sources scanned for get_text("...") keys during validation
+SOURCE_FILES = ["code1.py"]
+
+PLACEHOLDER = re.compile(r"\{(\w*)\}")
+
+class CatalogError(Exception):
+    """Raised when a catalog is missing keys or otherwise invalid"""
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_manifest():
+    """Default language code and the list of {code, name} languages"""
+    return _read_json(os.path.join(LOCALES_DIR, "manifest.json"))
+
+_manifest = load_manifest()
+DEFAULT_LANGUAGE = _manifest["default"]
+LANGUAGE_CODES = {entry["name"]: entry["code"] for entry in _manifest["languages"]}
+LANGUAGE_NAMES = list(LANGUAGE_CODES)
+
+def source_path(code):
+    return os.path.join(LOCALES_DIR, f"{code}.json")
+
+def compiled_path(code):
+    return os.path.join(COMPILED_DIR, f"{code}.pickle")
+
+def used_keys(source_files=SOURCE_FILES):
+    """String literals passed to get_text() in the app sources"""
+    keys = set()
+    for filename in source_files:
+        with open(os.path.join(APP_DIR, filename), encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename)
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                    and node.func.id == "get_text" and node.args
+                    and isinstance(node.args[0], ast.Constant)
+                    and isinstance(node.args[0].value, str)):
+                keys.add(node.args[0].value)
+    return keys
+
+def validate_catalog(code, catalog, reference, required_keys=()):
+    """Return a list of problems with one catalog compared to the reference"""
+    problems = []
+    for key in sorted(set(reference) - set(catalog)):
+        problems.append(f"{code}: missing key {key!r}")
+    for key in sorted(set(catalog) - set(reference)):
+        problems.append(f"{code}: unknown key {key!r}")
+    for key in sorted(set(required_keys) - set(reference)):
+        problems.append(f"{code}: key {key!r} is used by the app but not defined")
+    for key, text in catalog.items():
+        if not isinstance(text, str) or not text.strip():
+            problems.append(f"{code}: empty text for {key!r}")
+        elif key in reference and set(PLACEHOLDER.findall(text)) != set(PLACEHOLDER.findall(reference[key])):
+            problems.append(f"{code}: placeholders in {key!r} differ from {DEFAULT_LANGUAGE}")
+    return problems
+
+def compile_catalog(code, reference=None, required_keys=()):
+    """Validate one source catalog and write its compiled form"""
+    catalog = _read_json(source_path(code))
+    if reference is None:
+        reference = catalog if code == DEFAULT_LANGUAGE else _read_json(source_path(DEFAULT_LANGUAGE))
+    problems = validate_catalog(code, catalog, reference, required_keys)
+    if problems:
+        raise CatalogError("\n".join(problems))
+
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    tmp_path = compiled_path(code) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(catalog, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, compiled_path(code))
+    return catalog
+
+def build_all():
+    """Compile every language in the manifest; raise CatalogError listing all problems"""
+    reference = _read_json(source_path(DEFAULT_LANGUAGE))
+    required = used_keys()
+    problems = []
+    for code in LANGUAGE_CODES.values():
+        try:
+            compile_catalog(code, reference, required)
+        except CatalogError as e:
+            problems.append(str(e))
+    if problems:
+        raise CatalogError("\n".join(problems))
+
+# 🔹 Runtime loading (once per language per process)
+_catalogs = {}
+_lock = threading.Lock()
+
+def _is_stale(code):
+    compiled = compiled_path(code)
+    return (not os.path.exists(compiled)
+            or os.path.getmtime(compiled) < os.path.getmtime(source_path(code)))
+
+def load_catalog(language):
+    """Compiled catalog for a language name, loaded on first use and shared"""
+    catalog = _catalogs.get(language)
+    if catalog is not None:
+        return catalog
+
+    with _lock:
+        catalog = _catalogs.get(language)
+        if catalog is None:
+            code = LANGUAGE_CODES[language]
+            if _is_stale(code):
+                # Development fallback; deployments run `python i18n.py build`
+                catalog = compile_catalog(code)
+            else:
+                with open(compiled_path(code), "rb") as f:
+                    catalog = pickle.load(f)
+            _catalogs[language] = catalog
+    return catalog
+
+def loaded_languages():
+    return list(_catalogs)
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build"]:
+        print(__doc__)
+        sys.exit(2)
+    try:
+        build_all()
+    except CatalogError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    print(f"Compiled {len(LANGUAGE_CODES)} catalogs into {COMPILED_DIR}")
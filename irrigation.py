@@ -0,0 +1,321 @@
+"""Irrigation schedules from a daily soil water balance, computed in batches.
+
+For every farmer with a completed profile and a district, the planner runs
+the FAO-56 root-zone water balance over the district's forecast:
+evapotranspiration (Hargreaves reference ET times the crop coefficient)
+depletes the soil, effective rainfall refills it, and the plot is irrigated
+back to field capacity whenever depletion passes the crop's readily
+available water.  The crop on the plot is taken to be the profile's
+previous_crop.  A whole page of farmers is one set of NumPy operations and
+the results are stored, so the dashboard only reads a schedule document.
+
+    python irrigation.py run      # plan every farmer once
+
+Full runs read every farmer, so by default they come only from that command
+(e.g. cron on one host).  The app's scheduler plans just the profiles saved
+on its worker, unless AGRISMART_IRRIGATION_INTERVAL turns on periodic full
+runs, which only one worker should do.
+"""
+import atexit
+import math
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+from farm_data import SOIL_TYPES, KERALA_CROPS, KERALA_DISTRICTS
+from write_behind import MAX_BATCH_SIZE
+
+# Seconds between full planning runs of the background scheduler; 0 (the
+# default) leaves full runs to `python irrigation.py run`
+IRRIGATION_INTERVAL = int(os.getenv("AGRISMART_IRRIGATION_INTERVAL", "0"))
+# Seconds before profiles whose planning failed are tried again
+PLAN_RETRY_SECONDS = 60
+
+SQUARE_METRES_PER_ACRE = 4046.86
+# Share of forecast rain that reaches the root zone
+EFFECTIVE_RAIN_FRACTION = 0.8
+# Schedules start from this share of readily available water already used
+INITIAL_DEPLETION_FRACTION = 0.5
+
+# Total available water in mm per metre of root zone
+SOIL_WATER = {"Clay": 180, "Sandy": 70, "Loamy": 150, "Silt": 190, "Peaty": 220, "Chalky": 110}
+
+# (crop coefficient Kc, root depth in m, depletion fraction p) after FAO-56 tables
+CROP_WATER = {
+    "Coconut": (0.95, 1.0, 0.65),
+    "Rubber": (0.9, 1.0, 0.6),
+    "Tea": (1.0, 0.9, 0.4),
+    "Coffee": (1.0, 1.0, 0.4),
+    "Arecanut": (0.9, 0.8, 0.5),
+    "Rice (Paddy)": (1.15, 0.5, 0.2),
+    "Banana": (1.1, 0.6, 0.35),
+    "Plantain": (1.1, 0.6, 0.35),
+    "Cassava (Tapioca)": (0.8, 0.7, 0.35),
+    "Black Pepper": (0.9, 0.6, 0.4),
+    "Cardamom": (0.9, 0.5, 0.4),
+    "Clove": (0.9, 1.0, 0.5),
+    "Nutmeg": (0.9, 1.0, 0.5),
+    "Jackfruit": (0.85, 1.2, 0.5),
+    "Mango": (0.85, 1.5, 0.6),
+    "Pineapple": (0.3, 0.4, 0.5),
+    "Papaya": (1.0, 0.6, 0.4),
+    "Sugarcane": (1.25, 1.2, 0.65),
+    "Cocoa": (1.0, 0.8, 0.3),
+    "Cashew": (0.8, 1.5, 0.6),
+}
+# Plots with no recorded crop are planned as a generic field crop
+DEFAULT_CROP_WATER = (0.8, 0.6, 0.5)
+
+# Row 0 of the crop table is the generic crop
+_CROP_ROW = {crop: i for i, crop in enumerate(KERALA_CROPS, start=1)}
+_CROP_TABLE = np.array([DEFAULT_CROP_WATER] + [CROP_WATER[crop] for crop in KERALA_CROPS])
+_SOIL_ROW = {soil: i for i, soil in enumerate(SOIL_TYPES)}
+_SOIL_TABLE = np.array([SOIL_WATER[soil] for soil in SOIL_TYPES], dtype=float)
+
+def plannable(doc):
+    return bool(doc and doc.get("profile_completed") and doc.get("district") in KERALA_DISTRICTS)
+
+# 🔹 Water balance
+def extraterrestrial_radiation(latitude, day_of_year):
+    """FAO-56 Ra as mm/day of evaporation; broadcasts over latitude (n, 1) and day (d,)"""
+    phi = np.radians(latitude)
+    angle = 2 * math.pi * day_of_year / 365
+    inverse_distance = 1 + 0.033 * np.cos(angle)
+    declination = 0.409 * np.sin(angle - 1.39)
+    sunset_angle = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1, 1))
+    ra_mj = (24 * 60 / math.pi * 0.0820 * inverse_distance
+             * (sunset_angle * np.sin(phi) * np.sin(declination)
+                + np.cos(phi) * np.cos(declination) * np.sin(sunset_angle)))
+    return 0.408 * ra_mj
+
+def reference_et(tmin, tmax, latitude, day_of_year):
+    """Hargreaves reference evapotranspiration (mm/day) from forecast temperatures"""
+    ra = extraterrestrial_radiation(latitude, day_of_year)
+    tmean = (tmin + tmax) / 2
+    return 0.0023 * ra * (tmean + 17.8) * np.sqrt(np.maximum(tmax - tmin, 0))
+
+def water_balance(soil_rows, crop_rows, land_size, tmin, tmax, rain, latitude, day_of_year):
+    """Daily schedule for n plots over d days.
+
+    Per-plot inputs are shaped (n,), weather (n, d) and day_of_year (d,).
+    Returns (crop ET, irrigation depth, end-of-day depletion) in mm and
+    irrigation volume in litres, each shaped (n, d).
+    """
+    kc, root_depth, depletion_fraction = _CROP_TABLE[crop_rows].T
+    total_water = _SOIL_TABLE[soil_rows] * root_depth
+    readily_available = depletion_fraction * total_water
+
+    crop_et = kc[:, None] * reference_et(tmin, tmax, latitude[:, None], day_of_year)
+    effective_rain = EFFECTIVE_RAIN_FRACTION * rain
+
+    days = rain.shape[1]
+    irrigation = np.zeros_like(rain)
+    depletion_by_day = np.zeros_like(rain)
+    depletion = INITIAL_DEPLETION_FRACTION * readily_available
+    for day in range(days):
+        depletion = np.clip(depletion + crop_et[:, day] - effective_rain[:, day], 0, total_water)
+        # Refill to field capacity once readily available water is used up
+        irrigation[:, day] = np.where(depletion > readily_available, depletion, 0)
+        depletion = depletion - irrigation[:, day]
+        depletion_by_day[:, day] = depletion
+
+    # 1 mm over 1 m² is 1 litre
+    litres = irrigation * (land_size * SQUARE_METRES_PER_ACRE)[:, None]
+    return crop_et, irrigation, depletion_by_day, litres
+
+# 🔹 Planning
+def district_forecasts(weather_service, districts):
+    """One forecast per district as (dates, tmin, tmax, rain) arrays shaped (districts, d)"""
+    forecasts = [weather_service.forecast(*KERALA_DISTRICTS[district])["daily"] for district in districts]
+    days = min(len(daily) for daily in forecasts)
+    dates = [day["date"] for day in forecasts[0][:days]]
+
+    def column(field):
+        return np.array([[day[field] or 0 for day in daily[:days]] for daily in forecasts], dtype=float)
+    return dates, column("min_c"), column("max_c"), column("rain_mm")
+
+def plan_farmers(farmers, weather_service, computed_at=None):
+    """Schedules for [(mobile, doc), ...]; farmers without a district are skipped"""
+    farmers = [(mobile, doc) for mobile, doc in farmers if plannable(doc)]
+    if not farmers:
+        return {}
+    computed_at = computed_at or datetime.now()
+
+    districts = sorted({doc["district"] for _, doc in farmers})
+    district_rows = {district: i for i, district in enumerate(districts)}
+    dates, tmin, tmax, rain = district_forecasts(weather_service, districts)
+
+    docs = [doc for _, doc in farmers]
+    rows = np.array([district_rows[doc["district"]] for doc in docs])
+    soil_rows = np.array([_SOIL_ROW.get(doc.get("soil_type"), _SOIL_ROW["Loamy"]) for doc in docs])
+    crop_rows = np.array([_CROP_ROW.get(doc.get("previous_crop"), 0) for doc in docs])
+    land_size = np.array([float(doc.get("land_size") or 0) for doc in docs])
+    latitude = np.array([KERALA_DISTRICTS[district][0] for district in districts])[rows]
+    day_of_year = np.array([date.fromisoformat(day).timetuple().tm_yday for day in dates])
+
+    crop_et, irrigation, depletion, litres = water_balance(
+        soil_rows, crop_rows, land_size, tmin[rows], tmax[rows], rain[rows], latitude, day_of_year
+    )
+
+    schedules = {}
+    for i, (mobile, doc) in enumerate(farmers):
+        schedules[mobile] = {
+            "computed_at": computed_at,
+            "district": doc["district"],
+            "crop": doc.get("previous_crop") or None,
+            "total_litres": round(float(litres[i].sum())),
+            "days": [
+                {
+                    "date": day,
+                    "et_mm": round(float(crop_et[i, d]), 1),
+                    "rain_mm": round(float(rain[rows[i], d]), 1),
+                    "irrigation_mm": round(float(irrigation[i, d]), 1),
+                    "litres": round(float(litres[i, d])),
+                    "depletion_mm": round(float(depletion[i, d]), 1),
+                }
+                for d, day in enumerate(dates)
+            ],
+        }
+    return schedules
+
+def current_schedule(schedule, today=None):
+    """Copy of a stored schedule without the days already past.
+
+    stale is set when the plan was made before today, so its forecast is old
+    and the farmer should be replanned; days may then be empty.
+    """
+    today = (today or date.today()).isoformat()
+    days = [day for day in schedule["days"] if day["date"] >= today]
+    return {
+        **schedule,
+        "days": days,
+        "total_litres": sum(day["litres"] for day in days),
+        "stale": not schedule["days"] or schedule["days"][0]["date"] < today,
+    }
+
+def plan_all(repository, weather_service, page_size=MAX_BATCH_SIZE):
+    """Plan every farmer, one page (and one batched write) at a time; returns the count"""
+    computed_at = datetime.now()
+    planned = 0
+    for page in repository.iter_farmer_pages(page_size):
+        schedules = plan_farmers(page, weather_service, computed_at)
+        if schedules:
+            repository.put_irrigation_schedules(schedules)
+            planned += len(schedules)
+    return planned
+
+# 🔹 Background Scheduler
+class IrrigationScheduler:
+    """Plans newly saved profiles as soon as possible, and every farmer each interval if set"""
+
+    def __init__(self, repository, weather_service, interval=IRRIGATION_INTERVAL):
+        self.repository = repository
+        self.weather_service = weather_service
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.runs = 0
+        self.planned = 0
+        self.requested = 0
+        self.failed_runs = 0
+        self.last_run_at = None
+        self.last_run_seconds = 0.0
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name="irrigation-scheduler", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def request(self, mobile, doc):
+        """Plan one farmer on the scheduler thread, e.g. after a profile change"""
+        if not plannable(doc):
+            return
+        with self._lock:
+            self._pending[mobile] = dict(doc)
+            self.requested += 1
+        self._wake.set()
+
+    def _plan_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            schedules = plan_farmers(pending.items(), self.weather_service)
+            self.repository.put_irrigation_schedules(schedules)
+        except Exception:
+            # Keep them for the retry, unless a newer profile was requested meanwhile
+            with self._lock:
+                for mobile, doc in pending.items():
+                    self._pending.setdefault(mobile, doc)
+            raise
+        self.planned += len(schedules)
+
+    def run_once(self):
+        started = time.perf_counter()
+        try:
+            self.planned += plan_all(self.repository, self.weather_service)
+            self.runs += 1
+        except Exception as e:
+            self.failed_runs += 1
+            self.last_error = e
+        self.last_run_at = datetime.now()
+        self.last_run_seconds = time.perf_counter() - started
+
+    def _run(self):
+        next_run = time.monotonic() if self.interval > 0 else None
+        retry_at = None
+        while not self._closed:
+            if next_run is not None and time.monotonic() >= next_run:
+                self.run_once()
+                next_run = time.monotonic() + self.interval
+            deadline = min((t for t in (next_run, retry_at) if t is not None), default=None)
+            self._wake.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            self._wake.clear()
+            try:
+                self._plan_pending()
+                retry_at = None
+            except Exception as e:
+                self.last_error = e
+                retry_at = time.monotonic() + PLAN_RETRY_SECONDS
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+
+    def stats(self):
+        return {
+            "runs": self.runs,
+            "planned": self.planned,
+            "requested": self.requested,
+            "pending": len(self._pending),
+            "failed_runs": self.failed_runs,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+    from storage import create_repository
+    from weather import WeatherService, create_weather_provider
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["run"]:
+        print(__doc__)
+        return 2
+
+    started = time.perf_counter()
+    planned = plan_all(create_repository(), WeatherService(create_weather_provider()))
+    print(f"Planned irrigation for {planned} farmers in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""Latency histograms and failure counters, exported in Prometheus text format.
+
+Recording a call is a perf_counter pair, a bisect over the bucket bounds and
+a few integer increments under a lock, about a microsecond, so it stays on
+in production.  Each process serves its own /metrics on
+AGRISMART_METRICS_HOST:AGRISMART_METRICS_PORT (port 0 disables it); when
+several app processes share a host, give each its own port.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.getenv("AGRISMART_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("AGRISMART_METRICS_PORT", "9464"))
+
+# Upper bounds in seconds, from a cached read to a slow Auth round trip
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class LatencyHistogram:
+    """Latency histogram plus a failure counter per label value"""
+
+    def __init__(self, name, help_text, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label value -> [per-bucket counts (last is +Inf), sum, count, failures]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds, failed=False):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+            if failed:
+                series[3] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {value: (list(counts), total, count, failures)
+                    for value, (counts, total, count, failures) in self._series.items()}
+
+    def quantile(self, counts, q):
+        """Upper bound of the bucket holding the q-th observation (Prometheus-style estimate)"""
+        target = q * sum(counts)
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            if running >= target:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        """{label value: count, failures, mean, p50, p95} for dashboards"""
+        return {
+            value: {
+                "count": count,
+                "failures": failures,
+                "mean": total / count if count else 0.0,
+                "p50": self.quantile(counts, 0.5),
+                "p95": self.quantile(counts, 0.95),
+            }
+            for value, (counts, total, count, failures) in sorted(self.snapshot().items())
+        }
+
+    def exposition(self):
+        lines = [
+            f"# HELP {self.name}_seconds {self.help_text}",
+            f"# TYPE {self.name}_seconds histogram",
+        ]
+        failures_lines = [
+            f"# HELP {self.name}_failures_total Calls that raised or reported failure",
+            f"# TYPE {self.name}_failures_total counter",
+        ]
+        for value, (counts, total, count, failures) in sorted(self.snapshot().items()):
+            label = f'{self.label}="{value}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_seconds_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_seconds_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_seconds_count{{{label}}} {count}")
+            failures_lines.append(f"{self.name}_failures_total{{{label}}} {failures}")
+        return "\n".join(lines + failures_lines)
+
+STORAGE_CALLS = LatencyHistogram(
+    "agrismart_storage_call", "Latency of Firestore and Auth calls made by the app", "call"
+)
+SCREEN_RENDERS = LatencyHistogram(
+    "agrismart_screen_render", "Time to run one screen function routed by main()", "screen"
+)
+DASHBOARD_SOURCES = LatencyHistogram(
+    "agrismart_dashboard_source", "Time for one concurrent dashboard read, up to its deadline", "source"
+)
+HISTOGRAMS = [STORAGE_CALLS, SCREEN_RENDERS, DASHBOARD_SOURCES]
+
+_NO_FAILURE_RESULT = object()
+
+def timed(histogram, label_value, failure_result=_NO_FAILURE_RESULT):
+    """Decorator recording a call's latency; raising, or returning failure_result, counts as failed.
+
+    Streamlit's rerun/stop signals derive from BaseException and are not failures.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            failed = False
+            try:
+                result = fn(*args, **kwargs)
+                failed = result is failure_result
+                return result
+            except Exception:
+                failed = True
+                raise
+            finally:
+                histogram.observe(label_value, time.perf_counter() - started, failed)
+        return wrapper
+    return decorator
+
+def exposition():
+    """Every metric in Prometheus text format"""
+    return "\n".join(histogram.exposition() for histogram in HISTOGRAMS) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = exposition().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the app's stderr
+        pass
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics from a daemon thread; returns the server, or None if disabled"""
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,320 @@
+"""Crop health (NDVI) for farmers' plots from locally stored satellite tiles.
+
+Tiles follow AGRISMART_TILE_DIR/{tile_id}/tile.json (bounds and pixel size)
+with one folder per acquisition date holding the Sentinel-2 red (B04) and
+near-infrared (B08) bands as uint16 .npy arrays:
+
+    tiles/T43PFN/tile.json
+    tiles/T43PFN/2026-10-12/B04.npy
+    tiles/T43PFN/2026-10-12/B08.npy
+
+Bands are memory-mapped and only the window covering a plot is read, so a
+worker touches a few kilobytes of a tile however large it is.  Results are
+cached per plot and acquisition date; batches fan out over a process pool.
+
+    python ndvi.py fake-tiles     # synthetic tiles around each district for offline use
+    python ndvi.py run            # crop health for every farmer on the latest imagery
+"""
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from cache import TTLCache, MISSING
+from farm_data import KERALA_DISTRICTS
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+TILE_DIR = os.getenv("AGRISMART_TILE_DIR", os.path.join(APP_DIR, "tiles"))
+NDVI_WORKERS = int(os.getenv("AGRISMART_NDVI_WORKERS", str(os.cpu_count() or 2)))
+NDVI_CACHE_SIZE = int(os.getenv("AGRISMART_NDVI_CACHE_SIZE", "20000"))
+# Imagery for a date never changes, so results only age out to bound memory
+NDVI_CACHE_TTL = 7 * 24 * 3600
+# Seconds between rescans of TILE_DIR for new acquisitions
+CATALOG_REFRESH_INTERVAL = 300
+
+RED_BAND, NIR_BAND = "B04", "B08"
+NODATA = 0
+SQUARE_METRES_PER_ACRE = 4046.86
+METRES_PER_DEGREE = 111320.0
+# Area sampled around a district centre when the farmer's plot location is unknown
+DISTRICT_SAMPLE_ACRES = 100
+HEALTH_LEVELS = [(0.6, "Healthy"), (0.4, "Moderate"), (0.2, "Stressed"), (float("-inf"), "Bare or very poor")]
+
+# A farmer's plot: a square of area_acres centred on (latitude, longitude).
+# district is set when the location is unknown and an area around the
+# district centre stands in, so the results describe the district, not the plot
+Plot = namedtuple("Plot", ["plot_id", "latitude", "longitude", "area_acres", "district"], defaults=(None,))
+
+def plot_for_farmer(mobile, doc):
+    """The farmer's plot at plot_latitude/plot_longitude, else a district-level sample"""
+    if not doc or not doc.get("land_size"):
+        return None
+    if doc.get("plot_latitude") is not None and doc.get("plot_longitude") is not None:
+        latitude, longitude = float(doc.get("plot_latitude")), float(doc.get("plot_longitude"))
+        return Plot(mobile, latitude, longitude, float(doc.get("land_size")))
+    district = doc.get("district")
+    if district in KERALA_DISTRICTS:
+        # Shared by every farmer in the district, so it is computed and cached once
+        latitude, longitude = KERALA_DISTRICTS[district]
+        return Plot(f"district:{district}", latitude, longitude, DISTRICT_SAMPLE_ACRES, district)
+    return None
+
+def health_label(mean_ndvi):
+    for threshold, label in HEALTH_LEVELS:
+        if mean_ndvi >= threshold:
+            return label
+
+# 🔹 Tiles
+class TileCatalog:
+    """Tile bounds and acquisition dates found under TILE_DIR"""
+
+    def __init__(self, tile_dir=TILE_DIR):
+        self.tile_dir = tile_dir
+        self.tiles = {}
+        self.scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        tiles = {}
+        if os.path.isdir(self.tile_dir):
+            for tile_id in sorted(os.listdir(self.tile_dir)):
+                meta_path = os.path.join(self.tile_dir, tile_id, "tile.json")
+                if not os.path.exists(meta_path):
+                    continue
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                meta["dates"] = sorted(
+                    name for name in os.listdir(os.path.join(self.tile_dir, tile_id))
+                    if os.path.exists(os.path.join(self.tile_dir, tile_id, name, f"{NIR_BAND}.npy"))
+                )
+                tiles[tile_id] = meta
+        with self._lock:
+            self.tiles = tiles
+            self.scanned_at = time.monotonic()
+
+    def _current(self):
+        if time.monotonic() - self.scanned_at >= CATALOG_REFRESH_INTERVAL:
+            self.refresh()
+        return self.tiles
+
+    def tile_for(self, latitude, longitude):
+        """(tile_id, metadata) of a tile containing the point, or (None, None)"""
+        for tile_id, meta in self._current().items():
+            if meta["south"] <= latitude < meta["north"] and meta["west"] <= longitude < meta["east"]:
+                return tile_id, meta
+        return None, None
+
+    def latest_date(self, tile_id):
+        dates = self._current().get(tile_id, {}).get("dates")
+        return dates[-1] if dates else None
+
+@lru_cache(maxsize=64)
+def open_band(path):
+    """Memory-mapped band; pages are read from disk only when a window touches them"""
+    return np.load(path, mmap_mode="r")
+
+def plot_window(meta, plot):
+    """(row slice, column slice) of the tile pixels covering the plot"""
+    side_m = math.sqrt(plot.area_acres * SQUARE_METRES_PER_ACRE)
+    half_lat = side_m / 2 / METRES_PER_DEGREE
+    half_lon = half_lat / math.cos(math.radians(plot.latitude))
+    rows_per_degree = meta["height"] / (meta["north"] - meta["south"])
+    cols_per_degree = meta["width"] / (meta["east"] - meta["west"])
+
+    row0 = int((meta["north"] - (plot.latitude + half_lat)) * rows_per_degree)
+    row1 = math.ceil((meta["north"] - (plot.latitude - half_lat)) * rows_per_degree)
+    col0 = int((plot.longitude - half_lon - meta["west"]) * cols_per_degree)
+    col1 = math.ceil((plot.longitude + half_lon - meta["west"]) * cols_per_degree)
+    # Always at least one pixel, clipped to the tile
+    row0, col0 = max(0, min(row0, meta["height"] - 1)), max(0, min(col0, meta["width"] - 1))
+    row1, col1 = min(meta["height"], max(row1, row0 + 1)), min(meta["width"], max(col1, col0 + 1))
+    return slice(row0, row1), slice(col0, col1)
+
+# 🔹 NDVI
+def ndvi(red, nir):
+    """NDVI per pixel as float32, NaN where either band has no data"""
+    red = red.astype(np.float32)
+    nir = nir.astype(np.float32)
+    total = nir + red
+    valid = (red != NODATA) & (nir != NODATA) & (total > 0)
+    out = np.full(red.shape, np.nan, dtype=np.float32)
+    np.divide(nir - red, total, out=out, where=valid)
+    return out
+
+def zonal_statistics(values):
+    """Summary of the valid NDVI pixels in a window, or None if there are none"""
+    valid = np.sort(values[~np.isnan(values)])
+    if valid.size == 0:
+        return None
+    # One sort gives min, max and linearly interpolated percentiles
+    positions = np.array([0.1, 0.5, 0.9]) * (valid.size - 1)
+    lower = positions.astype(int)
+    upper = np.minimum(lower + 1, valid.size - 1)
+    p10, median, p90 = valid[lower] + (valid[upper] - valid[lower]) * (positions - lower)
+    mean = float(valid.mean())
+    return {
+        "mean": round(mean, 3),
+        "median": round(float(median), 3),
+        "std": round(float(valid.std()), 3),
+        "min": round(float(valid[0]), 3),
+        "max": round(float(valid[-1]), 3),
+        "p10": round(float(p10), 3),
+        "p90": round(float(p90), 3),
+        "healthy_share": round(float(valid.size - np.searchsorted(valid, HEALTH_LEVELS[0][0])) / valid.size, 3),
+        "pixels": int(valid.size),
+        "health": health_label(mean),
+    }
+
+def plot_statistics(tile_dir, tile_id, meta, acquisition_date, plot):
+    """Read the plot's window from both bands and summarise it (runs in pool workers too)"""
+    folder = os.path.join(tile_dir, tile_id, acquisition_date)
+    rows, cols = plot_window(meta, plot)
+    red = np.asarray(open_band(os.path.join(folder, f"{RED_BAND}.npy"))[rows, cols])
+    nir = np.asarray(open_band(os.path.join(folder, f"{NIR_BAND}.npy"))[rows, cols])
+    stats = zonal_statistics(ndvi(red, nir))
+    if stats is not None:
+        stats.update({"tile_id": tile_id, "date": acquisition_date})
+    return stats
+
+def _plot_statistics_job(args):
+    return plot_statistics(*args)
+
+# 🔹 Pipeline
+class NDVIPipeline:
+    """Plot crop health with a (plot, acquisition date) result cache"""
+
+    def __init__(self, tile_dir=TILE_DIR, workers=NDVI_WORKERS, cache_size=NDVI_CACHE_SIZE):
+        self.tile_dir = tile_dir
+        self.workers = workers
+        self.catalog = TileCatalog(tile_dir)
+        self.cache = TTLCache(max_size=cache_size, ttl=NDVI_CACHE_TTL, negative_ttl=NDVI_CACHE_TTL)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _locate(self, plot, acquisition_date=None):
+        """(tile_id, meta, date) for the plot's imagery, or None if there is none"""
+        tile_id, meta = self.catalog.tile_for(plot.latitude, plot.longitude)
+        if tile_id is None:
+            return None
+        acquisition_date = acquisition_date or self.catalog.latest_date(tile_id)
+        if acquisition_date not in meta["dates"]:
+            return None
+        return tile_id, meta, acquisition_date
+
+    def health(self, plot, acquisition_date=None):
+        """Zonal NDVI statistics for one plot, computed in this thread (a window is tiny)"""
+        located = self._locate(plot, acquisition_date)
+        if located is None:
+            return None
+        tile_id, meta, acquisition_date = located
+        key = (plot, acquisition_date)
+        stats = self.cache.get(key)
+        if stats is None:
+            stats = plot_statistics(self.tile_dir, tile_id, meta, acquisition_date, plot)
+            # MISSING remembers windows without a valid pixel (e.g. under cloud)
+            self.cache.set(key, MISSING if stats is None else stats)
+        return None if stats is MISSING else stats
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def health_many(self, plots, acquisition_date=None, chunksize=64):
+        """{plot_id: stats or None} for many plots, cache misses fanned out over the pool"""
+        results, jobs, keys = {}, [], []
+        for plot in plots:
+            located = self._locate(plot, acquisition_date)
+            if located is None:
+                results[plot.plot_id] = None
+                continue
+            tile_id, meta, plot_date = located
+            key = (plot, plot_date)
+            stats = self.cache.get(key)
+            if stats is not None:
+                results[plot.plot_id] = None if stats is MISSING else stats
+                continue
+            jobs.append((self.tile_dir, tile_id, meta, plot_date, plot))
+            keys.append(key)
+
+        if jobs:
+            for key, stats in zip(keys, self._get_pool().map(_plot_statistics_job, jobs, chunksize=chunksize)):
+                self.cache.set(key, MISSING if stats is None else stats)
+                results[key[0].plot_id] = stats
+        return results
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+# 🔹 Synthetic tiles for offline development
+def write_fake_tiles(tile_dir=TILE_DIR, size=512, pixel_m=10, dates=("2026-09-28", "2026-10-12"), seed=7):
+    """A size x size tile centred on each district headquarters with smooth vegetation fields"""
+    rng = np.random.default_rng(seed)
+    half_lat = size * pixel_m / 2 / METRES_PER_DEGREE
+    for district, (latitude, longitude) in KERALA_DISTRICTS.items():
+        tile_id = f"FAKE_{district.upper()}"
+        half_lon = half_lat / math.cos(math.radians(latitude))
+        os.makedirs(os.path.join(tile_dir, tile_id), exist_ok=True)
+        with open(os.path.join(tile_dir, tile_id, "tile.json"), "w") as f:
+            json.dump({"south": latitude - half_lat, "north": latitude + half_lat,
+                       "west": longitude - half_lon, "east": longitude + half_lon,
+                       "width": size, "height": size, "pixel_m": pixel_m}, f, indent=2)
+
+        y, x = np.mgrid[0:size, 0:size] / size
+        for i, acquisition_date in enumerate(dates):
+            vigour = (0.55 + 0.25 * np.sin(6 * x + i) * np.cos(5 * y)
+                      + rng.normal(0, 0.05, (size, size))).clip(0.05, 0.95)
+            nir = rng.uniform(2500, 4000, (size, size))
+            red = nir * (1 - vigour) / (1 + vigour)
+            folder = os.path.join(tile_dir, tile_id, acquisition_date)
+            os.makedirs(folder, exist_ok=True)
+            np.save(os.path.join(folder, f"{RED_BAND}.npy"), red.astype(np.uint16))
+            np.save(os.path.join(folder, f"{NIR_BAND}.npy"), nir.astype(np.uint16))
+    return len(KERALA_DISTRICTS)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv == ["fake-tiles"]:
+        print(f"Wrote {write_fake_tiles()} synthetic tiles to {TILE_DIR}")
+        return 0
+    if argv != ["run"]:
+        print(__doc__)
+        return 2
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from storage import create_repository
+
+    pipeline = NDVIPipeline()
+    started = time.perf_counter()
+    counts, unlocated = {}, 0
+    for page in create_repository().iter_farmer_pages():
+        plots = [plot for plot in (plot_for_farmer(mobile, doc) for mobile, doc in page) if plot]
+        # District-level samples say nothing about a particular farmer's plot
+        located = [plot for plot in plots if plot.district is None]
+        unlocated += len(plots) - len(located)
+        plots = located
+        for stats in pipeline.health_many(plots).values():
+            label = stats["health"] if stats else "No imagery"
+            counts[label] = counts.get(label, 0) + 1
+    pipeline.close()
+    print(f"Crop health for {sum(counts.values())} plots in {time.perf_counter() - started:.1f}s")
+    for label, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {label:<24}{count:>8}")
+    if unlocated:
+        print(f"Skipped {unlocated} farmers without a plot location")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""Durable local queue for signups and profile updates made while Firestore is down.
+
+When the repository is unreachable the app writes signups and profile
+updates here instead of failing; the row is committed to a local SQLite file
+before the farmer sees a success message, so a crash or restart loses
+nothing.  A background thread drains the queue in order, in batches, once
+the repository is available again.
+
+Replaying is safe.  Every entry has an idempotency key (a signup's is its
+firebase_uid), so submitting it twice queues it once.  A signup whose
+document already exists counts as applied when the stored firebase_uid
+matches; otherwise the number was registered online meanwhile, and that
+signup and everything queued after it for the number are set aside as
+conflicts.  Auth users are imported from the stored password hash, which
+overwrites by uid, and profile updates are merges.
+
+An outage stops the drain so later writes never overtake earlier ones.  When
+the repository is up but rejects a batch, its rows are replayed one by one:
+a rejected row holds back only its own farmer's later writes, and after
+AGRISMART_OFFLINE_MAX_ATTEMPTS syncs it and those writes are set aside as
+conflicts, so one bad row never blocks the rest of the host's signups.
+
+The file is per host (AGRISMART_OFFLINE_QUEUE_PATH).  Processes sharing it
+may drain the same rows twice, which the rules above make harmless.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from storage import FarmerExistsError, StorageUnavailableError, _encode_value, _decode_value
+from write_behind import MAX_BATCH_SIZE
+
+OFFLINE_QUEUE_PATH = os.getenv("AGRISMART_OFFLINE_QUEUE_PATH", "offline_queue.db")
+OFFLINE_SYNC_INTERVAL = float(os.getenv("AGRISMART_OFFLINE_SYNC_INTERVAL", "10"))
+OFFLINE_MAX_ATTEMPTS = int(os.getenv("AGRISMART_OFFLINE_MAX_ATTEMPTS", "5"))
+
+SIGNUP = "signup"
+PROFILE_UPDATE = "profile_update"
+
+PENDING = "pending"
+CONFLICT = "conflict"
+
+class OfflineWriteQueue:
+    """Write-ahead queue in SQLite, drained into a FarmerRepository"""
+
+    def __init__(self, repository, path=OFFLINE_QUEUE_PATH, sync_interval=OFFLINE_SYNC_INTERVAL,
+                 batch_size=MAX_BATCH_SIZE, max_attempts=OFFLINE_MAX_ATTEMPTS):
+        self.repository = repository
+        self.path = path
+        self.sync_interval = sync_interval
+        self.max_attempts = max_attempts
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.synced = 0
+        self.failed_syncs = 0
+        self.last_sync_at = None
+        self.last_error = None
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # A queued signup must survive power loss at a field camp
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS offline_writes ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE, kind TEXT NOT NULL, "
+            "mobile TEXT NOT NULL, data TEXT NOT NULL, queued_at REAL NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', error TEXT, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(offline_writes)")}
+        if "attempts" not in columns:
+            # Queue files written before rejected rows were retried a bounded number of times
+            self._conn.execute("ALTER TABLE offline_writes ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS offline_writes_mobile ON offline_writes (mobile, status, seq)"
+        )
+
+        self._thread = threading.Thread(target=self._run, name="offline-sync", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, kind, mobile, data, key=None):
+        """Store a write durably and return its idempotency key; a repeated key is ignored"""
+        key = key or uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO offline_writes (key, kind, mobile, data, queued_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, mobile, json.dumps(data, default=_encode_value), time.time())
+            )
+        self._wake.set()
+        return key
+
+    def _pending_rows(self, mobile):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT kind, data FROM offline_writes WHERE mobile = ? AND status = ? ORDER BY seq",
+                (mobile, PENDING)
+            ).fetchall()
+
+    def has_pending(self, mobile):
+        """Whether writes for this farmer are still waiting, so new ones must queue behind them"""
+        return bool(self._pending_rows(mobile))
+
+    def pending_document(self, mobile):
+        """The farmer's queued writes folded into one document, or None if nothing is queued"""
+        rows = self._pending_rows(mobile)
+        if not rows:
+            return None
+        doc = {}
+        for _, data in rows:
+            doc.update(json.loads(data, object_hook=_decode_value))
+        return doc
+
+    # 🔹 Draining
+    def _next_batch(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT seq, kind, mobile, data FROM offline_writes WHERE status = ? ORDER BY seq LIMIT ?",
+                (PENDING, self.batch_size)
+            ).fetchall()
+
+    def _set_aside(self, mobile, error):
+        """Mark every pending write for a farmer as a conflict"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE offline_writes SET status = ?, error = ? WHERE mobile = ? AND status = ?",
+                (CONFLICT, error, mobile, PENDING)
+            )
+
+    def _record_failure(self, seq, error):
+        """Count a failed attempt at one write; returns its attempts so far"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE offline_writes SET attempts = attempts + 1, error = ? WHERE seq = ?", (str(error), seq)
+            )
+            return self._conn.execute("SELECT attempts FROM offline_writes WHERE seq = ?", (seq,)).fetchone()[0]
+
+    def _is_outage(self, error):
+        return isinstance(error, StorageUnavailableError) or not self.repository.is_available()
+
+    def _apply(self, rows):
+        """Write one batch in queue order; raises if the repository fails part-way"""
+        conflicted = set()
+        auth_users = {}
+        updates = {}
+        for seq, kind, mobile, data in rows:
+            if mobile in conflicted:
+                continue
+            doc = json.loads(data, object_hook=_decode_value)
+            if kind == SIGNUP:
+                try:
+                    self.repository.create_farmer(mobile, doc)
+                except FarmerExistsError:
+                    stored = self.repository.get_farmer(mobile) or {}
+                    if stored.get("firebase_uid") != doc["firebase_uid"]:
+                        conflicted.add(mobile)
+                        self._set_aside(mobile, "Number registered online while this signup was queued")
+                        continue
+                auth_users[doc["firebase_uid"]] = (mobile, doc["password"])
+            else:
+                updates.setdefault(mobile, {}).update(doc)
+
+        if auth_users:
+            self.repository.import_auth_users(auth_users)
+        if updates:
+            self.repository.batch_update_farmers(updates)
+
+        applied = [seq for seq, _, mobile, _ in rows if mobile not in conflicted]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("DELETE FROM offline_writes WHERE seq = ?", [(seq,) for seq in applied])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(applied)
+
+    def _apply_each(self, rows):
+        """Replay a rejected batch row by row; returns (applied, whether a row was held back)"""
+        applied = 0
+        held_back = False
+        skipped = set()
+        for row in rows:
+            seq, _, mobile, _ = row
+            if mobile in skipped:
+                continue
+            try:
+                if self._apply([row]):
+                    applied += 1
+                else:
+                    # Set aside as a conflict, with the farmer's later writes
+                    skipped.add(mobile)
+            except Exception as e:
+                self.last_error = e
+                if self._is_outage(e):
+                    return applied, True
+                # The farmer's later writes wait behind this one
+                skipped.add(mobile)
+                attempts = self._record_failure(seq, e)
+                if attempts >= self.max_attempts:
+                    self._set_aside(mobile, f"Rejected {attempts} times: {e}")
+                else:
+                    held_back = True
+        return applied, held_back
+
+    def sync(self):
+        """Drain batch by batch while the repository is up; returns the writes applied"""
+        applied = 0
+        with self._sync_lock:
+            while self.repository.is_available():
+                rows = self._next_batch()
+                if not rows:
+                    break
+                try:
+                    applied += self._apply(rows)
+                except Exception as e:
+                    self.failed_syncs += 1
+                    self.last_error = e
+                    if self._is_outage(e):
+                        # Stop so later writes never overtake this batch
+                        break
+                    # Find the rejected rows; the rest of the batch still lands
+                    done, held_back = self._apply_each(rows)
+                    applied += done
+                    if held_back:
+                        # Retry the held-back rows at the next sync
+                        break
+            self.synced += applied
+            self.last_sync_at = time.time()
+        return applied
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.sync_interval)
+            self._wake.clear()
+            if self.depth():
+                self.sync()
+
+    def close(self):
+        """Stop the sync thread; anything still queued stays on disk for the next start"""
+        self._closed = True
+        self._wake.set()
+
+    def depth(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM offline_writes WHERE status = ?", (PENDING,)
+            ).fetchone()[0]
+
+    def stats(self):
+        """Queue depth, sync lag (age of the oldest waiting write) and counters"""
+        with self._lock:
+            (depth, oldest), = self._conn.execute(
+                "SELECT COUNT(*), MIN(queued_at) FROM offline_writes WHERE status = ?", (PENDING,)
+            ).fetchall()
+            conflicts = self._conn.execute(
+                "SELECT COUNT(*) FROM offline_writes WHERE status = ?", (CONFLICT,)
+            ).fetchone()[0]
+        return {
+            "depth": depth,
+            "lag_seconds": time.time() - oldest if oldest else 0.0,
+            "conflicts": conflicts,
+            "synced": self.synced,
+            "failed_syncs": self.failed_syncs,
+            "last_sync_at": self.last_sync_at,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
@@ -0,0 +1,169 @@
+"""Opt-in profiling of one session's next few reruns, grouped by screen.
+
+Developer Mode arms a SessionProfiler in that session's state and main()
+runs the routed screen through it until the armed reruns are used up.
+Both modes only look at the session's own script thread, so every other
+session on the worker runs unprofiled:
+
+    deterministic  cProfile on the script thread; downloads as pstats
+                   (python -m pstats, snakeviz)
+    sampling       a helper thread samples the script thread's stack every
+                   few milliseconds, so waits on Firestore show up too;
+                   downloads as folded stacks (flamegraph.pl, speedscope)
+
+Only one cProfile can be active in a process (Python 3.12+ refuses a
+second one), so while another session holds it a deterministic rerun runs
+unprofiled and stays armed for a later rerun.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("AGRISMART_PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+DETERMINISTIC = "deterministic"
+SAMPLING = "sampling"
+PROFILE_MODES = [SAMPLING, DETERMINISTIC]
+
+# Held by the session whose rerun cProfile is currently tracing
+_cprofile_lock = threading.Lock()
+
+def start_cprofile():
+    """An enabled cProfile.Profile holding _cprofile_lock, or None while profiling is taken"""
+    if not _cprofile_lock.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another tool (a debugger, coverage) already owns the profiling hook
+        _cprofile_lock.release()
+        return None
+    return profile
+
+def stop_cprofile(profile):
+    profile.disable()
+    _cprofile_lock.release()
+
+def frame_label(frame):
+    code = frame.f_code
+    # ';' separates frames in folded stacks
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+class StackSampler:
+    """Counts one thread's stacks below a root frame, sampled from a helper thread"""
+
+    def __init__(self, thread_id, root_frame, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None and frame is not self.root_frame:
+            stack.append(frame_label(frame))
+            frame = frame.f_back
+        # Outside the profiled call (not started yet, or already unwinding)
+        if frame is None or not stack:
+            return
+        self.counts[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+class SessionProfiler:
+    """Profiles the next `reruns` screen runs of one session, aggregated per screen"""
+
+    def __init__(self, mode, reruns, interval=PROFILE_SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.mode = mode
+        self.remaining = reruns
+        self.interval = interval
+        # Deterministic reruns left unprofiled because the profiler was busy
+        self.busy = 0
+        # screen -> {"reruns", "seconds", "profile": pstats.Stats or None, "stacks": Counter}
+        self.screens = {}
+
+    def run(self, screen, fn):
+        """Call fn(), profiling it if reruns are left; st.rerun()/st.stop() still count"""
+        if not self.remaining:
+            return fn()
+        if self.mode == DETERMINISTIC:
+            profile = start_cprofile()
+            if profile is None:
+                self.busy += 1
+                return fn()
+        self.remaining -= 1
+        entry = self.screens.setdefault(screen, {"reruns": 0, "seconds": 0.0, "profile": None, "stacks": Counter()})
+
+        started = time.perf_counter()
+        if self.mode == DETERMINISTIC:
+            try:
+                return fn()
+            finally:
+                stop_cprofile(profile)
+                if entry["profile"] is None:
+                    entry["profile"] = pstats.Stats(profile)
+                else:
+                    entry["profile"].add(profile)
+                entry["reruns"] += 1
+                entry["seconds"] += time.perf_counter() - started
+
+        sampler = StackSampler(threading.get_ident(), sys._getframe(), self.interval)
+        sampler.start()
+        try:
+            return fn()
+        finally:
+            sampler.stop()
+            entry["stacks"].update(sampler.counts)
+            entry["reruns"] += 1
+            entry["seconds"] += time.perf_counter() - started
+
+    def summary(self):
+        return [
+            {"screen": screen, "reruns": entry["reruns"], "total ms": round(entry["seconds"] * 1000),
+             "mean ms": round(entry["seconds"] * 1000 / entry["reruns"]),
+             "samples": sum(entry["stacks"].values()) if self.mode == SAMPLING else None}
+            for screen, entry in self.screens.items()
+        ]
+
+    def top_functions(self, screen, limit=15):
+        """Text table of the slowest functions by cumulative time (deterministic mode)"""
+        entry = self.screens[screen]
+        if entry["profile"] is None:
+            return ""
+        stream = io.StringIO()
+        stats = entry["profile"]
+        stats.stream = stream
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return stream.getvalue()
+
+    def export(self, screen):
+        """(bytes, file name, mime type) of one screen's profile"""
+        entry = self.screens[screen]
+        if self.mode == DETERMINISTIC:
+            # Same format as pstats.Stats.dump_stats
+            data = marshal.dumps(entry["profile"].stats) if entry["profile"] else b""
+            return data, f"agrismart_{screen}.prof", "application/octet-stream"
+        # The screen name roots every stack, so exports from several screens can be concatenated
+        folded = "".join(f"{screen};{stack} {count}\n" for stack, count in entry["stacks"].most_common())
+        return folded.encode(), f"agrismart_{screen}.folded", "text/plain"
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Store selection: "memory" (per process) or "sqlite" (shared by every worker on the host)
+RATE_LIMIT_STORE = os.getenv("AGRISMART_RATE_LIMIT_STORE", "memory").lower()
+RATE_LIMIT_SQLITE_PATH = os.getenv("AGRISMART_RATE_LIMIT_SQLITE_PATH", "agrismart_ratelimit.db")
+
+# 🔹 Bucket stores; a bucket state is (tokens, updated_at, locked_until)
+class InMemoryLimiterStore:
+    """Bucket states in a bounded dict shared by all sessions of this process"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._states = OrderedDict()
+        # Active lockouts live outside the LRU so a flood of new keys cannot
+        # evict them; roughly ordered by expiry and pruned from the front
+        self._locked = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune_locked(self, now):
+        while self._locked and next(iter(self._locked.values()))[2] <= now:
+            self._locked.popitem(last=False)
+
+    def update(self, key, fn):
+        """Atomically replace a key's state with fn(state); returns fn's result"""
+        now = time.time()
+        with self._lock:
+            self._prune_locked(now)
+            state = self._locked.pop(key, None) or self._states.pop(key, None)
+            state, result = fn(state)
+            if state[2] > now:
+                self._locked[key] = state
+            else:
+                self._states[key] = state
+                while len(self._states) > self.max_keys:
+                    self._states.popitem(last=False)
+            return result
+
+    def delete(self, key):
+        with self._lock:
+            self._states.pop(key, None)
+            self._locked.pop(key, None)
+
+class SQLiteLimiterStore:
+    """Bucket states in a SQLite file so every worker process shares them"""
+
+    def __init__(self, path=RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL, updated_at REAL, locked_until REAL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def update(self, key, fn):
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at, locked_until FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            state, result = fn(tuple(row) if row else None)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at, locked_until) VALUES (?, ?, ?, ?)",
+                (key, *state)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM buckets WHERE key = ?", (key,))
+
+def create_limiter_store(kind=RATE_LIMIT_STORE):
+    if kind == "memory":
+        return InMemoryLimiterStore()
+    if kind == "sqlite":
+        return SQLiteLimiterStore()
+    raise ValueError(f"Unknown rate limit store: {kind}")
+
+# 🔹 Token Bucket Limiter
+class TokenBucketLimiter:
+    """Token bucket per key; an emptied bucket locks the key out for lockout_seconds"""
+
+    def __init__(self, store, capacity, refill_per_second, lockout_seconds):
+        self.store = store
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.lockout_seconds = lockout_seconds
+
+    def _refill(self, state, now):
+        if state is None:
+            return (float(self.capacity), now, 0.0)
+        tokens, updated_at, locked_until = state
+        if locked_until and locked_until <= now:
+            # Lockout served; start again with a full bucket
+            return (float(self.capacity), now, 0.0)
+        tokens = min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+        return (tokens, now, locked_until)
+
+    def retry_after(self, key):
+        """Seconds until key may try again; 0 if it may try now (consumes nothing)"""
+        now = time.time()
+
+        def peek(state):
+            state = self._refill(state, now)
+            return state, max(0.0, state[2] - now)
+        return self.store.update(key, peek)
+
+    def acquire(self, key):
+        """Take one token; returns (allowed, retry_after_seconds)"""
+        now = time.time()
+
+        def take(state):
+            tokens, updated_at, locked_until = self._refill(state, now)
+            if locked_until > now:
+                return (tokens, updated_at, locked_until), (False, locked_until - now)
+            tokens -= 1
+            if tokens < 1:
+                locked_until = now + self.lockout_seconds
+            return (tokens, updated_at, locked_until), (True, 0.0)
+        return self.store.update(key, take)
+
+    def refund(self, key):
+        """Give back a token taken by acquire; a lockout already in force stays"""
+        now = time.time()
+
+        def give(state):
+            tokens, updated_at, locked_until = self._refill(state, now)
+            if locked_until <= now:
+                tokens = min(self.capacity, tokens + 1)
+            return (tokens, updated_at, locked_until), None
+        return self.store.update(key, give)
+
+    def remaining(self, key):
+        """Whole attempts left before the key is locked out"""
+        now = time.time()
+
+        def peek(state):
+            state = self._refill(state, now)
+            left = 0 if state[2] > now else int(state[0])
+            return state, left
+        return self.store.update(key, peek)
+
+    def reset(self, key):
+        self.store.delete(key)
+
+class LoginRateLimiter:
+    """Login attempts limited per mobile number and per client IP"""
+
+    def __init__(self, store, attempts=5, ip_attempts=30, lockout_seconds=300):
+        # Each bucket refills completely over one lockout period
+        self.mobile = TokenBucketLimiter(store, attempts, attempts / lockout_seconds, lockout_seconds)
+        self.ip = TokenBucketLimiter(store, ip_attempts, ip_attempts / lockout_seconds, lockout_seconds)
+
+    def ip_retry_after(self, client_ip):
+        return self.ip.retry_after(f"ip:{client_ip}") if client_ip else 0.0
+
+    def acquire(self, mobile, client_ip):
+        """Admit one attempt before any database call; returns (allowed, retry_after)"""
+        if client_ip:
+            allowed, retry_after = self.ip.acquire(f"ip:{client_ip}")
+            if not allowed:
+                return False, retry_after
+        return self.mobile.acquire(f"mobile:{mobile}")
+
+    def remaining(self, mobile):
+        return self.mobile.remaining(f"mobile:{mobile}")
+
+    def refund(self, mobile, client_ip=None):
+        """Give back an attempt whose password was never checked, e.g. while storage was down"""
+        self.mobile.refund(f"mobile:{mobile}")
+        if client_ip:
+            self.ip.refund(f"ip:{client_ip}")
+
+    def succeeded(self, mobile, client_ip=None):
+        """A correct password clears the number's failures and costs its IP nothing.
+
+        Many farmers share one address behind a camp hotspot, so only failed
+        attempts count against the IP.
+        """
+        self.mobile.reset(f"mobile:{mobile}")
+        if client_ip:
+            self.ip.refund(f"ip:{client_ip}")
@@ -0,0 +1,166 @@
+"""Signed, expiring login tokens that let a returning farmer skip the password step.
+
+A token is base64url(JSON claims) + "." + base64url(HMAC-SHA256 of the
+claims), where the claims are the mobile number, a random token id and the
+expiry time.  Checking one is an HMAC and a clock comparison.  A
+process-wide cache maps token ids to the farmer's FarmerProfile, so a
+returning farmer reaches the dashboard without any database read; only a
+cache miss (another worker, a restart, an expired entry) reads the farmer
+document, fresh rather than from the app's farmer cache.
+
+Logout revokes a token: this process rejects it from then on until it
+expires, and the app records the token id on the farmer document, which the
+miss path checks.  So a logout holds everywhere within
+AGRISMART_SESSION_CACHE_TTL (60 s by default), the longest another worker
+keeps trusting a cached token.  If the record cannot be written the app says
+so, and only this process is sure to reject the token.
+
+Every worker must share AGRISMART_SESSION_SECRET.  Without it each process
+signs with a random key, so tokens stop working after a restart and
+farmers simply log in again.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import namedtuple
+
+from cache import TTLCache, MISSING
+
+SESSION_COOKIE = "agrismart_session"
+SESSION_TTL = int(os.getenv("AGRISMART_SESSION_TTL", str(14 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("AGRISMART_SESSION_CACHE_SIZE", "10000"))
+# Also the longest a logout can take to reach every worker
+SESSION_CACHE_TTL = int(os.getenv("AGRISMART_SESSION_CACHE_TTL", "60"))
+SESSION_COOKIE_SECURE = os.getenv("AGRISMART_SESSION_COOKIE_SECURE", "1") == "1"
+
+SessionClaims = namedtuple("SessionClaims", "mobile token_id expires_at")
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def session_secret():
+    """AGRISMART_SESSION_SECRET, or a random per-process key"""
+    secret = os.getenv("AGRISMART_SESSION_SECRET")
+    return secret.encode() if secret else secrets.token_bytes(32)
+
+def cookie_string(value, max_age):
+    """document.cookie assignment for the session cookie; max_age 0 deletes it"""
+    cookie = f"{SESSION_COOKIE}={value}; Path=/; Max-Age={max_age}; SameSite=Lax"
+    return cookie + "; Secure" if SESSION_COOKIE_SECURE else cookie
+
+class SessionTokens:
+    """Issues and verifies login tokens; caches the profile behind each verified token"""
+
+    def __init__(self, secret=None, ttl=SESSION_TTL, cache_size=SESSION_CACHE_SIZE,
+                 cache_ttl=SESSION_CACHE_TTL):
+        self.secret = secret or session_secret()
+        self.ttl = ttl
+        self.cache_ttl = cache_ttl
+        # token id -> FarmerProfile, or MISSING once rejected
+        self.cache = TTLCache(max_size=cache_size, ttl=cache_ttl, negative_ttl=cache_ttl)
+        # token id -> expires_at of tokens revoked here; unlike cache entries these
+        # stay until the token would have expired anyway
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.restored = 0
+        self.rejected = 0
+        self.revoked = 0
+        self.unrecorded_revocations = 0
+        self.last_error = None
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self.secret, payload.encode(), hashlib.sha256).digest())
+
+    def issue(self, profile):
+        """A new token for the farmer; the profile is cached so the next visit needs no read"""
+        claims = SessionClaims(profile.mobile, secrets.token_hex(8), int(time.time()) + self.ttl)
+        payload = _b64encode(json.dumps(list(claims), separators=(",", ":")).encode())
+        with self._lock:
+            self.cache.set(claims.token_id, profile)
+            self.issued += 1
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token):
+        """SessionClaims of a well-signed, unexpired token, else None"""
+        try:
+            payload, signature = token.split(".")
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            claims = SessionClaims(*json.loads(_b64decode(payload)))
+            if claims.expires_at <= time.time():
+                return None
+        except (ValueError, TypeError):
+            return None
+        return claims
+
+    def resolve(self, token, load_profile):
+        """(claims, profile) for a valid token, else None.
+
+        load_profile(claims) runs only on a cache miss and returns the
+        farmer's profile, or None if the farmer is gone or revoked the token.
+        Only that None is cached as a rejection; if load_profile raises (e.g.
+        storage is down) the error propagates and nothing is cached.
+        """
+        claims = self.verify(token)
+        if claims is None or claims.token_id in self._revoked:
+            cached = MISSING
+        else:
+            cached = self.cache.get(claims.token_id)
+        if cached is None:
+            cached = load_profile(claims)
+            with self._lock:
+                self.cache.set(claims.token_id, MISSING if cached is None else cached)
+        if cached is None or cached is MISSING:
+            self.rejected += 1
+            return None
+        self.restored += 1
+        return claims, cached
+
+    def refresh(self, token, profile):
+        """Cache the farmer's updated profile behind their current token"""
+        claims = self.verify(token) if token else None
+        if claims is not None:
+            with self._lock:
+                self.cache.set(claims.token_id, profile)
+
+    def revoke(self, token):
+        """Reject the token from now on in this process; returns its claims for the durable record"""
+        claims = self.verify(token) if token else None
+        if claims is not None:
+            now = time.time()
+            with self._lock:
+                self._revoked = {
+                    token_id: expires_at for token_id, expires_at in self._revoked.items() if expires_at > now
+                }
+                self._revoked[claims.token_id] = claims.expires_at
+                self.cache.set(claims.token_id, MISSING)
+                self.revoked += 1
+        return claims
+
+    def revocation_unrecorded(self, error):
+        """The durable record of a revocation failed; other workers may still accept the token"""
+        with self._lock:
+            self.unrecorded_revocations += 1
+            self.last_error = error
+
+    def stats(self):
+        cache_stats = self.cache.stats()
+        return {
+            "cached": cache_stats["size"],
+            "hit_rate": cache_stats["hit_rate"],
+            "issued": self.issued,
+            "restored": self.restored,
+            "rejected": self.rejected,
+            "revoked": self.revoked,
+            "unrecorded_revocations": self.unrecorded_revocations,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
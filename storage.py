@@ -0,0 +1,758 @@
+import bisect
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Backend selection: "firestore" (default), "memory" or "sqlite"
+STORAGE_BACKEND = os.getenv("AGRISMART_STORAGE", "firestore").lower()
+SQLITE_PATH = os.getenv("AGRISMART_SQLITE_PATH", "agrismart.db")
+
+HEALTH_CHECK_INTERVAL = 60  # seconds between health probes of a suspect client
+HEALTH_CHECK_TIMEOUT = 5  # seconds a probe may take before the client counts as down
+# Seconds a Firestore call may spend, retries included, before it counts as an outage
+FIRESTORE_TIMEOUT = float(os.getenv("AGRISMART_FIRESTORE_TIMEOUT", "5"))
+RECONNECT_INTERVAL = 15  # seconds to wait before retrying a failed connection
+
+class FarmerExistsError(Exception):
+    """Raised when creating a farmer document that already exists"""
+
+class StorageUnavailableError(Exception):
+    """Raised when the backing store cannot be reached"""
+
+# 🔹 Repository Interface
+class FarmerRepository:
+    """Storage for farmers/{mobile} documents and their auth users"""
+
+    name = "base"
+
+    def is_available(self):
+        return True
+
+    def get_farmer(self, mobile):
+        """Return the farmer document as a dict, or None if it does not exist"""
+        raise NotImplementedError
+
+    def create_farmer(self, mobile, data):
+        """Create the document only if absent; raise FarmerExistsError otherwise"""
+        raise NotImplementedError
+
+    def update_farmer(self, mobile, fields):
+        """Merge fields into an existing farmer document"""
+        raise NotImplementedError
+
+    def delete_farmer(self, mobile):
+        raise NotImplementedError
+
+    def batch_update_farmers(self, updates):
+        """Apply {mobile: fields} updates together"""
+        for mobile, fields in updates.items():
+            self.update_farmer(mobile, fields)
+
+    def batch_create_farmers(self, docs):
+        """Create the {mobile: data} documents that do not exist yet; returns the mobiles created"""
+        created = []
+        for mobile, data in docs.items():
+            try:
+                self.create_farmer(mobile, data)
+                created.append(mobile)
+            except FarmerExistsError:
+                pass
+        return created
+
+    def batch_upsert_farmers(self, docs):
+        """Create or merge {mobile: data} documents together"""
+        raise NotImplementedError
+
+    def iter_farmer_pages(self, page_size=500, start_after=None):
+        """Yield pages of (mobile, data) ordered by mobile, resuming after a cursor"""
+        raise NotImplementedError
+
+    def create_auth_user(self, uid, mobile, password):
+        """Register the login identity for a farmer and return its uid"""
+        raise NotImplementedError
+
+    def import_auth_users(self, users):
+        """Create or overwrite {uid: (mobile, password_hash)} login identities together.
+
+        password_hash is hash_password()'s SHA-256 hex digest, so queued
+        signups never keep the plain password.
+        """
+        raise NotImplementedError
+
+    def increment_counters(self, shard, deltas):
+        """Add {key: delta} to one aggregate counter shard"""
+        raise NotImplementedError
+
+    def read_counter_shards(self):
+        """Return the {key: count} map of every counter shard"""
+        raise NotImplementedError
+
+    def replace_counters(self, num_shards, totals):
+        """Reset all shards so that they sum to totals"""
+        raise NotImplementedError
+
+    def get_irrigation_schedule(self, mobile):
+        """Return the precomputed irrigation schedule for a farmer, or None"""
+        raise NotImplementedError
+
+    def put_irrigation_schedules(self, schedules):
+        """Replace {mobile: schedule} documents together"""
+        raise NotImplementedError
+
+    def append_activities(self, events):
+        """Add {(mobile, event_id): event} entries to the farmers' activity logs together"""
+        raise NotImplementedError
+
+    def list_activities(self, mobile, limit, before=None):
+        """Newest-first [(event_id, event)] for a farmer, starting below the before cursor"""
+        raise NotImplementedError
+
+# 🔹 Firestore Backend
+class FirebaseResource:
+    """Process-wide Firebase app and Firestore client with lazy reconnect"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.client = None
+        self.error = None
+        self.healthy = False
+        self.announced = False
+        self.connected_at = None
+        self._last_attempt = 0.0
+        self._last_check = 0.0
+        self._probing = False
+
+    def _connect(self):
+        """Parse FIREBASE_CREDS and build the Firebase app and Firestore client"""
+        self._last_attempt = time.monotonic()
+        try:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+
+            firebase_creds = os.getenv("FIREBASE_CREDS")
+            if not firebase_creds:
+                raise ValueError("❌ FIREBASE_CREDS not found in .env")
+
+            # Parse the JSON string
+            cred_dict = json.loads(firebase_creds)
+
+            # Fix private key newlines
+            cred_dict["private_key"] = cred_dict["private_key"].replace("\\n", "\n")
+
+            cred = credentials.Certificate(cred_dict)
+
+            # Drop a stale app so reconnects get a fresh channel
+            if firebase_admin._apps:
+                firebase_admin.delete_app(firebase_admin.get_app())
+            firebase_admin.initialize_app(cred)
+
+            self.client = firestore.client()
+            self.error = None
+            self.healthy = True
+            self.connected_at = datetime.now()
+            self._last_check = time.monotonic()
+        except Exception as e:
+            self.client = None
+            self.error = e
+            self.healthy = False
+
+    def check_health(self):
+        """Probe Firestore with a cheap call and record the result"""
+        self._last_check = time.monotonic()
+        if self.client is None:
+            return False
+        try:
+            # One short attempt: a probe that waits out the default retries only delays recovery
+            next(iter(self.client.collections(retry=None, timeout=HEALTH_CHECK_TIMEOUT)), None)
+            self.healthy = True
+        except Exception as e:
+            self.error = e
+            self.healthy = False
+        return self.healthy
+
+    def mark_unhealthy(self, error):
+        """Flag the client as suspect so the next access re-checks it"""
+        self.error = error
+        self.healthy = False
+
+    def mark_healthy(self):
+        """A call just succeeded, so the client is reachable again"""
+        self.healthy = True
+
+    def _probe(self):
+        """Health probe on its own thread, so no caller waits on the network"""
+        try:
+            if not self.check_health():
+                error = self.error
+                with self._lock:
+                    self._connect()
+                    # Building a client needs no network; trust it once a call succeeds
+                    if self.client is not None:
+                        self.healthy = False
+                        self.error = error
+        finally:
+            self._probing = False
+
+    def get_client(self):
+        """Return the shared Firestore client, reconnecting lazily if needed.
+
+        Never blocks on the network: a suspect client is returned as it is
+        while a background probe decides whether it is healthy again.
+        """
+        now = time.monotonic()
+        if self.client is not None and self.healthy:
+            return self.client
+
+        with self._lock:
+            if self.client is None:
+                if now - self._last_attempt >= RECONNECT_INTERVAL or not self._last_attempt:
+                    self._connect()
+            elif not self.healthy and not self._probing and now - self._last_check >= HEALTH_CHECK_INTERVAL:
+                self._probing = True
+                self._last_check = now
+                threading.Thread(target=self._probe, name="firestore-probe", daemon=True).start()
+        return self.client
+
+class FirestoreFarmerRepository(FarmerRepository):
+    """Farmers in the Firestore "farmers" collection, users in Firebase Auth"""
+
+    name = "firestore"
+
+    def __init__(self, resource):
+        self.resource = resource
+        self._rpc_options = None
+
+    def _rpc(self):
+        """retry/timeout keywords bounding every call by FIRESTORE_TIMEOUT.
+
+        The library defaults retry for a minute, which kept a signup waiting
+        that long before it could fall back to the offline queue.
+        """
+        if self._rpc_options is None:
+            from google.api_core.retry import Retry
+            self._rpc_options = {"retry": Retry(timeout=FIRESTORE_TIMEOUT), "timeout": FIRESTORE_TIMEOUT}
+        return self._rpc_options
+
+    def _db(self):
+        db = self.resource.get_client()
+        if db is None:
+            raise StorageUnavailableError(f"Firestore unavailable: {self.resource.error}")
+        return db
+
+    def _collection(self):
+        return self._db().collection("farmers")
+
+    def _call(self, fn):
+        """Run a Firestore call; a transport failure flags the client and raises StorageUnavailableError.
+
+        Errors about the request itself (a missing document, an invalid
+        argument) say nothing about connectivity and are raised unchanged.
+        """
+        from google.api_core.exceptions import ClientError
+
+        try:
+            result = fn()
+        except (FarmerExistsError, StorageUnavailableError, ClientError):
+            raise
+        except Exception as e:
+            self.resource.mark_unhealthy(e)
+            raise StorageUnavailableError(f"Firestore unavailable: {e}") from e
+        if not self.resource.healthy:
+            self.resource.mark_healthy()
+        return result
+
+    def is_available(self):
+        # A client builds without any network, so only calls and probes tell
+        return self.resource.get_client() is not None and self.resource.healthy
+
+    def get_farmer(self, mobile):
+        doc = self._call(lambda: self._collection().document(mobile).get(**self._rpc()))
+        return doc.to_dict() if doc.exists else None
+
+    def create_farmer(self, mobile, data):
+        from google.api_core.exceptions import AlreadyExists
+
+        def create():
+            try:
+                self._collection().document(mobile).create(data, **self._rpc())
+            except AlreadyExists:
+                raise FarmerExistsError(mobile)
+        self._call(create)
+
+    def update_farmer(self, mobile, fields):
+        self._call(lambda: self._collection().document(mobile).update(fields, **self._rpc()))
+
+    def delete_farmer(self, mobile):
+        self._call(lambda: self._collection().document(mobile).delete(**self._rpc()))
+
+    def batch_update_farmers(self, updates):
+        def commit():
+            db = self._db()
+            batch = db.batch()
+            for mobile, fields in updates.items():
+                batch.update(db.collection("farmers").document(mobile), fields)
+            batch.commit(**self._rpc())
+        self._call(commit)
+
+    def batch_create_farmers(self, docs):
+        def commit():
+            db = self._db()
+            refs = {mobile: db.collection("farmers").document(mobile) for mobile in docs}
+            existing = {snapshot.id for snapshot in db.get_all(list(refs.values()), **self._rpc()) if snapshot.exists}
+            created = [mobile for mobile in docs if mobile not in existing]
+            if created:
+                # create() fails the whole batch if a document appeared since the read
+                batch = db.batch()
+                for mobile in created:
+                    batch.create(refs[mobile], docs[mobile])
+                batch.commit(**self._rpc())
+            return created
+        return self._call(commit)
+
+    def batch_upsert_farmers(self, docs):
+        def commit():
+            db = self._db()
+            batch = db.batch()
+            for mobile, data in docs.items():
+                batch.set(db.collection("farmers").document(mobile), data, merge=True)
+            batch.commit(**self._rpc())
+        self._call(commit)
+
+    def iter_farmer_pages(self, page_size=500, start_after=None):
+        collection = self._collection()
+        while True:
+            query = collection.order_by("__name__").limit(page_size)
+            if start_after is not None:
+                query = query.start_after({"__name__": collection.document(start_after)})
+            page = [(doc.id, doc.to_dict()) for doc in self._call(lambda: query.get(**self._rpc()))]
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            start_after = page[-1][0]
+
+    def create_auth_user(self, uid, mobile, password):
+        from firebase_admin import auth
+
+        # In a real app, you'd use phone authentication
+        # For demo purposes, we'll create with email format
+        user_record = auth.create_user(
+            uid=uid,
+            email=f"{mobile}@agrismart.com",
+            password=password,
+            phone_number=f"+91{mobile}",
+            display_name=f"Farmer {mobile}"
+        )
+        return user_record.uid
+
+    def import_auth_users(self, users):
+        from firebase_admin import auth
+
+        records = [
+            auth.ImportUserRecord(
+                uid,
+                email=f"{mobile}@agrismart.com",
+                phone_number=f"+91{mobile}",
+                display_name=f"Farmer {mobile}",
+                password_hash=bytes.fromhex(password_hash)
+            )
+            for uid, (mobile, password_hash) in users.items()
+        ]
+        # import_users takes at most 1000 users per call and overwrites by uid
+        for i in range(0, len(records), 1000):
+            result = auth.import_users(records[i:i + 1000], hash_alg=auth.UserImportHash.sha256(rounds=1))
+            if result.failure_count:
+                raise RuntimeError(f"Auth import failed for {result.failure_count} users: {result.errors[0].reason}")
+
+    def increment_counters(self, shard, deltas):
+        from firebase_admin import firestore
+
+        counts = {key: firestore.Increment(delta) for key, delta in deltas.items()}
+        self._call(lambda: self._db().collection("farm_stats").document(f"shard_{shard}").set(
+            {"counts": counts}, merge=True, **self._rpc()
+        ))
+
+    def read_counter_shards(self):
+        docs = self._call(lambda: list(self._db().collection("farm_stats").stream(**self._rpc())))
+        return [doc.to_dict().get("counts", {}) for doc in docs]
+
+    def replace_counters(self, num_shards, totals):
+        def commit():
+            db = self._db()
+            batch = db.batch()
+            for shard in range(num_shards):
+                batch.set(db.collection("farm_stats").document(f"shard_{shard}"),
+                          {"counts": totals if shard == 0 else {}})
+            batch.commit(**self._rpc())
+        self._call(commit)
+
+    def get_irrigation_schedule(self, mobile):
+        doc = self._call(lambda: self._db().collection("irrigation_schedules").document(mobile).get(**self._rpc()))
+        return doc.to_dict() if doc.exists else None
+
+    def put_irrigation_schedules(self, schedules):
+        def commit():
+            db = self._db()
+            batch = db.batch()
+            for mobile, schedule in schedules.items():
+                batch.set(db.collection("irrigation_schedules").document(mobile), schedule)
+            batch.commit(**self._rpc())
+        self._call(commit)
+
+    def _activity(self, mobile):
+        return self._collection().document(mobile).collection("activity")
+
+    def append_activities(self, events):
+        def commit():
+            batch = self._db().batch()
+            for (mobile, event_id), event in events.items():
+                batch.set(self._activity(mobile).document(event_id), event)
+            batch.commit(**self._rpc())
+        self._call(commit)
+
+    def list_activities(self, mobile, limit, before=None):
+        from firebase_admin import firestore
+
+        # Event ids sort by time, so the id index serves the page without a scan
+        activity = self._activity(mobile)
+        query = activity.order_by("__name__", direction=firestore.Query.DESCENDING).limit(limit)
+        if before is not None:
+            query = query.start_after({"__name__": activity.document(before)})
+        return [(doc.id, doc.to_dict()) for doc in self._call(lambda: query.get(**self._rpc()))]
+
+# 🔹 In-memory Backend (load tests, offline development)
+class InMemoryFarmerRepository(FarmerRepository):
+    """Process-local dicts; nothing survives a restart"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._farmers = {}
+        self._auth_users = {}
+        self._counters = {}
+        self._schedules = {}
+        self._activities = {}
+
+    def get_farmer(self, mobile):
+        with self._lock:
+            data = self._farmers.get(mobile)
+            return dict(data) if data is not None else None
+
+    def create_farmer(self, mobile, data):
+        with self._lock:
+            if mobile in self._farmers:
+                raise FarmerExistsError(mobile)
+            self._farmers[mobile] = dict(data)
+
+    def update_farmer(self, mobile, fields):
+        with self._lock:
+            if mobile not in self._farmers:
+                raise KeyError(f"No farmer document for {mobile}")
+            self._farmers[mobile].update(fields)
+
+    def delete_farmer(self, mobile):
+        with self._lock:
+            self._farmers.pop(mobile, None)
+
+    def batch_upsert_farmers(self, docs):
+        with self._lock:
+            for mobile, data in docs.items():
+                self._farmers.setdefault(mobile, {}).update(data)
+
+    def iter_farmer_pages(self, page_size=500, start_after=None):
+        while True:
+            with self._lock:
+                mobiles = sorted(m for m in self._farmers if start_after is None or m > start_after)
+                page = [(m, dict(self._farmers[m])) for m in mobiles[:page_size]]
+            if not page:
+                return
+            yield page
+            start_after = page[-1][0]
+
+    def create_auth_user(self, uid, mobile, password):
+        with self._lock:
+            if any(user["mobile"] == mobile for user in self._auth_users.values()):
+                raise ValueError(f"Auth user already exists for {mobile}")
+            self._auth_users[uid] = {"mobile": mobile}
+        return uid
+
+    def import_auth_users(self, users):
+        with self._lock:
+            for uid, (mobile, _) in users.items():
+                self._auth_users[uid] = {"mobile": mobile}
+
+    def increment_counters(self, shard, deltas):
+        with self._lock:
+            counts = self._counters.setdefault(shard, {})
+            for key, delta in deltas.items():
+                counts[key] = counts.get(key, 0) + delta
+
+    def read_counter_shards(self):
+        with self._lock:
+            return [dict(counts) for counts in self._counters.values()]
+
+    def replace_counters(self, num_shards, totals):
+        with self._lock:
+            self._counters = {shard: {} for shard in range(num_shards)}
+            self._counters[0] = dict(totals)
+
+    def get_irrigation_schedule(self, mobile):
+        with self._lock:
+            return self._schedules.get(mobile)
+
+    def put_irrigation_schedules(self, schedules):
+        with self._lock:
+            self._schedules.update(schedules)
+
+    def append_activities(self, events):
+        with self._lock:
+            for (mobile, event_id), event in events.items():
+                # Kept sorted by event id, oldest first
+                bisect.insort(self._activities.setdefault(mobile, []), (event_id, dict(event)))
+
+    def list_activities(self, mobile, limit, before=None):
+        with self._lock:
+            log = self._activities.get(mobile, [])
+            end = len(log) if before is None else bisect.bisect_left(log, (before,))
+            return [(event_id, dict(event)) for event_id, event in reversed(log[max(0, end - limit):end])]
+
+# 🔹 SQLite Backend (single-host capacity tests)
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+def _decode_value(obj):
+    if "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+class SQLiteFarmerRepository(FarmerRepository):
+    """Farmer documents stored as JSON rows in a local SQLite file"""
+
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS farmers (mobile TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS auth_users (uid TEXT PRIMARY KEY, mobile TEXT NOT NULL UNIQUE)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS farm_stats ("
+            "shard INTEGER, key TEXT, value INTEGER NOT NULL, PRIMARY KEY (shard, key))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS irrigation_schedules (mobile TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity ("
+            "mobile TEXT, event_id TEXT, data TEXT NOT NULL, PRIMARY KEY (mobile, event_id))"
+        )
+
+    def get_farmer(self, mobile):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM farmers WHERE mobile = ?", (mobile,)
+            ).fetchone()
+        return json.loads(row[0], object_hook=_decode_value) if row else None
+
+    def create_farmer(self, mobile, data):
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO farmers (mobile, data) VALUES (?, ?)",
+                    (mobile, json.dumps(data, default=_encode_value))
+                )
+        except sqlite3.IntegrityError:
+            raise FarmerExistsError(mobile)
+
+    def _merge(self, mobile, fields):
+        row = self._conn.execute(
+            "SELECT data FROM farmers WHERE mobile = ?", (mobile,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"No farmer document for {mobile}")
+        data = json.loads(row[0], object_hook=_decode_value)
+        data.update(fields)
+        self._conn.execute(
+            "UPDATE farmers SET data = ? WHERE mobile = ?",
+            (json.dumps(data, default=_encode_value), mobile)
+        )
+
+    def update_farmer(self, mobile, fields):
+        with self._lock:
+            self._merge(mobile, fields)
+
+    def delete_farmer(self, mobile):
+        with self._lock:
+            self._conn.execute("DELETE FROM farmers WHERE mobile = ?", (mobile,))
+
+    def batch_update_farmers(self, updates):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for mobile, fields in updates.items():
+                    self._merge(mobile, fields)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def batch_create_farmers(self, docs):
+        created = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for mobile, data in docs.items():
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO farmers (mobile, data) VALUES (?, ?)",
+                        (mobile, json.dumps(data, default=_encode_value))
+                    )
+                    if cursor.rowcount:
+                        created.append(mobile)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return created
+
+    def batch_upsert_farmers(self, docs):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for mobile, data in docs.items():
+                    row = self._conn.execute(
+                        "SELECT data FROM farmers WHERE mobile = ?", (mobile,)
+                    ).fetchone()
+                    merged = json.loads(row[0], object_hook=_decode_value) if row else {}
+                    merged.update(data)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO farmers (mobile, data) VALUES (?, ?)",
+                        (mobile, json.dumps(merged, default=_encode_value))
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def iter_farmer_pages(self, page_size=500, start_after=None):
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT mobile, data FROM farmers WHERE mobile > ? ORDER BY mobile LIMIT ?",
+                    (start_after or "", page_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [(mobile, json.loads(data, object_hook=_decode_value)) for mobile, data in rows]
+            start_after = rows[-1][0]
+
+    def create_auth_user(self, uid, mobile, password):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO auth_users (uid, mobile) VALUES (?, ?)", (uid, mobile)
+            )
+        return uid
+
+    def import_auth_users(self, users):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO auth_users (uid, mobile) VALUES (?, ?)",
+                [(uid, mobile) for uid, (mobile, _) in users.items()]
+            )
+
+    def increment_counters(self, shard, deltas):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO farm_stats (shard, key, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (shard, key) DO UPDATE SET value = value + excluded.value",
+                [(shard, key, delta) for key, delta in deltas.items()]
+            )
+
+    def read_counter_shards(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT shard, key, value FROM farm_stats").fetchall()
+        shards = {}
+        for shard, key, value in rows:
+            shards.setdefault(shard, {})[key] = value
+        return list(shards.values())
+
+    def replace_counters(self, num_shards, totals):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM farm_stats")
+                self._conn.executemany(
+                    "INSERT INTO farm_stats (shard, key, value) VALUES (0, ?, ?)",
+                    list(totals.items())
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_irrigation_schedule(self, mobile):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM irrigation_schedules WHERE mobile = ?", (mobile,)
+            ).fetchone()
+        return json.loads(row[0], object_hook=_decode_value) if row else None
+
+    def put_irrigation_schedules(self, schedules):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO irrigation_schedules (mobile, data) VALUES (?, ?)",
+                    [(mobile, json.dumps(schedule, default=_encode_value))
+                     for mobile, schedule in schedules.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def append_activities(self, events):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO activity (mobile, event_id, data) VALUES (?, ?, ?)",
+                    [(mobile, event_id, json.dumps(event, default=_encode_value))
+                     for (mobile, event_id), event in events.items()]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def list_activities(self, mobile, limit, before=None):
+        # The (mobile, event_id) primary key serves this without scanning older events
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event_id, data FROM activity WHERE mobile = ? AND event_id < ? "
+                "ORDER BY event_id DESC LIMIT ?",
+                (mobile, before or "\uffff", limit)
+            ).fetchall()
+        return [(event_id, json.loads(data, object_hook=_decode_value)) for event_id, data in rows]
+
+def create_repository(backend=STORAGE_BACKEND, firebase_resource=None):
+    """Build the repository named by AGRISMART_STORAGE"""
+    if backend == "memory":
+        return InMemoryFarmerRepository()
+    if backend == "sqlite":
+        return SQLiteFarmerRepository()
+    if backend == "firestore":
+        return FirestoreFarmerRepository(firebase_resource or FirebaseResource())
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+
+from farm_data import hash_password
+from offline_queue import OfflineWriteQueue, PROFILE_UPDATE, SIGNUP
+from storage import SQLiteFarmerRepository, StorageUnavailableError
+
+@pytest.fixture
+def repository(tmp_path):
+    return SQLiteFarmerRepository(str(tmp_path / "farmers.db"))
+
+@pytest.fixture
+def make_queue(tmp_path):
+    def make(repository, **kwargs):
+        queue = OfflineWriteQueue(repository, path=str(tmp_path / "queue.db"), **kwargs)
+        # Drain only when the test calls sync()
+        queue.close()
+        queue._thread.join()
+        return queue
+    return make
+
+def signup(mobile):
+    return {"mobile": mobile, "password": hash_password("secret1"), "firebase_uid": f"uid-{mobile}",
+            "created_at": datetime(2026, 1, 1), "profile_completed": False}
+
+def submit_signup(queue, mobile):
+    queue.submit(SIGNUP, mobile, signup(mobile), key=f"uid-{mobile}")
+
+def test_signups_and_updates_drain_in_order(repository, make_queue):
+    queue = make_queue(repository)
+    submit_signup(queue, "9000000001")
+    queue.submit(PROFILE_UPDATE, "9000000001", {"name": "Asha"})
+    queue.submit(PROFILE_UPDATE, "9000000001", {"name": "Asha K"})
+
+    assert queue.pending_document("9000000001")["name"] == "Asha K"
+    assert queue.sync() == 3
+    assert repository.get_farmer("9000000001")["name"] == "Asha K"
+    assert queue.depth() == 0
+
+def test_replayed_signup_counts_as_applied(repository, make_queue):
+    queue = make_queue(repository)
+    repository.create_farmer("9000000001", signup("9000000001"))
+    submit_signup(queue, "9000000001")
+    assert queue.sync() == 1
+    assert queue.stats()["conflicts"] == 0
+
+def test_number_registered_online_is_a_conflict(repository, make_queue):
+    queue = make_queue(repository)
+    repository.create_farmer("9000000001", dict(signup("9000000001"), firebase_uid="online"))
+    submit_signup(queue, "9000000001")
+    queue.submit(PROFILE_UPDATE, "9000000001", {"name": "Asha"})
+    assert queue.sync() == 0
+    assert queue.stats()["conflicts"] == 2
+    assert "name" not in repository.get_farmer("9000000001")
+
+def test_rejected_row_does_not_block_other_farmers(repository, make_queue):
+    queue = make_queue(repository, max_attempts=3)
+    # A merge into a document that no longer exists fails every time
+    queue.submit(PROFILE_UPDATE, "9000000009", {"name": "Gone"})
+    queue.submit(PROFILE_UPDATE, "9000000009", {"name": "Gone again"})
+    for mobile in ("9000000001", "9000000002"):
+        submit_signup(queue, mobile)
+
+    assert queue.sync() == 2
+    assert repository.get_farmer("9000000002") is not None
+    assert queue.depth() == 2
+
+    # Later signups still land while the rejected row is retried
+    submit_signup(queue, "9000000003")
+    assert queue.sync() == 1
+    assert queue.sync() == 0
+    stats = queue.stats()
+    assert stats["depth"] == 0
+    assert stats["conflicts"] == 2
+
+def test_outage_stops_the_drain_without_counting_attempts(repository, make_queue):
+    queue = make_queue(repository, max_attempts=1)
+    submit_signup(queue, "9000000001")
+
+    def unavailable(mobile, data):
+        raise StorageUnavailableError("offline")
+    create_farmer, repository.create_farmer = repository.create_farmer, unavailable
+
+    assert queue.sync() == 0
+    assert queue.stats()["conflicts"] == 0
+    assert queue.depth() == 1
+
+    repository.create_farmer = create_farmer
+    assert queue.sync() == 1
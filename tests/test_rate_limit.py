@@ -0,0 +1,113 @@
+import pytest
+
+import rate_limit
+from rate_limit import InMemoryLimiterStore, LoginRateLimiter, SQLiteLimiterStore, TokenBucketLimiter
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "time", clock)
+    return clock
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryLimiterStore()
+    return SQLiteLimiterStore(str(tmp_path / "ratelimit.db"))
+
+def test_bucket_locks_out_after_capacity(clock, store):
+    bucket = TokenBucketLimiter(store, capacity=5, refill_per_second=5 / 300, lockout_seconds=300)
+    assert [bucket.acquire("k")[0] for _ in range(5)] == [True] * 5
+    allowed, retry_after = bucket.acquire("k")
+    assert not allowed
+    assert retry_after == pytest.approx(300)
+    assert bucket.remaining("k") == 0
+
+def test_lockout_expires_with_a_full_bucket(clock, store):
+    bucket = TokenBucketLimiter(store, capacity=3, refill_per_second=3 / 60, lockout_seconds=60)
+    for _ in range(3):
+        bucket.acquire("k")
+    clock.now += 59
+    assert bucket.retry_after("k") == pytest.approx(1)
+    clock.now += 1
+    assert bucket.retry_after("k") == 0
+    assert bucket.remaining("k") == 3
+
+def test_bucket_refills_over_time(clock, store):
+    bucket = TokenBucketLimiter(store, capacity=5, refill_per_second=1, lockout_seconds=300)
+    for _ in range(3):
+        bucket.acquire("k")
+    assert bucket.remaining("k") == 2
+    clock.now += 2
+    assert bucket.remaining("k") == 4
+
+def test_refund_does_not_lift_a_lockout(clock, store):
+    bucket = TokenBucketLimiter(store, capacity=2, refill_per_second=0, lockout_seconds=300)
+    bucket.acquire("k")
+    bucket.refund("k")
+    assert bucket.remaining("k") == 2
+    bucket.acquire("k")
+    bucket.acquire("k")
+    bucket.refund("k")
+    assert bucket.retry_after("k") == pytest.approx(300)
+
+def test_successful_logins_do_not_drain_the_ip_bucket(clock, store):
+    limiter = LoginRateLimiter(store, attempts=5, ip_attempts=30, lockout_seconds=300)
+    for i in range(100):
+        mobile = f"90000{i:05d}"
+        assert limiter.acquire(mobile, "10.0.0.1") == (True, 0.0)
+        limiter.succeeded(mobile, "10.0.0.1")
+    assert limiter.ip_retry_after("10.0.0.1") == 0
+
+def test_failed_logins_lock_the_ip(clock, store):
+    limiter = LoginRateLimiter(store, attempts=5, ip_attempts=30, lockout_seconds=300)
+    for i in range(30):
+        assert limiter.acquire(f"90000{i:05d}", "10.0.0.1")[0]
+    assert limiter.ip_retry_after("10.0.0.1") == pytest.approx(300)
+    assert not limiter.acquire("9111111111", "10.0.0.1")[0]
+
+def test_success_clears_the_number(clock, store):
+    limiter = LoginRateLimiter(store, attempts=5, ip_attempts=30, lockout_seconds=300)
+    for _ in range(4):
+        limiter.acquire("9876543210", None)
+    assert limiter.remaining("9876543210") == 1
+    limiter.succeeded("9876543210")
+    assert limiter.remaining("9876543210") == 5
+
+def test_flood_of_new_keys_does_not_evict_an_active_lockout(clock):
+    store = InMemoryLimiterStore(max_keys=100)
+    limiter = LoginRateLimiter(store, attempts=5, ip_attempts=30, lockout_seconds=300)
+    for _ in range(5):
+        limiter.acquire("9876543210", None)
+    assert limiter.remaining("9876543210") == 0
+
+    for i in range(1000):
+        limiter.ip_retry_after(f"198.51.100.{i}")
+    assert not limiter.acquire("9876543210", None)[0]
+
+    clock.now += 300
+    assert limiter.remaining("9876543210") == 5
+
+def test_store_stays_bounded_without_lockouts(clock):
+    store = InMemoryLimiterStore(max_keys=100)
+    bucket = TokenBucketLimiter(store, capacity=5, refill_per_second=1, lockout_seconds=300)
+    for i in range(1000):
+        bucket.acquire(f"k{i}")
+    assert len(store._states) == 100
+    assert not store._locked
+
+def test_unchecked_attempt_is_refunded(clock, store):
+    limiter = LoginRateLimiter(store, attempts=5, ip_attempts=30, lockout_seconds=300)
+    for _ in range(20):
+        assert limiter.acquire("9876543210", "10.0.0.1")[0]
+        # Storage was down, so the password was never checked
+        limiter.refund("9876543210", "10.0.0.1")
+    assert limiter.remaining("9876543210") == 5
+    assert limiter.ip_retry_after("10.0.0.1") == 0
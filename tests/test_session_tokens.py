@@ -0,0 +1,126 @@
+import pytest
+
+import session_tokens
+from farm_data import FarmerProfile
+from session_tokens import SessionTokens, cookie_string, _b64decode, _b64encode
+from storage import StorageUnavailableError
+
+SECRET = b"test-secret"
+
+@pytest.fixture
+def tokens():
+    return SessionTokens(secret=SECRET, ttl=3600)
+
+@pytest.fixture
+def profile():
+    return FarmerProfile("9876543210", name="Asha", profile_completed=True)
+
+def unexpected_read(claims):
+    raise AssertionError("profile read on a cache hit")
+
+def test_issued_token_verifies(tokens, profile):
+    claims = tokens.verify(tokens.issue(profile))
+    assert claims.mobile == "9876543210"
+    assert claims.expires_at > 0
+
+def test_issued_token_resolves_without_a_read(tokens, profile):
+    token = tokens.issue(profile)
+    claims, restored = tokens.resolve(token, unexpected_read)
+    assert restored is profile
+    assert tokens.stats()["restored"] == 1
+
+@pytest.mark.parametrize("tamper", [
+    lambda payload, signature: (_b64encode(_b64decode(payload).replace(b"9876543210", b"9000000000")), signature),
+    lambda payload, signature: (payload, signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")),
+    lambda payload, signature: (payload, ""),
+])
+def test_tampered_token_is_rejected(tokens, profile, tamper):
+    token = ".".join(tamper(*tokens.issue(profile).split(".")))
+    assert tokens.verify(token) is None
+    assert tokens.resolve(token, unexpected_read) is None
+
+@pytest.mark.parametrize("token", ["", "no-dot", "a.b.c", "!!!.???"])
+def test_malformed_token_is_rejected(tokens, token):
+    assert tokens.verify(token) is None
+
+def test_token_from_another_key_is_rejected(tokens, profile):
+    other = SessionTokens(secret=b"other-secret")
+    assert tokens.verify(other.issue(profile)) is None
+
+def test_expired_token_is_rejected(tokens, profile, monkeypatch):
+    token = tokens.issue(profile)
+    now = session_tokens.time.time()
+    monkeypatch.setattr(session_tokens.time, "time", lambda: now + 3601)
+    assert tokens.verify(token) is None
+
+def test_cache_miss_reads_the_profile_once(profile):
+    issuer = SessionTokens(secret=SECRET)
+    token = issuer.issue(profile)
+    # Another worker with the same secret has never seen the token
+    worker = SessionTokens(secret=SECRET)
+    reads = []
+
+    def load(claims):
+        reads.append(claims.mobile)
+        return profile
+    assert worker.resolve(token, load)[1] is profile
+    assert worker.resolve(token, load)[1] is profile
+    assert reads == ["9876543210"]
+
+def test_revoked_token_is_rejected(tokens, profile):
+    token = tokens.issue(profile)
+    assert tokens.revoke(token).mobile == "9876543210"
+    assert tokens.resolve(token, lambda claims: profile) is None
+    assert tokens.stats()["revoked"] == 1
+
+def test_revocation_outlives_the_cache_entry(profile):
+    # cache_ttl=0: every cache entry, the revoked marker included, expires at once
+    tokens = SessionTokens(secret=SECRET, cache_ttl=0)
+    token = tokens.issue(profile)
+    tokens.revoke(token)
+    # Without a durable record the miss path would restore the farmer
+    assert tokens.resolve(token, lambda claims: profile) is None
+
+def test_revoking_an_invalid_token_does_nothing(tokens):
+    assert tokens.revoke("not-a-token") is None
+    assert tokens.revoke(None) is None
+    assert tokens.stats()["revoked"] == 0
+
+def test_refresh_replaces_the_cached_profile(tokens, profile):
+    token = tokens.issue(profile)
+    updated = profile.merged({"name": "Asha K"})
+    tokens.refresh(token, updated)
+    assert tokens.resolve(token, unexpected_read)[1] is updated
+
+def test_cookie_string(monkeypatch):
+    monkeypatch.setattr(session_tokens, "SESSION_COOKIE_SECURE", True)
+    assert cookie_string("abc", 60) == "agrismart_session=abc; Path=/; Max-Age=60; SameSite=Lax; Secure"
+    monkeypatch.setattr(session_tokens, "SESSION_COOKIE_SECURE", False)
+    assert cookie_string("", 0).endswith("Max-Age=0; SameSite=Lax")
+
+def test_storage_error_on_a_miss_is_not_cached_as_a_rejection(profile):
+    token = SessionTokens(secret=SECRET).issue(profile)
+    worker = SessionTokens(secret=SECRET)
+
+    def storage_down(claims):
+        raise StorageUnavailableError("offline")
+    with pytest.raises(StorageUnavailableError):
+        worker.resolve(token, storage_down)
+    assert worker.stats()["rejected"] == 0
+    # Once storage is back the same token restores the farmer
+    assert worker.resolve(token, lambda claims: profile)[1] is profile
+
+def test_logout_on_another_worker_holds_after_the_cache_entry_expires(profile):
+    revoked_sessions = {}
+
+    def load(claims):
+        return None if claims.token_id in revoked_sessions else profile
+    worker_a = SessionTokens(secret=SECRET)
+    # cache_ttl=0 stands in for worker B's cache entry having expired
+    worker_b = SessionTokens(secret=SECRET, cache_ttl=0)
+    token = worker_a.issue(profile)
+    assert worker_b.resolve(token, load)[1] is profile
+
+    claims = worker_a.revoke(token)
+    revoked_sessions[claims.token_id] = claims.expires_at
+    assert worker_b.resolve(token, load) is None
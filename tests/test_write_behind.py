@@ -0,0 +1,80 @@
+import pytest
+
+from write_behind import WriteBehindQueue
+
+class Backend:
+    def __init__(self):
+        self.up = True
+        self.missing = set()
+        self.written = {}
+
+    def flush_batch(self, updates):
+        if not self.up:
+            raise ConnectionError("backend down")
+        missing = self.missing & set(updates)
+        if missing:
+            raise KeyError(f"No document for {sorted(missing)}")
+        for key, fields in updates.items():
+            self.written.setdefault(key, {}).update(fields)
+
+@pytest.fixture
+def backend():
+    return Backend()
+
+@pytest.fixture
+def make_queue(backend):
+    queues = []
+
+    def make(**kwargs):
+        queue = WriteBehindQueue(backend.flush_batch, flush_interval=3600,
+                                 available=lambda: backend.up, **kwargs)
+        queues.append(queue)
+        return queue
+    yield make
+    for queue in queues:
+        queue.close()
+
+def test_updates_merge_per_key(backend, make_queue):
+    queue = make_queue()
+    queue.enqueue("a", {"x": 1, "y": 1})
+    queue.enqueue("a", {"y": 2})
+    queue.flush()
+    assert backend.written == {"a": {"x": 1, "y": 2}}
+    assert queue.stats()["merged"] == 1
+
+def test_outage_keeps_every_write(backend, make_queue):
+    queue = make_queue(max_attempts=3)
+    queue.enqueue("a", {"x": 1})
+    queue.enqueue("b", {"x": 2})
+    backend.up = False
+    for _ in range(10):
+        queue.flush()
+    assert queue.depth() == 2
+    assert queue.stats()["dropped"] == 0
+
+    backend.up = True
+    queue.flush()
+    assert backend.written == {"a": {"x": 1}, "b": {"x": 2}}
+
+def test_one_bad_key_does_not_drop_its_batch(backend, make_queue):
+    queue = make_queue(max_attempts=3)
+    backend.missing.add("ghost")
+    for key in ("a", "b", "ghost", "c"):
+        queue.enqueue(key, {"last_login": 1})
+
+    for _ in range(3):
+        queue.flush()
+    stats = queue.stats()
+    assert set(backend.written) == {"a", "b", "c"}
+    assert stats["flushed"] == 3
+    assert stats["dropped"] == 1
+    assert stats["depth"] == 0
+
+def test_large_queues_flush_in_bounded_batches(backend, make_queue):
+    batches = []
+    queue = WriteBehindQueue(lambda updates: batches.append(len(updates)), flush_interval=3600, batch_size=2)
+    for key in range(5):
+        queue.enqueue(key, {"x": key})
+    queue.flush()
+    queue.close()
+    assert batches == [2, 2, 1]
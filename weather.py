@@ -0,0 +1,268 @@
+"""Weather forecasts shared by every farmer in the same geohash cell.
+
+Requests are keyed by a coarse geohash cell (5 characters is roughly a
+5 km square, about one panchayat), so thousands of farmers nearby share one
+upstream call.  Concurrent misses for a cell wait on a single in-flight
+fetch, and a forecast past its TTL is still served while one background
+refresh replaces it.  The provider follows AGRISMART_WEATHER_PROVIDER:
+"file" reads fixtures/weather.json and needs no network, "open-meteo"
+calls the public Open-Meteo forecast API.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, datetime, timedelta
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from cache import TTLCache
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WEATHER_PROVIDER = os.getenv("AGRISMART_WEATHER_PROVIDER", "file").lower()
+WEATHER_FIXTURE = os.getenv("AGRISMART_WEATHER_FIXTURE", os.path.join(APP_DIR, "fixtures", "weather.json"))
+# Seconds the file provider sleeps per call to mimic an upstream round trip
+WEATHER_FAKE_LATENCY = float(os.getenv("AGRISMART_WEATHER_FAKE_LATENCY", "0"))
+GEOHASH_PRECISION = int(os.getenv("AGRISMART_WEATHER_GEOHASH_PRECISION", "5"))
+# Fresh for WEATHER_TTL seconds, then served stale for up to WEATHER_STALE_TTL more while refreshing
+WEATHER_TTL = int(os.getenv("AGRISMART_WEATHER_TTL", "900"))
+WEATHER_STALE_TTL = int(os.getenv("AGRISMART_WEATHER_STALE_TTL", "3600"))
+WEATHER_CACHE_SIZE = int(os.getenv("AGRISMART_WEATHER_CACHE_SIZE", "5000"))
+# Seconds before a cell whose refresh failed is tried again
+REFRESH_BACKOFF = 60
+
+class WeatherUnavailableError(Exception):
+    """Raised when no forecast can be fetched and none is cached"""
+
+# 🔹 Geohash
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+def geohash_decode(geohash):
+    """Centre (latitude, longitude) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if bits >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+# 🔹 Providers; fetch(latitude, longitude) returns
+# {"current": {...}, "daily": [{"date", "min_c", "max_c", "rain_mm", "rain_probability"}, ...]}
+class FileWeatherProvider:
+    """Forecasts from a JSON fixture, matched by the longest geohash prefix"""
+
+    name = "file"
+
+    def __init__(self, path=WEATHER_FIXTURE, latency=WEATHER_FAKE_LATENCY):
+        with open(path, encoding="utf-8") as f:
+            fixture = json.load(f)
+        self.default = fixture["default"]
+        self.cells = fixture.get("cells", {})
+        self.latency = latency
+        self.calls = 0
+
+    def fetch(self, latitude, longitude):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        geohash = geohash_encode(latitude, longitude, 12)
+        forecast = self.default
+        for length in range(len(geohash), 0, -1):
+            if geohash[:length] in self.cells:
+                forecast = self.cells[geohash[:length]]
+                break
+        # Fixture days are offsets from today so the forecast never looks out of date
+        today = date.today()
+        return {
+            "current": dict(forecast["current"]),
+            "daily": [
+                {**{k: v for k, v in day.items() if k != "day"},
+                 "date": (today + timedelta(days=day["day"])).isoformat()}
+                for day in forecast["daily"]
+            ],
+        }
+
+class OpenMeteoProvider:
+    """Forecasts from the Open-Meteo API (no key needed)"""
+
+    name = "open-meteo"
+    URL = "https://api.open-meteo.com/v1/forecast"
+
+    def __init__(self, timeout=5, days=5):
+        self.timeout = timeout
+        self.days = days
+        self.calls = 0
+
+    def fetch(self, latitude, longitude):
+        self.calls += 1
+        query = urlencode({
+            "latitude": round(latitude, 4),
+            "longitude": round(longitude, 4),
+            "current": "temperature_2m,relative_humidity_2m,precipitation,wind_speed_10m",
+            "daily": "temperature_2m_min,temperature_2m_max,precipitation_sum,precipitation_probability_max",
+            "timezone": "Asia/Kolkata",
+            "forecast_days": self.days,
+        })
+        with urlopen(f"{self.URL}?{query}", timeout=self.timeout) as response:
+            data = json.load(response)
+        current, daily = data["current"], data["daily"]
+        return {
+            "current": {
+                "temperature_c": current["temperature_2m"],
+                "humidity": current["relative_humidity_2m"],
+                "rain_mm": current["precipitation"],
+                "wind_kmh": current["wind_speed_10m"],
+            },
+            "daily": [
+                {
+                    "date": day,
+                    "min_c": daily["temperature_2m_min"][i],
+                    "max_c": daily["temperature_2m_max"][i],
+                    "rain_mm": daily["precipitation_sum"][i],
+                    "rain_probability": daily["precipitation_probability_max"][i],
+                }
+                for i, day in enumerate(daily["time"])
+            ],
+        }
+
+def create_weather_provider(kind=WEATHER_PROVIDER):
+    if kind == "file":
+        return FileWeatherProvider()
+    if kind == "open-meteo":
+        return OpenMeteoProvider()
+    raise ValueError(f"Unknown weather provider: {kind}")
+
+# 🔹 Weather Service
+class WeatherService:
+    """Per-cell forecast cache with single-flight fetches and stale-while-refresh"""
+
+    def __init__(self, provider, precision=GEOHASH_PRECISION, ttl=WEATHER_TTL,
+                 stale_ttl=WEATHER_STALE_TTL, max_cells=WEATHER_CACHE_SIZE,
+                 refresh_workers=4, wait_timeout=10):
+        self.provider = provider
+        self.precision = precision
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        # Entries live through the stale window; freshness is judged from fetched_at
+        self.cache = TTLCache(max_size=max_cells, ttl=ttl + stale_ttl)
+        self._inflight = {}
+        self._retry_at = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="weather-refresh")
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.last_error = None
+
+    def cell(self, latitude, longitude):
+        return geohash_encode(latitude, longitude, self.precision)
+
+    def forecast(self, latitude, longitude):
+        """Forecast for the cell containing the point, plus cell, fetched_at and stale"""
+        cell = self.cell(latitude, longitude)
+        entry = self.cache.get(cell)
+        if entry is not None:
+            forecast, fetched_at, fetched_wall = entry
+            stale = time.monotonic() - fetched_at >= self.ttl
+            if stale:
+                with self._lock:
+                    self.stale_served += 1
+                self._refresh_in_background(cell)
+            return dict(forecast, cell=cell, fetched_at=fetched_wall, stale=stale)
+
+        future, leader = self._join_fetch(cell)
+        if leader:
+            self._fetch(cell, future)
+        try:
+            forecast, fetched_wall = future.result(timeout=self.wait_timeout)
+        except FutureTimeoutError:
+            raise WeatherUnavailableError(f"Timed out waiting for the forecast for {cell}")
+        except Exception as e:
+            raise WeatherUnavailableError(f"Forecast for {cell} unavailable: {e}") from e
+        return dict(forecast, cell=cell, fetched_at=fetched_wall, stale=False)
+
+    def _join_fetch(self, cell):
+        """The cell's in-flight fetch, creating it if there is none; returns (future, is_leader)"""
+        with self._lock:
+            future = self._inflight.get(cell)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[cell] = future
+            return future, True
+
+    def _fetch(self, cell, future):
+        """Run the upstream call for a cell and settle everyone waiting on it"""
+        try:
+            forecast = self.provider.fetch(*geohash_decode(cell))
+        except Exception as e:
+            with self._lock:
+                self.upstream_calls += 1
+                self.upstream_errors += 1
+                self.last_error = e
+                self._retry_at[cell] = time.monotonic() + REFRESH_BACKOFF
+                self._inflight.pop(cell, None)
+            future.set_exception(e)
+            return
+
+        fetched_wall = datetime.now()
+        self.cache.set(cell, (forecast, time.monotonic(), fetched_wall))
+        with self._lock:
+            self.upstream_calls += 1
+            self._retry_at.pop(cell, None)
+            self._inflight.pop(cell, None)
+        future.set_result((forecast, fetched_wall))
+
+    def _refresh_in_background(self, cell):
+        with self._lock:
+            if time.monotonic() < self._retry_at.get(cell, 0):
+                return
+        future, leader = self._join_fetch(cell)
+        if leader:
+            self._refresher.submit(self._fetch, cell, future)
+
+    def stats(self):
+        cache_stats = self.cache.stats()
+        with self._lock:
+            in_flight = len(self._inflight)
+        return {
+            "provider": self.provider.name,
+            "cells": cache_stats["size"],
+            "hit_rate": cache_stats["hit_rate"],
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "in_flight": in_flight,
+        }
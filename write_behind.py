@@ -0,0 +1,160 @@
+import atexit
+import threading
+import time
+
+# Firestore rejects batches with more than 500 operations
+MAX_BATCH_SIZE = 500
+
+class WriteBehindQueue:
+    """Buffers non-critical document updates, merged per key, and flushes them in batches"""
+
+    def __init__(self, flush_batch, flush_interval=5.0, batch_size=MAX_BATCH_SIZE, max_attempts=3,
+                 available=None):
+        # flush_batch(updates) writes {key: fields} in one batch and raises on failure
+        self.flush_batch = flush_batch
+        # available() says whether the backend is reachable; None means always
+        self.available = available
+        self.flush_interval = flush_interval
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.max_attempts = max_attempts
+        self._pending = {}
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.enqueued = 0
+        self.merged = 0
+        self.flushed = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self.last_flush_at = None
+        self.last_flush_seconds = 0.0
+        self.last_error = None
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, key, fields):
+        """Queue an update; later values for the same field win"""
+        if self._closed:
+            self.flush_batch({key: dict(fields)})
+            return
+
+        with self._lock:
+            if key in self._pending:
+                self._pending[key].update(fields)
+                self.merged += 1
+            else:
+                self._pending[key] = dict(fields)
+            self.enqueued += 1
+            full = len(self._pending) >= self.batch_size
+
+        if full:
+            self._wake.set()
+
+    def depth(self):
+        """Number of keys waiting to be written"""
+        return len(self._pending)
+
+    def pending_items(self):
+        """Snapshot of queued {key: fields}, for reading your own writes before they flush"""
+        with self._lock:
+            return {key: dict(fields) for key, fields in self._pending.items()}
+
+    def _backend_down(self):
+        return self.available is not None and not self.available()
+
+    def flush(self):
+        """Write everything pending now, one batch at a time; waits out an outage without losing writes"""
+        if self._backend_down():
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return
+
+            started = time.perf_counter()
+            keys = list(pending)
+            for i in range(0, len(keys), self.batch_size):
+                chunk = {key: pending[key] for key in keys[i:i + self.batch_size]}
+                try:
+                    self._write(chunk)
+                except Exception as e:
+                    self.failed_batches += 1
+                    self.last_error = e
+                    if self._backend_down():
+                        # Lost the backend mid-flush; the writes were not at fault
+                        self._requeue(chunk, count_attempt=False)
+                    elif len(chunk) == 1:
+                        self._requeue(chunk)
+                    else:
+                        # One bad document (e.g. one that does not exist yet) fails
+                        # the whole batch; write the keys alone so the rest still land
+                        self._write_each(chunk)
+
+            self.last_flush_at = time.time()
+            self.last_flush_seconds = time.perf_counter() - started
+
+    def _write(self, chunk):
+        self.flush_batch(chunk)
+        self.flushed += len(chunk)
+        for key in chunk:
+            self._attempts.pop(key, None)
+
+    def _write_each(self, chunk):
+        for key, fields in chunk.items():
+            try:
+                self._write({key: fields})
+            except Exception as e:
+                self.last_error = e
+                self._requeue({key: fields}, count_attempt=not self._backend_down())
+
+    def _requeue(self, chunk, count_attempt=True):
+        """Put a failed chunk back without overwriting newer values.
+
+        Only failures while the backend is up count towards max_attempts, so
+        an outage of any length drops nothing.
+        """
+        with self._lock:
+            for key, fields in chunk.items():
+                attempts = self._attempts.get(key, 0) + (1 if count_attempt else 0)
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(key, None)
+                    self.dropped += 1
+                    continue
+                self._attempts[key] = attempts
+                fields.update(self._pending.get(key, {}))
+                self._pending[key] = fields
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background thread and flush what is left"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+    def stats(self):
+        """Queue depth and throughput counters"""
+        return {
+            "depth": self.depth(),
+            "enqueued": self.enqueued,
+            "merged": self.merged,
+            "flushed": self.flushed,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+            "last_flush_at": self.last_flush_at,
+            "last_flush_seconds": self.last_flush_seconds,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }